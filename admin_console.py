@@ -11,7 +11,18 @@ from table2string import Table, Themes, Theme
 
 from config import WSGI_PATH, __version__
 from notes_api.types import db, Account as notes_api_Account
-from notes_bot.types import TelegramAccount  # noqa
+from notes_api.db_creator import (
+    rebuild_usage_counters as notes_api_rebuild_usage_counters,
+    rebuild_events_fts as notes_api_rebuild_events_fts,
+    rebuild_calendar_counts as notes_api_rebuild_calendar_counts,
+)
+from notes_bot.types import (  # noqa
+    TelegramAccount,
+    account_fields_stats,
+    telegram_account_cache_stats,
+)
+from notes_bot.notifications import notification_reports  # noqa
+from notes_bot.message_generator import pages_cache_stats  # noqa
 
 
 def execute(
@@ -233,6 +244,21 @@ UPDATE users
     user(user_id=user_id)
 
 
+def rebuild_usage_counters() -> None:
+    with db.connect():
+        notes_api_rebuild_usage_counters()
+
+
+def rebuild_events_fts() -> None:
+    with db.connect():
+        notes_api_rebuild_events_fts()
+
+
+def rebuild_calendar_counts() -> None:
+    with db.connect():
+        notes_api_rebuild_calendar_counts()
+
+
 class Account(notes_api_Account):
     def __init__(self, user_id: int, group_id: str | None = None):
         with db.connect():
@@ -277,13 +303,23 @@ user_list(page: int = 1)
 group_list(page: int = 1)
 user(*, user_id: int | None = None, chat_id: int | str | None = None)
 ban(user_id: int, user_status: int = -1)
+rebuild_usage_counters()
+rebuild_events_fts()
+rebuild_calendar_counts()
 
 with Account(user_id: int) as account:
     ...
 
 db.register_function(name: str, func: (...) -> Any)
+db.register_statement(name: str, query: str) -> str
+with db.connect(), db.transaction():
+    ...
 Account(user_id: int, group_id: str | None = None)
 TelegramAccount(chat_id: int, group_chat_id: int | None = None)
+telegram_account_cache_stats -> {"hits": int, "misses": int}
+account_fields_stats -> {handler: {"calls": int, "user": int, "settings": int, ...}}
+pages_cache_stats -> {"hits": int, "misses": int}
+notification_reports -> deque[{"slot": str, "recipients": int, "due": int, "sent": int, ...}]
 """
 
 
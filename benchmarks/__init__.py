@@ -0,0 +1,68 @@
+"""
+Performance benchmarks. Not collected by pytest.
+
+python -m benchmarks.<name> --help
+"""
+
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+from time import perf_counter
+
+import notes_api.types
+
+
+@contextmanager
+def temporary_database(profile: dict | None = None):
+    """
+    Swaps `notes_api.types.engine` and `notes_api.types.db`
+    for a fresh database file created from `notes_api/db_create.sql`.
+    """
+    old_engine, old_db = notes_api.types.engine, notes_api.types.db
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{Path(directory, 'benchmark.sqlite3')}"
+        notes_api.types.engine = notes_api.types.create_sqlite_engine(url, profile)
+        notes_api.types.db = notes_api.types.DataBase(profile)
+
+        try:
+            with notes_api.types.db.connect(), open("notes_api/db_create.sql") as file:
+                notes_api.types.db.execute(file.read(), commit=True, script=True)
+            yield notes_api.types.db
+        finally:
+            notes_api.types.engine.dispose()
+            notes_api.types.engine, notes_api.types.db = old_engine, old_db
+
+
+def create_users(count: int, user_status: int = 2) -> list[int]:
+    """
+    Creates `count` users with `user_status` and returns their user_id
+    """
+    db = notes_api.types.db
+    user_ids = []
+
+    with db.connect():
+        for n in range(count):
+            notes_api.types.create_user(
+                f"benchmark{n}@example.com", f"benchmark{n}", "password"
+            )
+            user_id = db.execute(
+                "SELECT user_id FROM users WHERE username = ?;",
+                params=(f"benchmark{n}",),
+            )[0][0]
+            notes_api.types.set_user_status(user_id, user_status)
+            user_ids.append(user_id)
+
+    return user_ids
+
+
+def timeit(func, *args, repeat: int = 5, **kwargs) -> float:
+    """
+    Best wall time of `repeat` calls in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        func(*args, **kwargs)
+        best = min(best, perf_counter() - start)
+    return best
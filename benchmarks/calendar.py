@@ -0,0 +1,160 @@
+"""
+The queries of the monthly calendar (buttons_utils.create_monthly_calendar_keyboard).
+
+Compares the former three queries over events (days with events, days
+of monthly and yearly events, weekdays of weekly events) with the
+"calendar.month" statement, which reads all of them from calendar_counts.
+One account with events spread over many years, a part of them recurring.
+
+python -m benchmarks.calendar --events 5000 --years 40
+"""
+
+import json
+import random
+import argparse
+
+import notes_api.types
+from benchmarks import temporary_database, create_users, timeit
+from tests.chat import Chat
+
+with Chat():
+    import notes_bot.buttons_utils  # noqa: F401 registers "calendar.month"
+
+legacy_queries = (
+    """
+SELECT day AS day_number,
+       COUNT(event_id) AS event_count
+  FROM events
+ WHERE user_id IS :user_id
+       AND group_id IS :group_id
+       AND year = :year
+       AND month = :month
+       AND removal_time IS NULL
+ GROUP BY day_number;
+""",
+    """
+SELECT DISTINCT day
+  FROM events
+ WHERE user_id IS :user_id
+       AND group_id IS :group_id
+       AND removal_time IS NULL
+       AND (
+           every_month
+           OR (
+               every_year
+               AND month = :month
+           )
+       );
+""",
+    """
+SELECT DISTINCT weekday - 1
+  FROM events
+ WHERE user_id IS :user_id
+       AND group_id IS :group_id
+       AND removal_time IS NULL
+       AND every_week;
+""",
+)
+statuses = (
+    '["⬜"]',
+    '["⬜"]',
+    '["⬜"]',
+    '["⬜"]',
+    '["⬜"]',
+    '["✅"]',
+    '["🗞"]',
+    '["📅"]',
+    '["🎉"]',
+    '["📆"]',
+)
+
+
+def fill_events(user_id: int, count: int, years: int) -> None:
+    db = notes_api.types.db
+    rnd = random.Random(count)
+
+    with db.connect():
+        db.execute(
+            """
+INSERT INTO events (user_id, event_id, date, text, statuses)
+SELECT :user_id,
+       key + 1,
+       JSON_EXTRACT(value, '$[0]'),
+       'event',
+       JSON_EXTRACT(value, '$[1]')
+  FROM JSON_EACH(:events);
+""",
+            params={
+                "user_id": user_id,
+                "events": json.dumps(
+                    [
+                        (
+                            f"{rnd.randint(1, 28):0>2}.{rnd.randint(1, 12):0>2}."
+                            f"{rnd.randint(2000, 2000 + years - 1)}",
+                            rnd.choice(statuses),
+                        )
+                        for _ in range(count)
+                    ]
+                ),
+            },
+            commit=True,
+        )
+
+
+def legacy_month(params: dict) -> list:
+    return [
+        notes_api.types.db.execute(query, params=params) for query in legacy_queries
+    ]
+
+
+def month(params: dict) -> list:
+    return notes_api.types.db.execute(
+        "calendar.month",
+        params={
+            "owner": f"u{params['user_id']}",
+            "year": params["year"],
+            "month": params["month"],
+        },
+    )
+
+
+def browse(func, user_id: int, years: int) -> None:
+    """Pressing ">" through every month of the account"""
+    for year in range(2000, 2000 + years):
+        for month_number in range(1, 13):
+            func(
+                {
+                    "user_id": user_id,
+                    "group_id": None,
+                    "year": year,
+                    "month": month_number,
+                }
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--years", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with temporary_database() as db:
+        (user_id,) = create_users(1)
+        fill_events(user_id, args.events, args.years)
+
+        with db.connect():
+            months = args.years * 12
+            before = timeit(
+                browse, legacy_month, user_id, args.years, repeat=args.repeat
+            )
+            after = timeit(browse, month, user_id, args.years, repeat=args.repeat)
+
+    print(f"events {args.events}, months {months}")
+    print(f"three queries  {before / months * 1e6:>9.1f} us per month")
+    print(f"calendar_counts{after / months * 1e6:>9.1f} us per month")
+    print(f"speedup        {before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Dispatching a button press in CallBackHandler.__call__.
+
+Compares the former dispatch (inspect.signature, getattr, ast.literal_eval,
+getargs and a filtered kwargs dict on every press) with the metadata that
+@prefix compiles once. The handler methods are replaced with a no-op,
+so only the dispatch is measured. Callback data is taken from
+tests/test_bot_buttons.py, Telegram is stubbed by tests.chat.
+
+python -m benchmarks.callback_dispatch --number 20000
+"""
+
+import re
+import ast
+import inspect
+import argparse
+from pathlib import Path
+from types import SimpleNamespace
+from time import perf_counter
+
+from tests.chat import Chat
+
+with Chat():
+    import notes_bot.handlers
+    from telegram_utils.argument_parser import getargs
+
+calendar_data = (
+    "cm ('dl','mnm',(2000,1),None)",
+    "cm (None,None,'now',None)",
+    "cy ('dl','mnm',2000,None)",
+    "mnc ((2000,1),)",
+)
+
+
+def callback_data_from_tests() -> list[str]:
+    text = Path("tests/test_bot_buttons.py").read_text(encoding="UTF-8")
+    return sorted(set(re.findall(r'callback_mock\("([^"]*)"\)', text)))
+
+
+def prefix_arguments() -> dict[str, tuple[str, dict, bool, bool, str]]:
+    """
+    {prefix: (func_name, arguments, eval_, eval_star, prefix)} from the @prefix
+    decorators of notes_bot/handlers.py, the former `_handlers` values
+    """
+    tree = ast.parse(Path("notes_bot/handlers.py").read_text(encoding="UTF-8"))
+    result = {}
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.FunctionDef):
+            continue
+
+        for decorator in node.decorator_list:
+            if not (
+                isinstance(decorator, ast.Call)
+                and getattr(decorator.func, "id", None) == "prefix"
+            ):
+                continue
+
+            args = [ast.literal_eval(arg) for arg in decorator.args]
+            kwargs = {k.arg: ast.literal_eval(k.value) for k in decorator.keywords}
+            prefixes = args[0] if isinstance(args[0], tuple) else (args[0],)
+            arguments = args[1] if len(args) > 1 else kwargs.get("arguments", {})
+
+            for p in prefixes:
+                result[p] = (
+                    node.name,
+                    arguments,
+                    kwargs.get("eval_"),
+                    kwargs.get("eval_star"),
+                    p,
+                )
+
+    return result
+
+
+def noop(*args, **kwargs) -> None:
+    pass
+
+
+def legacy_dispatch(self, call, handlers: dict) -> None:
+    call_prefix = call.data.strip().split(maxsplit=1)[0]
+    method = handlers.get(call_prefix)
+
+    if method is None:
+        return
+
+    func_name, arguments, eval_, eval_star, str_prefix = method
+    func = getattr(self, func_name)
+    call_data = call.data.removeprefix(call_prefix).strip()
+    func_argument_names = list(inspect.signature(func).parameters.keys())
+
+    return noop(
+        *(ast.literal_eval(call_data),) if eval_ else (),
+        *ast.literal_eval(call_data) if eval_star else (),
+        **{
+            k: v
+            for k, v in {
+                "chat_id": call.message.chat.id,
+                "message_id": call.message.message_id,
+                "message": call.message,
+                "call_id": call.id,
+                "call_data": call_data,
+                "call": call,
+                "str_prefix": str_prefix,
+                **getargs(call_data)(arguments),
+            }.items()
+            if k in func_argument_names
+        },
+    )
+
+
+def per_call(func, args: tuple, number: int) -> float:
+    start = perf_counter()
+    for _ in range(number):
+        func(*args)
+    return (perf_counter() - start) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    handler = notes_bot.handlers.callback_handler
+    legacy_handlers = prefix_arguments()
+    compiled_handlers = notes_bot.handlers._handlers
+    original = dict(compiled_handlers)
+    compiled_handlers.update((k, (noop, *v[1:])) for k, v in original.items())
+
+    total_before = total_after = 0
+    print(f"{'callback data':<36}{'before us':>10}{'after us':>10}")
+    try:
+        for data in (*callback_data_from_tests(), *calendar_data):
+            call = SimpleNamespace(
+                id="1",
+                data=data,
+                message=SimpleNamespace(chat=SimpleNamespace(id=1), message_id=1),
+            )
+            before = per_call(
+                legacy_dispatch, (handler, call, legacy_handlers), args.number
+            )
+            after = per_call(handler, (call,), args.number)
+            total_before, total_after = total_before + before, total_after + after
+            print(f"{data:<36}{before * 1e6:>10.2f}{after * 1e6:>10.2f}")
+    finally:
+        compiled_handlers.update(original)
+
+    print(f"{'total':<36}{total_before * 1e6:>10.2f}{total_after * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
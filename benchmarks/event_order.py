@@ -0,0 +1,118 @@
+"""
+Sorting an account's events by config.sql_order_dict["usual"].
+
+Compares the former `DAYS_BEFORE_EVENT` Python function in ORDER BY
+with the SQL expression from config.sql_days_before_event.
+
+python -m benchmarks.event_order --events 2000
+"""
+
+import random
+import argparse
+
+import notes_api.types
+from notes_api.types import Event
+from notes_api.utils import sql_order
+from benchmarks import temporary_database, create_users, timeit
+
+legacy_order = """
+ABS(DAYS_BEFORE_EVENT(date, statuses)) ASC,
+DAYS_BEFORE_EVENT(date, statuses) DESC,
+CASE
+    WHEN statuses LIKE '%🟥%' THEN 1
+    WHEN statuses LIKE '%📬%' THEN 2
+    WHEN statuses LIKE '%🗞%' THEN 3
+    WHEN statuses LIKE '%📅%' THEN 4
+    WHEN statuses LIKE '%📆%' THEN 5
+    WHEN statuses LIKE '%🎉%' THEN 6
+    WHEN statuses LIKE '%🎊%' THEN 7
+    ELSE 8
+END ASC,
+IFNULL(recent_changes_time, adding_time) DESC,
+event_id DESC
+"""
+statuses = (
+    '["⬜"]',
+    '["⬜"]',
+    '["⬜"]',
+    '["🟥"]',
+    '["📬"]',
+    '["🗞"]',
+    '["📅"]',
+    '["🎉"]',
+    '["📆"]',
+)
+
+
+def fill_events(user_id: int, count: int) -> None:
+    db = notes_api.types.db
+    rnd = random.Random(count)
+
+    with db.connect():
+        for event_id in range(1, count + 1):
+            db.execute(
+                """
+INSERT INTO events (user_id, event_id, date, text, statuses)
+     VALUES (?, ?, ?, ?, ?);
+""",
+                params=(
+                    user_id,
+                    event_id,
+                    f"{rnd.randint(1, 28):0>2}.{rnd.randint(1, 12):0>2}.{rnd.randint(2020, 2030)}",
+                    f"event {event_id}",
+                    rnd.choice(statuses),
+                ),
+                commit=event_id == count,
+            )
+
+
+def sort_events(user_id: int, order_by: str) -> list[int]:
+    return [
+        x[0]
+        for x in notes_api.types.db.execute(
+            f"""
+SELECT event_id
+  FROM events
+ WHERE user_id IS ?
+       AND group_id IS NULL
+       AND removal_time IS NULL
+ ORDER BY {order_by};
+""",
+            params=(user_id,),
+        )
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--timezone", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with temporary_database() as db:
+        (user_id,) = create_users(1)
+        fill_events(user_id, args.events)
+
+        with db.connect():
+            db.register_function(
+                "DAYS_BEFORE_EVENT",
+                lambda date, statuses_: Event(
+                    0, "", 0, date, "", statuses_, "", "", ""
+                ).days_before_event(args.timezone),
+            )
+            order_by = sql_order("usual", args.timezone)
+
+            before = timeit(sort_events, user_id, legacy_order, repeat=args.repeat)
+            after = timeit(sort_events, user_id, order_by, repeat=args.repeat)
+            same = sort_events(user_id, legacy_order) == sort_events(user_id, order_by)
+
+    print(f"events          {args.events}")
+    print(f"DAYS_BEFORE_EVENT {before * 1000:>9.2f} ms")
+    print(f"SQL expression    {after * 1000:>9.2f} ms")
+    print(f"speedup           {before / after:>9.1f}x")
+    print(f"same order        {same}")
+
+
+if __name__ == "__main__":
+    main()
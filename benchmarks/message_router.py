@@ -0,0 +1,131 @@
+"""
+Choosing the handler of an incoming text message.
+
+Compares the former chain of telebot filters from notes_bot/main.py
+(each state filter with its own connection and SELECT on a cache miss)
+with telegram_utils.message_router.MessageRouter and ChatStateStore
+(the bot modules are not imported, they connect to Telegram).
+
+python -m benchmarks.message_router --number 20000
+"""
+
+import re
+import argparse
+from types import SimpleNamespace
+from time import perf_counter
+
+# noinspection PyPackageRequirements
+from telebot.util import extract_command
+
+import config
+import notes_api.types
+from notes_api.types import ChatStateStore
+from benchmarks import temporary_database
+from telegram_utils.message_router import MessageRouter
+
+bot_id, bot_username = 1, "namebot"
+re_inline_message = re.compile(rf"\A@{re.escape(bot_username)} ")
+
+
+def get_state_legacy(chat_id: int, state_type: str) -> str | None:
+    """
+    ChatStateMachine.get_state before chat_state_store, for a chat
+    that was pushed out of its LFUCache(maxsize=100)
+    """
+    with notes_api.types.db.connect():
+        result = notes_api.types.db.execute(
+            """
+SELECT state
+  FROM chat_states
+ WHERE chat_id = ?
+       AND state_type = ?;
+""",
+            params=(chat_id, state_type),
+        )
+    return result[0][0] if result else None
+
+
+legacy_filters = (
+    ("command", lambda m: extract_command(m.text) in config.COMMANDS),
+    ("command", lambda m: m.text.startswith("/open_")),
+    ("search", lambda m: m.text.startswith("#") and not m.text.startswith("#️⃣")),
+    ("inline", lambda m: re_inline_message.match(m.text)),
+    (
+        "reply",
+        lambda m: (
+            m.reply_to_message
+            and m.reply_to_message.text
+            and m.reply_to_message.from_user.id == bot_id
+            and not m.quote
+        ),
+    ),
+    ("add_group", lambda m: get_state_legacy(m.chat.id, "add_group")),
+    ("add_event", lambda m: get_state_legacy(m.chat.id, "add_event")),
+)
+
+
+def legacy_route(message) -> str | None:
+    for route, func in legacy_filters:
+        if func(message):
+            return route
+    return None
+
+
+def message(text: str, chat_id: int = 1, reply_to_bot: bool = False):
+    reply = SimpleNamespace(text="settings", from_user=SimpleNamespace(id=bot_id))
+    return SimpleNamespace(
+        text=text,
+        chat=SimpleNamespace(id=chat_id),
+        reply_to_message=reply if reply_to_bot else None,
+        quote=None,
+    )
+
+
+def per_call(func, arg, number: int) -> float:
+    start = perf_counter()
+    for _ in range(number):
+        func(arg)
+    return (perf_counter() - start) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    updates = {
+        "command": message("/start"),
+        "open": message("/open_01.01.2000"),
+        "search": message("#text"),
+        "inline": message(f"@{bot_username} event(1, 2).text\ntext"),
+        "reply": message("Moscow", reply_to_bot=True),
+        "add_event": message("event text", chat_id=2),
+        "plain text": message("hello", chat_id=3),
+    }
+
+    with temporary_database() as db:
+        with db.connect():
+            db.execute(
+                """
+INSERT INTO chat_states (chat_id, state_type, state)
+VALUES (2, 'add_event', '01.01.2000,1');
+""",
+                commit=True,
+            )
+
+        store = ChatStateStore()
+        router = MessageRouter(config.COMMANDS, bot_username, bot_id, store.get_states)
+
+        print(f"{'update':<12}{'route':>11}{'filters us':>12}{'router us':>11}")
+        for name, update in updates.items():
+            route = router.route(update)
+            assert route == legacy_route(update), name
+            before = per_call(legacy_route, update, args.number)
+            after = per_call(router.route, update, args.number)
+            print(
+                f"{name:<12}{route or '-':>11}{before * 1e6:>12.2f}{after * 1e6:>11.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Splitting the events of a list view into pages (message_generator.pagination).
+
+Compares the former loop, which called encode_id on the whole growing page
+for every row, with split_pages, which adds the encoded length of each id.
+400 rows of (event_id, text length) as the pagination query returns them,
+text lengths are mixed from short notes to long ones.
+
+python -m benchmarks.pagination --number 2000
+"""
+
+import random
+import argparse
+from time import perf_counter
+
+from tests.chat import Chat
+
+with Chat():
+    from notes_bot.buttons_utils import encode_id
+    from notes_bot.message_generator import split_pages
+
+
+def legacy_split_pages(
+    rows: list[tuple[int, int]],
+    max_group_len: int = 10,
+    max_group_symbols_count: int = 2500,
+    max_group_id_len: int = 39,
+) -> list[str]:
+    result = []
+    group = []
+    group_sum = 0
+
+    for event_id, text_len in rows:
+        event_id = str(event_id)
+        if (
+            len(group) < max_group_len
+            and group_sum + text_len <= max_group_symbols_count
+            and len(encode_id([int(i) for i in group + [event_id]])) <= max_group_id_len
+        ):
+            group.append(event_id)
+            group_sum += text_len
+        else:
+            if group:
+                result.append(",".join(group))
+            group = [event_id]
+            group_sum = text_len
+
+    if group:
+        result.append(",".join(group))
+
+    return result
+
+
+def generate_rows(count: int, shuffled: bool, seed: int = 0) -> list[tuple[int, int]]:
+    rnd = random.Random(seed)
+    event_ids = list(range(1, count * 3, 3)) if shuffled else list(range(1, count + 1))
+    if shuffled:
+        rnd.shuffle(event_ids)
+
+    lengths = (5, 20, 60, 150, 400, 1200, 3000)
+    weights = (20, 25, 20, 15, 10, 7, 3)
+    return [(i, rnd.choices(lengths, weights)[0]) for i in event_ids]
+
+
+def per_call(func, rows: list, number: int) -> float:
+    start = perf_counter()
+    for _ in range(number):
+        func(rows)
+    return (perf_counter() - start) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--events", type=int, default=400)
+    args = parser.parse_args()
+
+    print(f"{'rows':<24}{'pages':>6}{'before us':>12}{'after us':>12}")
+    for name, shuffled in (("sequential ids", False), ("scattered ids", True)):
+        rows = generate_rows(args.events, shuffled)
+        pages = split_pages(rows)
+        assert pages == legacy_split_pages(rows)
+
+        before = per_call(legacy_split_pages, rows, args.number)
+        after = per_call(split_pages, rows, args.number)
+        print(f"{name:<24}{len(pages):>6}{before * 1e6:>12.1f}{after * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
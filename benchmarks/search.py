@@ -0,0 +1,131 @@
+"""
+Search in a large events table.
+
+Compares the former LIKE conditions of generate_search_sql_condition
+with the events_fts index, in the query that pagination sends
+(the bot modules are not imported, they connect to Telegram).
+
+python -m benchmarks.search --events 100000 --users 100
+"""
+
+import json
+import random
+import argparse
+
+import notes_api.types
+from notes_api.utils import sql_order, fts_match_query
+from benchmarks import temporary_database, create_users, timeit
+
+legacy_like = """
+date LIKE '%' || ? || '%'
+ OR text LIKE '%' || ? || '%'
+ OR statuses LIKE '%' || ? || '%'
+ OR event_id LIKE '%' || ? || '%'
+"""
+syllables = "ka to mi ra ne so lu vi de po ba ri ge mo fa zu".split()
+# 4096 words of three syllables, random event texts look like real notes
+words = [a + b + c for a in syllables for b in syllables for c in syllables]
+statuses = ('["⬜"]', '["✅"]', '["🟥"]', '["📬"]', '["🎉"]', '["⬜","🔗"]')
+
+
+def fill_events(user_ids: list[int], count: int) -> None:
+    db = notes_api.types.db
+    rnd = random.Random(count)
+    per_user = count // len(user_ids)
+
+    with db.connect():
+        db.execute(
+            """
+INSERT INTO events (user_id, event_id, date, text, statuses)
+SELECT JSON_EXTRACT(value, '$[0]'),
+       JSON_EXTRACT(value, '$[1]'),
+       JSON_EXTRACT(value, '$[2]'),
+       JSON_EXTRACT(value, '$[3]'),
+       JSON_EXTRACT(value, '$[4]')
+  FROM JSON_EACH(?);
+""",
+            params=(
+                json.dumps(
+                    [
+                        (
+                            user_id,
+                            event_id,
+                            f"{rnd.randint(1, 28):0>2}.{rnd.randint(1, 12):0>2}."
+                            f"{rnd.randint(2020, 2030)}",
+                            " ".join(rnd.choices(words, k=rnd.randint(3, 30))),
+                            rnd.choice(statuses),
+                        )
+                        for user_id in user_ids
+                        for event_id in range(1, per_user + 1)
+                    ]
+                ),
+            ),
+            commit=True,
+        )
+
+
+def search_events(user_id: int, sql_where: str, params: tuple | dict, order: str):
+    return notes_api.types.db.execute(
+        f"""
+SELECT event_id,
+       LENGTH(text)
+  FROM events
+ WHERE user_id IS {int(user_id)}
+       AND group_id IS NULL
+       AND removal_time IS NULL
+       AND ({sql_where})
+ ORDER BY {sql_order(order)}
+ LIMIT 400;
+""",
+        params=params,
+    )
+
+
+def legacy_search(user_id: int, query: str) -> list[tuple[int, int]]:
+    query_words = query.split()
+    sql_where = " OR ".join(legacy_like for _ in query_words)
+    params = tuple(y for x in query_words for y in (x, x, x, x))
+    return search_events(user_id, sql_where, params, "usual")
+
+
+def fts_search(user_id: int, query: str) -> list[tuple[int, int]]:
+    fts_query = fts_match_query(query.split(), f"u{user_id}")
+    sql_where = """
+rowid IN (
+    SELECT rowid
+      FROM events_fts
+     WHERE events_fts MATCH :fts_query
+)
+"""
+    return search_events(user_id, sql_where, {"fts_query": fts_query}, "search")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    queries = ("katomi", "rane", "lu", "katomi ranefa", "2025")
+
+    with temporary_database() as db:
+        user_ids = create_users(args.users)
+        fill_events(user_ids, args.events)
+
+        user_id = user_ids[0]
+
+        with db.connect():
+            print(f"events {args.events}, users {args.users}")
+            print(f"{'query':<18}{'LIKE ms':>10}{'FTS5 ms':>10}{'found':>8}")
+
+            for query in queries:
+                before = timeit(legacy_search, user_id, query, repeat=args.repeat)
+                after = timeit(fts_search, user_id, query, repeat=args.repeat)
+                found = len(fts_search(user_id, query))
+                print(
+                    f"{query:<18}{before * 1000:>10.2f}{after * 1000:>10.2f}{found:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
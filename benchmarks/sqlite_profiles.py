@@ -0,0 +1,95 @@
+"""
+Mixed read/write throughput for each profile from `config.sqlite_profiles`.
+
+Every worker thread imitates bot updates:
+opens a connection, builds an `Account` and either creates an event
+or reads a day of events, like the polling threads, the notifications thread
+and webhook workers do against a single database file.
+
+python -m benchmarks.sqlite_profiles --threads 8 --operations 300 --writes 0.25
+"""
+
+import random
+import argparse
+from threading import Thread
+from time import perf_counter
+
+import config
+import notes_api.types
+from notes_api.exceptions import ApiError
+from benchmarks import temporary_database, create_users
+
+
+def worker(user_id: int, operations: int, writes: float, result: dict) -> None:
+    db = notes_api.types.db
+    rnd = random.Random(user_id)
+    latencies, errors = [], 0
+
+    for _ in range(operations):
+        date = f"{rnd.randint(1, 28):0>2}.{rnd.randint(1, 12):0>2}.2025"
+        start = perf_counter()
+        try:
+            with db.connect():
+                account = notes_api.types.Account(user_id)
+                if rnd.random() < writes:
+                    account.create_event(date, f"benchmark event {rnd.random()}")
+                else:
+                    db.execute(
+                        """
+SELECT event_id
+  FROM events
+ WHERE user_id IS :user_id
+       AND group_id IS NULL
+       AND date = :date;
+""",
+                        params={"user_id": user_id, "date": date},
+                    )
+        except ApiError:
+            errors += 1
+        latencies.append(perf_counter() - start)
+
+    result[user_id] = (latencies, errors)
+
+
+def run(profile_name: str, threads: int, operations: int, writes: float) -> None:
+    profile = config.sqlite_profiles[profile_name]
+
+    with temporary_database(profile):
+        user_ids = create_users(threads)
+        result: dict[int, tuple[list[float], int]] = {}
+        workers = [
+            Thread(target=worker, args=(user_id, operations, writes, result))
+            for user_id in user_ids
+        ]
+
+        start = perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = perf_counter() - start
+
+    latencies = sorted(x for lat, _ in result.values() for x in lat)
+    errors = sum(e for _, e in result.values())
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(
+        f"{profile_name:<10} {len(latencies) / elapsed:>10.1f} ops/s "
+        f"p50 {p50:>7.2f} ms  p99 {p99:>7.2f} ms  errors {errors}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=300)
+    parser.add_argument("--writes", type=float, default=0.25)
+    parser.add_argument("--profile", action="append", choices=config.sqlite_profiles)
+    args = parser.parse_args()
+
+    for profile_name in args.profile or config.sqlite_profiles:
+        run(profile_name, args.threads, args.operations, args.writes)
+
+
+if __name__ == "__main__":
+    main()
@@ -35,12 +35,30 @@ MIN_CALENDAR_YEAR: int = int(config.get("MIN_CALENDAR_YEAR", 1900))
 MAX_CALENDAR_YEAR: int = int(config.get("MAX_CALENDAR_YEAR", 2300))
 
 BOT_NOTIFICATIONS = config.get("BOT_NOTIFICATIONS", True)
+NOTIFICATIONS_WORKERS: int = int(config.get("NOTIFICATIONS_WORKERS", 4))
+NOTIFICATIONS_CATCH_UP_WORKERS: int = int(config.get("NOTIFICATIONS_CATCH_UP_WORKERS", 1))
+ACCOUNT_CACHE_TTL: int = int(config.get("ACCOUNT_CACHE_TTL", 60))
+CHAT_STATE_CACHE_SIZE: int = int(config.get("CHAT_STATE_CACHE_SIZE", 1000))
+PAGES_CACHE_SIZE: int = int(config.get("PAGES_CACHE_SIZE", 1000))
 LIMIT_IMAGE_GENERATOR_URL = config.get("LIMIT_IMAGE_GENERATOR_URL")
 
 TELEGRAM_WEBHOOK = config.get("TELEGRAM_WEBHOOK", False)
 TELEGRAM_WEBHOOK_URL = config.get("TELEGRAM_WEBHOOK_URL", "")
 TELEGRAM_WEBHOOK_FLASK_PATH = config.get("TELEGRAM_WEBHOOK_FLASK_PATH", "")
 TELEGRAM_WEBHOOK_SECRET_TOKEN = config.get("TELEGRAM_WEBHOOK_SECRET_TOKEN", "")
+TELEGRAM_WEBHOOK_WORKERS: int = int(config.get("TELEGRAM_WEBHOOK_WORKERS", 6))
+TELEGRAM_WEBHOOK_QUEUE_SIZE: int = int(config.get("TELEGRAM_WEBHOOK_QUEUE_SIZE", 1000))
+TELEGRAM_WEBHOOK_DRAIN_TIMEOUT: int = int(
+    config.get("TELEGRAM_WEBHOOK_DRAIN_TIMEOUT", 30)
+)
+POLLING_SHARDS: int = int(config.get("POLLING_SHARDS", 4))
+POLLING_SHARD_QUEUE_SIZE: int = int(config.get("POLLING_SHARD_QUEUE_SIZE", 100))
+POLLING_STATS_INTERVAL: int = int(config.get("POLLING_STATS_INTERVAL", 3600))
+SEND_SCHEDULER: bool = config.get("SEND_SCHEDULER", True)
+SEND_GLOBAL_RATE: float = float(config.get("SEND_GLOBAL_RATE", 30))
+SEND_CHAT_RATE: float = float(config.get("SEND_CHAT_RATE", 1))
+SEND_GROUP_RATE: float = float(config.get("SEND_GROUP_RATE", 20 / 60))
+SEND_CHAT_BURST: int = int(config.get("SEND_CHAT_BURST", 3))
 
 GITHUB_WEBHOOK = config.get("GITHUB_WEBHOOK", False)
 GITHUB_WEBHOOK_FLASK_PATH = config.get("GITHUB_WEBHOOK_FLASK_PATH", "")
@@ -54,6 +72,51 @@ if isinstance(SQLALCHEMY_DATABASE_URI, dict):
     except KeyError:
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI["master"]
 
+sqlite_profiles = {
+    # SQLite defaults, rollback journal
+    "default": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "busy_timeout": 5000,
+        "temp_store": "DEFAULT",
+        "cached_statements": 128,
+        "pool_size": 5,
+        "max_overflow": 10,
+    },
+    # Concurrent readers with a single writer.
+    # The database is then also in the -wal and -shm files next to it,
+    # copy it with `sqlite3 data/database.sqlite3 ".backup backup.sqlite3"`
+    # instead of copying the file alone
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,  # 256 MiB
+        "cache_size": -16000,  # 16 MiB
+        "busy_timeout": 15000,
+        "temp_store": "MEMORY",
+        "cached_statements": 512,
+        "pool_size": 8,
+        "max_overflow": 4,
+    },
+}
+"""
+Named SQLite engine profiles.
+PRAGMAs are applied to each new connection,
+cached_statements is the size of the sqlite3 prepared statement cache per connection,
+pool_size and max_overflow are applied to the engine pool.
+"""
+
+__sp = config.get("SQLITE_PROFILE", "default")
+if isinstance(__sp, dict):
+    SQLITE_PROFILE: dict = {
+        **sqlite_profiles[__sp.get("base", "default")],
+        **{k: v for k, v in __sp.items() if k != "base"},
+    }
+else:
+    SQLITE_PROFILE: dict = sqlite_profiles[__sp]
+
 if __wp:
     WSGI_PATH = Path(__wp)
 else:
@@ -100,34 +163,65 @@ Special transparent symbol for filling empty space in buttons
 "⠀" or chr(10240) or "\\u2800"
 """
 
+sql_days_before_event = """
+CASE recurrence_kind
+    WHEN 'daily' THEN 0
+    WHEN 'weekly' THEN (weekday - CAST(STRFTIME('%w', {today}) AS INT) + 7) % 7
+    WHEN 'monthly' THEN (
+        CASE
+            WHEN day >= CAST(STRFTIME('%d', {today}) AS INT)
+            THEN day - CAST(STRFTIME('%d', {today}) AS INT)
+            ELSE CAST(
+                JULIANDAY({today}, 'start of month', '+1 month', '+' || (day - 1) || ' days')
+                - JULIANDAY({today}) AS INT
+            )
+        END
+    )
+    WHEN 'yearly' THEN CAST(
+        JULIANDAY(
+            CASE
+                WHEN SUBSTR(iso_date, 6) >= STRFTIME('%m-%d', {today})
+                THEN STRFTIME('%Y', {today})
+                ELSE STRFTIME('%Y', {today}, '+1 year')
+            END || SUBSTR(iso_date, 5)
+        ) - JULIANDAY({today}) AS INT
+    )
+    ELSE CAST(JULIANDAY(iso_date) - JULIANDAY({today}) AS INT)
+END
+""".strip()
+"""
+The number of days before the next occurrence of the event, like Event.days_before_event.
+{today} is an SQL date expression, see notes_api.utils.sql_order
+"""
+
 sql_order_dict = {
-    "usual": """
-ABS(DAYS_BEFORE_EVENT(date, statuses)) ASC, -- Близость к текущему дню
-DAYS_BEFORE_EVENT(date, statuses) DESC,    -- Будущие события перед прошедшими
-CASE
-    WHEN statuses LIKE '%🟥%' THEN 1
-    WHEN statuses LIKE '%📬%' THEN 2
-    WHEN statuses LIKE '%🗞%' THEN 3
-    WHEN statuses LIKE '%📅%' THEN 4
-    WHEN statuses LIKE '%📆%' THEN 5
-    WHEN statuses LIKE '%🎉%' THEN 6
-    WHEN statuses LIKE '%🎊%' THEN 7
-    ELSE 8
-END ASC, -- Приоритет статусов
+    "usual": f"""
+ABS({sql_days_before_event}) ASC, -- Близость к текущему дню
+{sql_days_before_event} DESC,    -- Будущие события перед прошедшими
+status_priority ASC, -- Приоритет статусов
+IFNULL(recent_changes_time, adding_time) DESC,
+event_id DESC -- Если параметры совпадают, сортировать по большему event_id
+""",
+    "search": f"""
+(
+    WITH ranked AS MATERIALIZED (
+        SELECT rowid AS event_rowid,
+               bm25(events_fts, 0.0, 1.0, 10.0, 5.0) AS rank
+          FROM events_fts
+         WHERE events_fts MATCH :fts_query -- notes_bot.utils.generate_search_sql_condition
+    )
+    SELECT rank
+      FROM ranked
+     WHERE event_rowid = events.rowid
+) ASC, -- Релевантность поиска
+ABS({sql_days_before_event}) ASC, -- Близость к текущему дню
+{sql_days_before_event} DESC,    -- Будущие события перед прошедшими
+status_priority ASC, -- Приоритет статусов
 IFNULL(recent_changes_time, adding_time) DESC,
 event_id DESC -- Если параметры совпадают, сортировать по большему event_id
 """,
     "day": """
-CASE
-    WHEN statuses LIKE '%🟥%' THEN 1
-    WHEN statuses LIKE '%📬%' THEN 2
-    WHEN statuses LIKE '%🗞%' THEN 3
-    WHEN statuses LIKE '%📅%' THEN 4
-    WHEN statuses LIKE '%📆%' THEN 5
-    WHEN statuses LIKE '%🎉%' THEN 6
-    WHEN statuses LIKE '%🎊%' THEN 7
-    ELSE 8
-END ASC, -- Приоритет статусов
+status_priority ASC, -- Приоритет статусов
 IFNULL(recent_changes_time, adding_time) DESC,
 event_id DESC -- Если параметры совпадают, сортировать по большему event_id
 """,
@@ -71,6 +71,8 @@ CREATE TABLE IF NOT EXISTS tg_settings (
     notifications      INT  CHECK (notifications IN (0, 1, 2)) DEFAULT (0),
     notifications_time TEXT DEFAULT '08:00',
     theme              INT  DEFAULT (0),
+    -- notifications_time in UTC, minutes since midnight
+    utc_minute_of_day  INT  GENERATED ALWAYS AS ((CAST(SUBSTR(notifications_time, 1, 2) AS INT) * 60 + CAST(SUBSTR(notifications_time, 4, 2) AS INT) - timezone * 60 + 1440) % 1440) VIRTUAL,
     FOREIGN KEY (user_id) REFERENCES users(user_id),
     FOREIGN KEY (group_id) REFERENCES groups(group_id)
 );
@@ -88,6 +90,22 @@ CREATE TABLE IF NOT EXISTS events (
     recent_changes_time TEXT DEFAULT NULL,
     removal_time        TEXT DEFAULT NULL,
     history             TEXT DEFAULT '[]',
+    -- Generated from date (dd.mm.yyyy) so that date lookups can use indexes
+    iso_date            TEXT GENERATED ALWAYS AS (SUBSTR(date, 7, 4) || '-' || SUBSTR(date, 4, 2) || '-' || SUBSTR(date, 1, 2)) VIRTUAL,
+    year                INT  GENERATED ALWAYS AS (CAST(SUBSTR(date, 7, 4) AS INT)) VIRTUAL,
+    month               INT  GENERATED ALWAYS AS (CAST(SUBSTR(date, 4, 2) AS INT)) VIRTUAL,
+    day                 INT  GENERATED ALWAYS AS (CAST(SUBSTR(date, 1, 2) AS INT)) VIRTUAL,
+    weekday             INT  GENERATED ALWAYS AS (CAST(STRFTIME('%w', iso_date) AS INT)) VIRTUAL,  -- 0 is Sunday
+    -- 1 for every recurring status of the event, an event can have several of them
+    every_day           INT  GENERATED ALWAYS AS (statuses LIKE '%📬%') VIRTUAL,
+    every_week          INT  GENERATED ALWAYS AS (statuses LIKE '%🗞%') VIRTUAL,
+    every_month         INT  GENERATED ALWAYS AS (statuses LIKE '%📅%') VIRTUAL,
+    every_year          INT  GENERATED ALWAYS AS (statuses LIKE '%📆%' OR statuses LIKE '%🎉%' OR statuses LIKE '%🎊%') VIRTUAL,
+    -- Filled from statuses by trigger_event_recurrence_insert and trigger_event_recurrence_update.
+    -- The first recurrence in the order of Event.days_before_event, for sorting.
+    -- The other recurrences of the event are in every_*
+    recurrence_kind     TEXT DEFAULT NULL,  -- 'daily', 'weekly', 'monthly', 'yearly' or NULL
+    status_priority     INT  DEFAULT (8),   -- Sort priority of statuses, 1 is the highest
     CHECK (
         (user_id IS NOT NULL AND group_id IS NULL) OR
         (user_id IS NULL AND group_id IS NOT NULL)
@@ -144,6 +162,24 @@ CREATE TABLE IF NOT EXISTS frequently_used_dates (
     FOREIGN KEY (group_id) REFERENCES groups(group_id)
 );
 
+-- Number and length of events per owner and period for limits.
+-- Maintained by trigger_usage_counters_* and rebuilt by db_creator.rebuild_usage_counters
+CREATE TABLE IF NOT EXISTS usage_counters (
+    user_id      INT,
+    group_id     TEXT,
+    period       TEXT NOT NULL,  -- 'yyyy-mm-dd', 'yyyy-mm', 'yyyy' or 'all'
+    event_count  INT  NOT NULL DEFAULT 0,
+    symbol_count INT  NOT NULL DEFAULT 0,
+    CHECK (
+        (user_id IS NOT NULL AND group_id IS NULL) OR
+        (user_id IS NULL AND group_id IS NOT NULL)
+    ),
+    UNIQUE (user_id, period),
+    UNIQUE (group_id, period),
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (group_id) REFERENCES groups(group_id)
+);
+
 CREATE TABLE IF NOT EXISTS chat_states (
     chat_id    INT,
     state_type TEXT,
@@ -151,6 +187,58 @@ CREATE TABLE IF NOT EXISTS chat_states (
     PRIMARY KEY (chat_id, state_type)
 );
 
+-- Notifications sent (or being sent) to a chat, one per day of the recipient and kind
+CREATE TABLE IF NOT EXISTS notification_deliveries (
+    chat_id       INT  NOT NULL,
+    local_date    TEXT NOT NULL,  -- YYYY-MM-DD in the timezone of the recipient
+    kind          INT  NOT NULL,  -- tg_settings.notifications
+    status        TEXT NOT NULL,  -- 'sending', 'sent', 'empty' or 'failed'
+    delivery_time TEXT NOT NULL DEFAULT (DATETIME()),
+    PRIMARY KEY (chat_id, local_date, kind)
+) WITHOUT ROWID;
+
+-- Live events per owner for the calendar keyboards, the rows of one screen
+-- are read by primary key whatever the number of events is.
+-- Maintained by trigger_calendar_counts_* and rebuilt by db_creator.rebuild_calendar_counts
+CREATE TABLE IF NOT EXISTS calendar_counts (
+    owner      TEXT NOT NULL,  -- 'u' || user_id or 'g' || group_id
+    kind       TEXT NOT NULL,  -- 'day', 'month', 'year' or 'yearly', 'monthly', 'weekly' for every_year, every_month, every_week
+    year       INT  NOT NULL,  -- 0 for recurrences
+    month      INT  NOT NULL,  -- 0 for 'year', 'monthly' and 'weekly'
+    day        INT  NOT NULL,  -- 0 for 'month' and 'year', weekday for 'weekly' (0 is Sunday)
+    live_count INT  NOT NULL DEFAULT 0,  -- Events that are not in the trash
+    PRIMARY KEY (owner, kind, year, month, day)
+) WITHOUT ROWID;
+
+-- Incremented by trigger_events_versions_* on every change of the events of an owner.
+-- The cached page splits of notes_bot.message_generator are valid while it is the same.
+CREATE TABLE IF NOT EXISTS events_versions (
+    owner   TEXT PRIMARY KEY,  -- 'u' || user_id or 'g' || group_id
+    version INT  NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+-- Incremented by trigger_account_versions_* on every change of the users, groups,
+-- members and tg_settings rows of an owner.
+-- The cached accounts of notes_bot.types are valid while it is the same.
+CREATE TABLE IF NOT EXISTS account_versions (
+    owner   TEXT PRIMARY KEY,  -- 'u' || user_id or 'g' || group_id
+    version INT  NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+-- Full-text index for search. Contentless, filled by trigger_events_fts_*
+-- and rebuilt by db_creator.rebuild_events_fts.
+-- owner is 'u' || user_id or 'g' || group_id, so MATCH only looks at one owner.
+-- So (other symbols) are token characters so that status emoji can be found.
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+    owner,
+    date,
+    text,
+    statuses,
+    content='',
+    prefix='2 3',
+    tokenize="unicode61 remove_diacritics 2 categories 'L* N* Co So'"
+);
+
 ------------------------------------------------------------------------------------------------------------------------
 
 -- When deleting a user, we delete all rows associated with it.
@@ -230,6 +318,439 @@ BEGIN
        AND JSON_ARRAY_LENGTH(history) > 30;
 END;
 
+-- Recurrence and sort priority of a new event
+-- The order of recurrences is the same as in Event.days_before_event
+CREATE TRIGGER IF NOT EXISTS trigger_event_recurrence_insert
+AFTER INSERT ON events FOR EACH ROW
+BEGIN
+    UPDATE events
+       SET recurrence_kind = CASE
+               WHEN NEW.statuses LIKE '%📬%' THEN 'daily'
+               WHEN NEW.statuses LIKE '%🗞%' THEN 'weekly'
+               WHEN NEW.statuses LIKE '%📅%' THEN 'monthly'
+               WHEN NEW.statuses LIKE '%📆%'
+                    OR NEW.statuses LIKE '%🎉%'
+                    OR NEW.statuses LIKE '%🎊%' THEN 'yearly'
+           END,
+           status_priority = CASE
+               WHEN NEW.statuses LIKE '%🟥%' THEN 1
+               WHEN NEW.statuses LIKE '%📬%' THEN 2
+               WHEN NEW.statuses LIKE '%🗞%' THEN 3
+               WHEN NEW.statuses LIKE '%📅%' THEN 4
+               WHEN NEW.statuses LIKE '%📆%' THEN 5
+               WHEN NEW.statuses LIKE '%🎉%' THEN 6
+               WHEN NEW.statuses LIKE '%🎊%' THEN 7
+               ELSE 8
+           END
+     WHERE rowid = NEW.rowid;
+END;
+
+-- Recurrence and sort priority after changing statuses
+CREATE TRIGGER IF NOT EXISTS trigger_event_recurrence_update
+AFTER UPDATE OF statuses ON events FOR EACH ROW
+BEGIN
+    UPDATE events
+       SET recurrence_kind = CASE
+               WHEN NEW.statuses LIKE '%📬%' THEN 'daily'
+               WHEN NEW.statuses LIKE '%🗞%' THEN 'weekly'
+               WHEN NEW.statuses LIKE '%📅%' THEN 'monthly'
+               WHEN NEW.statuses LIKE '%📆%'
+                    OR NEW.statuses LIKE '%🎉%'
+                    OR NEW.statuses LIKE '%🎊%' THEN 'yearly'
+           END,
+           status_priority = CASE
+               WHEN NEW.statuses LIKE '%🟥%' THEN 1
+               WHEN NEW.statuses LIKE '%📬%' THEN 2
+               WHEN NEW.statuses LIKE '%🗞%' THEN 3
+               WHEN NEW.statuses LIKE '%📅%' THEN 4
+               WHEN NEW.statuses LIKE '%📆%' THEN 5
+               WHEN NEW.statuses LIKE '%🎉%' THEN 6
+               WHEN NEW.statuses LIKE '%🎊%' THEN 7
+               ELSE 8
+           END
+     WHERE rowid = NEW.rowid;
+END;
+
+-- Moving the owner's next event_id past the inserted event
+CREATE TRIGGER IF NOT EXISTS trigger_event_max_event_id
+AFTER INSERT ON events FOR EACH ROW
+BEGIN
+    UPDATE users
+       SET max_event_id = MAX(max_event_id, NEW.event_id + 1)
+     WHERE user_id = NEW.user_id;
+
+    UPDATE groups
+       SET max_event_id = MAX(max_event_id, NEW.event_id + 1)
+     WHERE group_id = NEW.group_id;
+END;
+
+-- Counting a new event in usage_counters
+CREATE TRIGGER IF NOT EXISTS trigger_usage_counters_insert
+AFTER INSERT ON events FOR EACH ROW
+BEGIN
+    INSERT INTO usage_counters (user_id, group_id, period, event_count, symbol_count)
+    SELECT NEW.user_id, NEW.group_id, period, 1, LENGTH(NEW.text)
+      FROM (
+          SELECT NEW.iso_date AS period
+          UNION ALL SELECT SUBSTR(NEW.iso_date, 1, 7)
+          UNION ALL SELECT SUBSTR(NEW.iso_date, 1, 4)
+          UNION ALL SELECT 'all'
+      )
+     WHERE TRUE
+    ON CONFLICT (user_id, period) DO
+    UPDATE
+       SET event_count = event_count + excluded.event_count,
+           symbol_count = symbol_count + excluded.symbol_count
+    ON CONFLICT (group_id, period) DO
+    UPDATE
+       SET event_count = event_count + excluded.event_count,
+           symbol_count = symbol_count + excluded.symbol_count;
+END;
+
+-- Moving an event to another date or changing its text in usage_counters
+CREATE TRIGGER IF NOT EXISTS trigger_usage_counters_update
+AFTER UPDATE OF date, text ON events FOR EACH ROW
+BEGIN
+    UPDATE usage_counters
+       SET event_count = event_count - 1,
+           symbol_count = symbol_count - LENGTH(OLD.text)
+     WHERE user_id IS OLD.user_id
+           AND group_id IS OLD.group_id
+           AND period IN (OLD.iso_date, SUBSTR(OLD.iso_date, 1, 7), SUBSTR(OLD.iso_date, 1, 4), 'all');
+
+    INSERT INTO usage_counters (user_id, group_id, period, event_count, symbol_count)
+    SELECT NEW.user_id, NEW.group_id, period, 1, LENGTH(NEW.text)
+      FROM (
+          SELECT NEW.iso_date AS period
+          UNION ALL SELECT SUBSTR(NEW.iso_date, 1, 7)
+          UNION ALL SELECT SUBSTR(NEW.iso_date, 1, 4)
+          UNION ALL SELECT 'all'
+      )
+     WHERE TRUE
+    ON CONFLICT (user_id, period) DO
+    UPDATE
+       SET event_count = event_count + excluded.event_count,
+           symbol_count = symbol_count + excluded.symbol_count
+    ON CONFLICT (group_id, period) DO
+    UPDATE
+       SET event_count = event_count + excluded.event_count,
+           symbol_count = symbol_count + excluded.symbol_count;
+
+    DELETE FROM usage_counters
+          WHERE user_id IS OLD.user_id
+                AND group_id IS OLD.group_id
+                AND event_count = 0;
+END;
+
+-- Removing a deleted event from usage_counters
+CREATE TRIGGER IF NOT EXISTS trigger_usage_counters_delete
+AFTER DELETE ON events FOR EACH ROW
+BEGIN
+    UPDATE usage_counters
+       SET event_count = event_count - 1,
+           symbol_count = symbol_count - LENGTH(OLD.text)
+     WHERE user_id IS OLD.user_id
+           AND group_id IS OLD.group_id
+           AND period IN (OLD.iso_date, SUBSTR(OLD.iso_date, 1, 7), SUBSTR(OLD.iso_date, 1, 4), 'all');
+
+    DELETE FROM usage_counters
+          WHERE user_id IS OLD.user_id
+                AND group_id IS OLD.group_id
+                AND event_count = 0;
+END;
+
+-- Keeping events_fts in sync with events
+CREATE TRIGGER IF NOT EXISTS trigger_events_fts_insert
+AFTER INSERT ON events FOR EACH ROW
+BEGIN
+    INSERT INTO events_fts (rowid, owner, date, text, statuses)
+    VALUES (
+        NEW.rowid,
+        IIF(NEW.user_id IS NOT NULL, 'u' || NEW.user_id, 'g' || NEW.group_id),
+        NEW.date,
+        NEW.text,
+        NEW.statuses
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_events_fts_update
+AFTER UPDATE OF date, text, statuses ON events FOR EACH ROW
+BEGIN
+    INSERT INTO events_fts (events_fts, rowid, owner, date, text, statuses)
+    VALUES (
+        'delete',
+        OLD.rowid,
+        IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id),
+        OLD.date,
+        OLD.text,
+        OLD.statuses
+    );
+    INSERT INTO events_fts (rowid, owner, date, text, statuses)
+    VALUES (
+        NEW.rowid,
+        IIF(NEW.user_id IS NOT NULL, 'u' || NEW.user_id, 'g' || NEW.group_id),
+        NEW.date,
+        NEW.text,
+        NEW.statuses
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_events_fts_delete
+AFTER DELETE ON events FOR EACH ROW
+BEGIN
+    INSERT INTO events_fts (events_fts, rowid, owner, date, text, statuses)
+    VALUES (
+        'delete',
+        OLD.rowid,
+        IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id),
+        OLD.date,
+        OLD.text,
+        OLD.statuses
+    );
+END;
+
+-- Counting a new event in calendar_counts, one row for each recurrence
+CREATE TRIGGER IF NOT EXISTS trigger_calendar_counts_insert
+AFTER INSERT ON events FOR EACH ROW
+WHEN NEW.removal_time IS NULL
+BEGIN
+    INSERT INTO calendar_counts (owner, kind, year, month, day, live_count)
+    SELECT IIF(NEW.user_id IS NOT NULL, 'u' || NEW.user_id, 'g' || NEW.group_id),
+           kind,
+           year,
+           month,
+           day,
+           1
+      FROM (
+          SELECT 'day' AS kind, NEW.year AS year, NEW.month AS month, NEW.day AS day
+          UNION ALL SELECT 'month', NEW.year, NEW.month, 0
+          UNION ALL SELECT 'year', NEW.year, 0, 0
+          UNION ALL SELECT 'yearly', 0, NEW.month, NEW.day WHERE NEW.every_year
+          UNION ALL SELECT 'monthly', 0, 0, NEW.day WHERE NEW.every_month
+          UNION ALL SELECT 'weekly', 0, 0, NEW.weekday WHERE NEW.every_week
+      )
+     WHERE NEW.removal_time IS NULL
+    ON CONFLICT DO
+    UPDATE
+       SET live_count = live_count + excluded.live_count;
+END;
+
+-- Moving an event to another date, changing its recurrences,
+-- moving it to the trash and restoring it in calendar_counts.
+CREATE TRIGGER IF NOT EXISTS trigger_calendar_counts_update
+AFTER UPDATE OF date, statuses, removal_time ON events FOR EACH ROW
+WHEN OLD.date IS NOT NEW.date
+     OR OLD.every_year IS NOT NEW.every_year
+     OR OLD.every_month IS NOT NEW.every_month
+     OR OLD.every_week IS NOT NEW.every_week
+     OR (OLD.removal_time IS NULL) != (NEW.removal_time IS NULL)
+BEGIN
+    INSERT INTO calendar_counts (owner, kind, year, month, day, live_count)
+    SELECT IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id),
+           kind,
+           year,
+           month,
+           day,
+           -1
+      FROM (
+          SELECT 'day' AS kind, OLD.year AS year, OLD.month AS month, OLD.day AS day
+          UNION ALL SELECT 'month', OLD.year, OLD.month, 0
+          UNION ALL SELECT 'year', OLD.year, 0, 0
+          UNION ALL SELECT 'yearly', 0, OLD.month, OLD.day WHERE OLD.every_year
+          UNION ALL SELECT 'monthly', 0, 0, OLD.day WHERE OLD.every_month
+          UNION ALL SELECT 'weekly', 0, 0, OLD.weekday WHERE OLD.every_week
+      )
+     WHERE OLD.removal_time IS NULL
+    ON CONFLICT DO
+    UPDATE
+       SET live_count = live_count + excluded.live_count;
+
+    INSERT INTO calendar_counts (owner, kind, year, month, day, live_count)
+    SELECT IIF(NEW.user_id IS NOT NULL, 'u' || NEW.user_id, 'g' || NEW.group_id),
+           kind,
+           year,
+           month,
+           day,
+           1
+      FROM (
+          SELECT 'day' AS kind, NEW.year AS year, NEW.month AS month, NEW.day AS day
+          UNION ALL SELECT 'month', NEW.year, NEW.month, 0
+          UNION ALL SELECT 'year', NEW.year, 0, 0
+          UNION ALL SELECT 'yearly', 0, NEW.month, NEW.day WHERE NEW.every_year
+          UNION ALL SELECT 'monthly', 0, 0, NEW.day WHERE NEW.every_month
+          UNION ALL SELECT 'weekly', 0, 0, NEW.weekday WHERE NEW.every_week
+      )
+     WHERE NEW.removal_time IS NULL
+    ON CONFLICT DO
+    UPDATE
+       SET live_count = live_count + excluded.live_count;
+
+    DELETE FROM calendar_counts
+          WHERE owner = IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id)
+                AND live_count = 0
+                AND (kind, year) IN (
+                    VALUES ('day', OLD.year), ('month', OLD.year), ('year', OLD.year),
+                           ('day', NEW.year), ('month', NEW.year), ('year', NEW.year),
+                           ('yearly', 0), ('monthly', 0), ('weekly', 0)
+                );
+END;
+
+-- Removing a deleted event from calendar_counts
+CREATE TRIGGER IF NOT EXISTS trigger_calendar_counts_delete
+AFTER DELETE ON events FOR EACH ROW
+WHEN OLD.removal_time IS NULL
+BEGIN
+    INSERT INTO calendar_counts (owner, kind, year, month, day, live_count)
+    SELECT IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id),
+           kind,
+           year,
+           month,
+           day,
+           -1
+      FROM (
+          SELECT 'day' AS kind, OLD.year AS year, OLD.month AS month, OLD.day AS day
+          UNION ALL SELECT 'month', OLD.year, OLD.month, 0
+          UNION ALL SELECT 'year', OLD.year, 0, 0
+          UNION ALL SELECT 'yearly', 0, OLD.month, OLD.day WHERE OLD.every_year
+          UNION ALL SELECT 'monthly', 0, 0, OLD.day WHERE OLD.every_month
+          UNION ALL SELECT 'weekly', 0, 0, OLD.weekday WHERE OLD.every_week
+      )
+     WHERE OLD.removal_time IS NULL
+    ON CONFLICT DO
+    UPDATE
+       SET live_count = live_count + excluded.live_count;
+
+    DELETE FROM calendar_counts
+          WHERE owner = IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id)
+                AND live_count = 0
+                AND (kind, year) IN (
+                    VALUES ('day', OLD.year), ('month', OLD.year), ('year', OLD.year),
+                           ('yearly', 0), ('monthly', 0), ('weekly', 0)
+                );
+END;
+
+-- Invalidating the cached page splits of the owner
+CREATE TRIGGER IF NOT EXISTS trigger_events_versions_insert
+AFTER INSERT ON events FOR EACH ROW
+BEGIN
+    INSERT INTO events_versions (owner, version)
+    VALUES (IIF(NEW.user_id IS NOT NULL, 'u' || NEW.user_id, 'g' || NEW.group_id), 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_events_versions_update
+AFTER UPDATE ON events FOR EACH ROW
+BEGIN
+    INSERT INTO events_versions (owner, version)
+    VALUES (IIF(NEW.user_id IS NOT NULL, 'u' || NEW.user_id, 'g' || NEW.group_id), 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_events_versions_delete
+AFTER DELETE ON events FOR EACH ROW
+BEGIN
+    INSERT INTO events_versions (owner, version)
+    VALUES (IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id), 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+-- Invalidating the cached accounts of the owner
+-- Not on max_event_id, trigger_event_max_event_id changes it on every new event
+-- and the cached accounts do not use it
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_users_update
+AFTER UPDATE OF user_id, token, username, password, email, user_status, icon,
+                reg_date, token_create_time, chat_id ON users FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES ('u' || OLD.user_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_users_delete
+AFTER DELETE ON users FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES ('u' || OLD.user_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_groups_update
+AFTER UPDATE OF group_id, name, token, token_create_time, owner_id, icon,
+                chat_id ON groups FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES ('g' || OLD.group_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_groups_delete
+AFTER DELETE ON groups FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES ('g' || OLD.group_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_members_insert
+AFTER INSERT ON members FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES ('u' || NEW.user_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+
+    INSERT INTO account_versions (owner, version)
+    VALUES ('g' || NEW.group_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_members_update
+AFTER UPDATE ON members FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES ('u' || OLD.user_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+
+    INSERT INTO account_versions (owner, version)
+    VALUES ('g' || OLD.group_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_members_delete
+AFTER DELETE ON members FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES ('u' || OLD.user_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+
+    INSERT INTO account_versions (owner, version)
+    VALUES ('g' || OLD.group_id, 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_tg_settings_insert
+AFTER INSERT ON tg_settings FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES (IIF(NEW.user_id IS NOT NULL, 'u' || NEW.user_id, 'g' || NEW.group_id), 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_tg_settings_update
+AFTER UPDATE ON tg_settings FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES (IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id), 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trigger_account_versions_tg_settings_delete
+AFTER DELETE ON tg_settings FOR EACH ROW
+BEGIN
+    INSERT INTO account_versions (owner, version)
+    VALUES (IIF(OLD.user_id IS NOT NULL, 'u' || OLD.user_id, 'g' || OLD.group_id), 1)
+        ON CONFLICT (owner) DO UPDATE SET version = version + 1;
+END;
+
 -- When deleting an event, we delete the media belonging to this event.
 CREATE TRIGGER IF NOT EXISTS trigger_delete_event_media
 AFTER DELETE ON events FOR EACH ROW
@@ -286,3 +807,14 @@ END;
 
 -- index
 CREATE INDEX IF NOT EXISTS index_event_search ON events (user_id, group_id, event_id, date);
+CREATE INDEX IF NOT EXISTS index_event_iso_date ON events (user_id, group_id, iso_date);
+CREATE INDEX IF NOT EXISTS index_event_year_month_day ON events (user_id, group_id, year, month, day);
+CREATE INDEX IF NOT EXISTS index_event_month_day ON events (user_id, group_id, month, day);
+-- The recurring events of a date are found without reading the other ones,
+-- every_* of the few recurring events of the owner are checked on the rows
+CREATE INDEX IF NOT EXISTS index_event_live_recurring_days ON events (user_id, group_id, month, day, weekday) WHERE removal_time IS NULL AND recurrence_kind IS NOT NULL;
+CREATE INDEX IF NOT EXISTS index_event_removal_time ON events (removal_time) WHERE removal_time IS NOT NULL;
+CREATE INDEX IF NOT EXISTS index_member_user ON members (user_id, group_id, member_status);
+CREATE INDEX IF NOT EXISTS index_member_group ON members (group_id, user_id);
+CREATE INDEX IF NOT EXISTS index_group_owner ON groups (owner_id);
+CREATE INDEX IF NOT EXISTS index_tg_settings_utc_minute ON tg_settings (utc_minute_of_day) WHERE notifications != 0;
@@ -1,6 +1,182 @@
 from notes_api.types import db
 
+# Columns added after the table was created.
+# `CREATE TABLE IF NOT EXISTS` doesn't change existing databases,
+# so they are added with `ALTER TABLE` before db_create.sql is executed.
+# Only VIRTUAL generated columns can be added this way.
+added_columns = {
+    "events": {
+        "iso_date": "TEXT GENERATED ALWAYS AS (SUBSTR(date, 7, 4) || '-' || SUBSTR(date, 4, 2) || '-' || SUBSTR(date, 1, 2)) VIRTUAL",
+        "year": "INT GENERATED ALWAYS AS (CAST(SUBSTR(date, 7, 4) AS INT)) VIRTUAL",
+        "month": "INT GENERATED ALWAYS AS (CAST(SUBSTR(date, 4, 2) AS INT)) VIRTUAL",
+        "day": "INT GENERATED ALWAYS AS (CAST(SUBSTR(date, 1, 2) AS INT)) VIRTUAL",
+        "weekday": "INT GENERATED ALWAYS AS (CAST(STRFTIME('%w', iso_date) AS INT)) VIRTUAL",
+        "every_day": "INT GENERATED ALWAYS AS (statuses LIKE '%📬%') VIRTUAL",
+        "every_week": "INT GENERATED ALWAYS AS (statuses LIKE '%🗞%') VIRTUAL",
+        "every_month": "INT GENERATED ALWAYS AS (statuses LIKE '%📅%') VIRTUAL",
+        "every_year": "INT GENERATED ALWAYS AS (statuses LIKE '%📆%' OR statuses LIKE '%🎉%' OR statuses LIKE '%🎊%') VIRTUAL",
+        "recurrence_kind": "TEXT DEFAULT NULL",
+        "status_priority": "INT DEFAULT (8)",
+    },
+    "tg_settings": {
+        "utc_minute_of_day": "INT GENERATED ALWAYS AS ((CAST(SUBSTR(notifications_time, 1, 2) AS INT) * 60 + CAST(SUBSTR(notifications_time, 4, 2) AS INT) - timezone * 60 + 1440) % 1440) VIRTUAL",
+    },
+}
+# Fills an added column for existing rows, executed once right after `ALTER TABLE`.
+# New rows are handled by triggers from db_create.sql
+added_columns_backfill = {
+    ("events", "recurrence_kind"): """
+UPDATE events
+   SET recurrence_kind = CASE
+           WHEN statuses LIKE '%📬%' THEN 'daily'
+           WHEN statuses LIKE '%🗞%' THEN 'weekly'
+           WHEN statuses LIKE '%📅%' THEN 'monthly'
+           WHEN statuses LIKE '%📆%'
+                OR statuses LIKE '%🎉%'
+                OR statuses LIKE '%🎊%' THEN 'yearly'
+       END;
+""",
+    ("events", "status_priority"): """
+UPDATE events
+   SET status_priority = CASE
+           WHEN statuses LIKE '%🟥%' THEN 1
+           WHEN statuses LIKE '%📬%' THEN 2
+           WHEN statuses LIKE '%🗞%' THEN 3
+           WHEN statuses LIKE '%📅%' THEN 4
+           WHEN statuses LIKE '%📆%' THEN 5
+           WHEN statuses LIKE '%🎉%' THEN 6
+           WHEN statuses LIKE '%🎊%' THEN 7
+           ELSE 8
+       END;
+""",
+}
+
+
+def migrate_tables() -> None:
+    for table, columns in added_columns.items():
+        existing_columns = {
+            column[1] for column in db.execute(f"PRAGMA table_xinfo({table});")
+        }
+        if not existing_columns:  # The table will be created by db_create.sql
+            continue
+
+        for name, definition in columns.items():
+            if name not in existing_columns:
+                db.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {name} {definition};",
+                    commit=True,
+                )
+                if (table, name) in added_columns_backfill:
+                    db.execute(added_columns_backfill[table, name], commit=True)
+
+
+def rebuild_usage_counters() -> None:
+    """
+    Recalculates usage_counters from events.
+    Triggers keep it exact, this is for databases created before the table
+    and for checking consistency after manual changes.
+    """
+    db.execute("DELETE FROM usage_counters;")
+    db.execute(
+        """
+INSERT INTO usage_counters (user_id, group_id, period, event_count, symbol_count)
+SELECT user_id,
+       group_id,
+       period,
+       COUNT( * ),
+       SUM(LENGTH(text))
+  FROM (
+      SELECT user_id, group_id, iso_date AS period, text FROM events
+      UNION ALL
+      SELECT user_id, group_id, SUBSTR(iso_date, 1, 7), text FROM events
+      UNION ALL
+      SELECT user_id, group_id, SUBSTR(iso_date, 1, 4), text FROM events
+      UNION ALL
+      SELECT user_id, group_id, 'all', text FROM events
+  )
+ GROUP BY user_id, group_id, period;
+""",
+        commit=True,
+    )
+
+
+def rebuild_events_fts() -> None:
+    """
+    Refills the events_fts search index from events.
+    For databases created before the index.
+    """
+    db.execute("INSERT INTO events_fts (events_fts) VALUES ('delete-all');")
+    db.execute(
+        """
+INSERT INTO events_fts (rowid, owner, date, text, statuses)
+SELECT rowid,
+       IIF(user_id IS NOT NULL, 'u' || user_id, 'g' || group_id),
+       date,
+       text,
+       statuses
+  FROM events;
+""",
+        commit=True,
+    )
+
+
+def rebuild_calendar_counts() -> None:
+    """
+    Recalculates calendar_counts from events.
+    Triggers keep it exact, this is for databases created before the table
+    and for checking consistency after manual changes.
+    """
+    db.execute("DELETE FROM calendar_counts;")
+    db.execute(
+        """
+INSERT INTO calendar_counts (owner, kind, year, month, day, live_count)
+  WITH live_events AS (
+      SELECT IIF(user_id IS NOT NULL, 'u' || user_id, 'g' || group_id) AS owner,
+             year,
+             month,
+             day,
+             weekday,
+             every_year,
+             every_month,
+             every_week
+        FROM events
+       WHERE removal_time IS NULL
+  )
+SELECT owner,
+       kind,
+       year,
+       month,
+       day,
+       COUNT( * )
+  FROM (
+      SELECT owner, 'day' AS kind, year, month, day FROM live_events
+      UNION ALL
+      SELECT owner, 'month', year, month, 0 FROM live_events
+      UNION ALL
+      SELECT owner, 'year', year, 0, 0 FROM live_events
+      UNION ALL
+      SELECT owner, 'yearly', 0, month, day FROM live_events WHERE every_year
+      UNION ALL
+      SELECT owner, 'monthly', 0, 0, day FROM live_events WHERE every_month
+      UNION ALL
+      SELECT owner, 'weekly', 0, 0, weekday FROM live_events WHERE every_week
+  )
+ GROUP BY owner, kind, year, month, day;
+""",
+        commit=True,
+    )
+
 
 def create_tables() -> None:
     with db.connect(), open("notes_api/db_create.sql") as file:
+        migrate_tables()
+        new_usage_counters = not db.execute("PRAGMA table_info(usage_counters);")
+        new_events_fts = not db.execute("PRAGMA table_info(events_fts);")
+        new_calendar_counts = not db.execute("PRAGMA table_info(calendar_counts);")
         db.execute(file.read(), commit=True, script=True)
+        if new_usage_counters:
+            rebuild_usage_counters()
+        if new_events_fts:
+            rebuild_events_fts()
+        if new_calendar_counts:
+            rebuild_calendar_counts()
@@ -3,20 +3,21 @@ import json
 from uuid import uuid4
 import xml.etree.ElementTree as xml  # noqa
 from sqlite3 import Error
-from cachetools import LFUCache
+from threading import Lock
+from cachetools import LRUCache
 from collections import UserList
 from io import StringIO, BytesIO
 from dataclasses import dataclass
 from contextlib import contextmanager
-from typing import Callable, Any, Literal
+from typing import Callable, Any, Iterator, Literal
 from functools import cached_property, wraps
 from datetime import datetime, timedelta, timezone
 
 # noinspection PyPackageRequirements
 from contextvars import ContextVar
 
-from sqlalchemy import create_engine, text as sqlalchemy_text, event
-from sqlalchemy.engine import Engine, Connection, CursorResult
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, Connection
 
 import config
 from notes_api.exceptions import (
@@ -39,6 +40,7 @@ from notes_api.exceptions import (
 )
 from notes_api.utils import (
     re_date,
+    sql_order,
     re_username,
     hash_password,
     is_valid_year,
@@ -113,15 +115,67 @@ _current_connection: ContextVar[Connection | None] = ContextVar(
     "connection",
     default=None,
 )
-engine: Engine = create_engine(config.SQLALCHEMY_DATABASE_URI, echo=False)
+_transaction_depth: ContextVar[int] = ContextVar("transaction_depth", default=0)
+_transaction_callbacks: ContextVar[list[Callable[[], Any]] | None] = ContextVar(
+    "transaction_callbacks",
+    default=None,
+)
+sqlite_pragmas = (
+    "journal_mode",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "busy_timeout",
+    "temp_store",
+)
+
+
+def create_sqlite_engine(url: str, profile: dict | None = None) -> Engine:
+    """
+    Creates an engine with a connection pool sized by the profile.
+    PRAGMAs are applied by `DataBase` on every new connection.
+
+    :param url: SQLAlchemy database url
+    :param profile: One of `config.sqlite_profiles`, defaults to `config.SQLITE_PROFILE`
+    """
+    profile = config.SQLITE_PROFILE if profile is None else profile
+    pool_kwargs = {}
+
+    if ":memory:" not in url and url.rstrip("/") != "sqlite:":
+        pool_kwargs = {
+            "pool_size": int(profile.get("pool_size", 5)),
+            "max_overflow": int(profile.get("max_overflow", 10)),
+        }
+
+    return create_engine(
+        url,
+        echo=False,
+        connect_args={"cached_statements": int(profile.get("cached_statements", 128))},
+        **pool_kwargs,
+    )
+
+
+engine: Engine = create_sqlite_engine(config.SQLALCHEMY_DATABASE_URI)
 
 
 class DataBase:
-    def __init__(self):
+    _statements: dict[str, str] = {}
+
+    def __init__(self, profile: dict | None = None):
         self._functions: dict[str, tuple[int, Callable]] = {}
+        self.profile = config.SQLITE_PROFILE if profile is None else profile
 
         @event.listens_for(engine, "connect")
         def register_functions(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in sqlite_pragmas:
+                if pragma in self.profile:
+                    value = str(self.profile[pragma])
+                    if not value.lstrip("-").isalnum():
+                        raise ValueError(f"Wrong value for PRAGMA {pragma}: {value!r}")
+                    cursor.execute(f"PRAGMA {pragma} = {value};")
+            cursor.close()
+
             for name, (argc, func) in self._functions.items():
                 dbapi_connection.create_function(name, argc, func)
 
@@ -134,6 +188,99 @@ class DataBase:
             finally:
                 _current_connection.reset(token)
 
+    @contextmanager
+    def transaction(self):
+        """
+        Groups several `execute` calls into one transaction.
+        Inside it `commit=True` does not commit, the changes are saved once on exit.
+        Nested calls (or a call inside an already open transaction) use SAVEPOINT,
+        so an exception rolls back only the changes of the inner block.
+
+        with db.connect(), db.transaction():
+            db.execute(..., commit=True)
+            with db.transaction():
+                db.execute(..., commit=True)
+        """
+        conn: Connection | None = _current_connection.get()
+        if conn is None:
+            raise RuntimeError("db connection is None. Use `with db.connect():`")
+
+        raw_conn = conn.connection
+        depth = _transaction_depth.get()
+        savepoint = None
+
+        if depth or raw_conn.in_transaction:
+            savepoint = f"savepoint_{depth}"
+            self.execute(f"SAVEPOINT {savepoint};")
+        else:
+            self.execute("BEGIN;")
+
+        def rollback():
+            if savepoint:
+                self.execute(f"ROLLBACK TO {savepoint};")
+                self.execute(f"RELEASE {savepoint};")
+            else:
+                try:
+                    raw_conn.rollback()
+                except Error as e:
+                    raise DataBaseError(e)
+
+        def commit():
+            if savepoint:
+                self.execute(f"RELEASE {savepoint};")
+            else:
+                try:
+                    raw_conn.commit()
+                except Error as e:
+                    raise DataBaseError(e)
+
+        token = _transaction_depth.set(depth + 1)
+        callbacks_token = None if savepoint else _transaction_callbacks.set([])
+        try:
+            yield
+        except BaseException:
+            _transaction_depth.reset(token)
+            try:
+                rollback()
+            except DataBaseError:
+                pass
+            finally:
+                self._run_transaction_callbacks(callbacks_token)
+            raise
+        else:
+            _transaction_depth.reset(token)
+            try:
+                commit()
+            finally:
+                if callbacks_token:
+                    self._run_transaction_callbacks(callbacks_token)
+
+    @staticmethod
+    def after_transaction(callback: Callable[[], Any]) -> None:
+        """
+        Calls `callback` when the current transaction ends (commit or rollback)
+        and on the rollback of any SAVEPOINT inside it.
+        Without an open transaction it is called at once.
+        For caches that must not keep the uncommitted changes.
+        """
+        callbacks = _transaction_callbacks.get()
+        if callbacks is None:
+            callback()
+        else:
+            callbacks.append(callback)
+
+    @staticmethod
+    def _run_transaction_callbacks(token) -> None:
+        """
+        :param token: Of the outermost transaction, it is ended
+        """
+        callbacks = _transaction_callbacks.get() or ()
+        if token:
+            _transaction_callbacks.reset(token)
+
+        for callback in tuple(callbacks):
+            callback()
+
     def register_function(self, name: str, func: Callable) -> None:
         """
         :param name: Function name
@@ -149,8 +296,23 @@ class DataBase:
             raw_conn = conn.connection
             raw_conn.create_function(name, argc, func)
 
-    @staticmethod
+    @classmethod
+    def register_statement(cls, name: str, query: str) -> str:
+        """
+        Registers a named query.
+        `execute(name)` runs it with the same SQL text every time,
+        so sqlite3 prepares it once per connection and then takes it
+        from the connection statement cache (`cached_statements` in the profile).
+
+        :param name: Statement name
+        :param query: SQL Query
+        :return: name
+        """
+        cls._statements[name] = query
+        return name
+
     def execute(
+        self,
         query: str,
         params: tuple | dict = (),
         commit: bool = False,
@@ -161,9 +323,10 @@ class DataBase:
         Executes SQL query
         I tried with, but it didn't close the file
 
-        :param query: SQL Query.
-        :param params: Query parameters (optional)
+        :param query: SQL Query or name from `register_statement`.
+        :param params: Query parameters (optional), `?` tuple or `:name` dict
         :param commit: Should I save my changes? (optional, defaults to False)
+            Inside `db.transaction()` the changes are saved when it ends
         :param column_names: Insert column names into the result.
         :param script: Query consists of several requests
         :return: Query result
@@ -174,41 +337,63 @@ class DataBase:
             raise RuntimeError("db connection is None. Use `with db.connect():`")
 
         result = []
-        cursor: CursorResult | None = None
+        raw_conn = conn.connection
+        raw_cursor = raw_conn.cursor()
 
         try:
             if script:
-                raw_conn = conn.connection
-                raw_cursor = raw_conn.cursor()
                 raw_cursor.executescript(query)
             else:
-                if isinstance(params, tuple):
-                    raw_conn = conn.connection
-                    raw_cursor = raw_conn.cursor()
-                    raw_cursor.execute(query, params)
-                    if raw_cursor.description:
-                        result = raw_cursor.fetchall()
-                else:
-                    cursor = conn.execute(sqlalchemy_text(query), params)
-                    if cursor.returns_rows:
-                        result = cursor.fetchall()
+                raw_cursor.execute(self._statements.get(query, query), params)
+                if raw_cursor.description:
+                    result = raw_cursor.fetchall()
 
-            if commit:
-                conn.commit()
+            if commit and not _transaction_depth.get():
+                raw_conn.commit()
         except Error as e:
             raise DataBaseError(e)
 
-        if column_names and cursor and result:
-            keys = cursor.keys()
-            result = [list(keys)] + result
+        if column_names and result:
+            result = [[column[0] for column in raw_cursor.description]] + result
 
         # noinspection PyTypeChecker
         return result
 
+    def iterate(
+        self, query: str, params: tuple | dict = ()
+    ) -> Iterator[tuple[int | str | bytes | Any, ...]]:
+        """
+        Executes a SELECT query like `execute`,
+        but yields the rows from the cursor instead of fetching all of them
+
+        :param query: SQL Query or name from `register_statement`.
+        :param params: Query parameters (optional), `?` tuple or `:name` dict
+        """
+
+        conn: Connection | None = _current_connection.get()
+        if conn is None:
+            raise RuntimeError("db connection is None. Use `with db.connect():`")
+
+        raw_cursor = conn.connection.cursor()
+        try:
+            raw_cursor.execute(self._statements.get(query, query), params)
+            yield from raw_cursor
+        except Error as e:
+            raise DataBaseError(e)
+        finally:
+            raw_cursor.close()
+
     @property
     def is_connected(self) -> bool:
         return bool(_current_connection.get())
 
+    @property
+    def in_transaction(self) -> bool:
+        """
+        True inside `db.transaction()`
+        """
+        return bool(_transaction_depth.get())
+
 
 def db_connect_decorator(func: Callable) -> Any:
     @wraps(func)
@@ -222,78 +407,172 @@ def db_connect_decorator(func: Callable) -> Any:
     return wrapper
 
 
-class ChatStateMachine:
-    def __init__(self, state_type: str):
-        self.state_type = state_type
-        self.cache = LFUCache(maxsize=100)
-
-    @db_connect_decorator
-    def get_state(self, chat_id: int) -> None | str:
-        cache_key: str = f"{self.state_type}:{chat_id}"
-
-        if cache_key in self.cache:
-            return self.cache[cache_key]
-
-        try:
-            state = db.execute(
-                """
-SELECT state
+DataBase.register_statement(
+    "chat_states.get",
+    """
+SELECT state_type,
+       state
   FROM chat_states
- WHERE chat_id = :chat_id
-       AND state_type = :state_type;
+ WHERE chat_id = :chat_id;
 """,
-                params={
-                    "chat_id": chat_id,
-                    "state_type": self.state_type,
-                },
-            )[0][0]
-        except IndexError:
-            self.cache[cache_key] = None
-            return None
-
-        self.cache[cache_key] = state
-        return state
-
-    def set_state(self, chat_id: int, state: str) -> None:
-        cache_key: str = f"{self.state_type}:{chat_id}"
-        self.cache[cache_key] = state
-
-        db.execute(
-            """
+)
+DataBase.register_statement(
+    "chat_states.set",
+    """
 INSERT INTO chat_states (chat_id, state_type, state)
-     VALUES (:chat_id, :state_type, :state)
+VALUES (:chat_id, :state_type, :state)
 ON CONFLICT(chat_id, state_type) DO
 UPDATE
    SET state = excluded.state;
 """,
+)
+DataBase.register_statement(
+    "chat_states.delete",
+    """
+DELETE FROM chat_states
+      WHERE chat_id = :chat_id
+            AND state_type = :state_type;
+""",
+)
+
+
+class ChatStateStore:
+    """
+    All chat_states of a chat are read with one query
+    and kept for the last `maxsize` chats ({} for a chat without states),
+    so repeated lookups of any state type do not open a connection.
+
+    Only committed states are cached. A write drops the entry of the chat,
+    until the end of the transaction the chat is read from the database.
+    """
+
+    def __init__(self, maxsize: int = 1000):
+        self.cache: LRUCache[int, dict[str, str]] = LRUCache(maxsize=maxsize)
+        self.lock = Lock()
+        # Increases on every write, a load that started before it is not cached
+        self.generation = 0
+        self._changed: ContextVar[set[int] | None] = ContextVar(
+            "changed_chat_states", default=None
+        )
+
+    def get_states(self, chat_id: int) -> dict[str, str]:
+        changed = self._changed.get()
+        if changed and chat_id in changed:
+            return self.load_states(chat_id)
+
+        with self.lock:
+            states = self.cache.get(chat_id)
+            generation = self.generation
+
+        if states is None:
+            states = self.load_states(chat_id)
+            with self.lock:
+                if self.generation == generation:
+                    self.cache[chat_id] = states
+
+        return states
+
+    @db_connect_decorator
+    def load_states(self, chat_id: int) -> dict[str, str]:
+        return dict(db.execute("chat_states.get", params={"chat_id": chat_id}))
+
+    def get_state(self, chat_id: int, state_type: str) -> None | str:
+        return self.get_states(chat_id).get(state_type)
+
+    def set_state(self, chat_id: int, state_type: str, state: str) -> None:
+        db.execute(
+            "chat_states.set",
             params={
                 "chat_id": chat_id,
-                "state_type": self.state_type,
+                "state_type": state_type,
                 "state": state,
             },
             commit=True,
         )
+        self._invalidate(chat_id)
 
-    def delete_state(self, chat_id: int) -> None:
-        cache_key: str = f"{self.state_type}:{chat_id}"
+    def delete_state(self, chat_id: int, state_type: str) -> None:
+        changed = self._changed.get()
+        if not changed or chat_id not in changed:
+            with self.lock:
+                states = self.cache.get(chat_id)
 
-        if cache_key in self.cache:
-            if self.cache[cache_key] is None:
+            if states is not None and state_type not in states:
                 return
-            self.cache[cache_key] = None
 
         db.execute(
-            """
-DELETE FROM chat_states
-      WHERE chat_id = :chat_id
-            AND state_type = :state_type;
-""",
+            "chat_states.delete",
             params={
                 "chat_id": chat_id,
-                "state_type": self.state_type,
+                "state_type": state_type,
             },
             commit=True,
         )
+        self._invalidate(chat_id)
+
+    def _invalidate(self, chat_id: int) -> None:
+        """
+        Drops the chat now and once more after the commit or rollback,
+        so a load made before the end of the transaction is not kept
+        """
+        self._pop(chat_id)
+
+        changed = self._changed.get()
+        if changed is None:
+            changed = set()
+            self._changed.set(changed)
+
+            def end_transaction():
+                if not _transaction_depth.get():
+                    self._changed.set(None)
+                for changed_chat_id in changed:
+                    self._pop(changed_chat_id)
+
+            db.after_transaction(end_transaction)
+
+        changed.add(chat_id)
+
+    def _pop(self, chat_id: int) -> None:
+        with self.lock:
+            self.cache.pop(chat_id, None)
+            self.generation += 1
+
+
+chat_state_store = ChatStateStore(config.CHAT_STATE_CACHE_SIZE)
+
+
+class ChatStateMachine:
+    def __init__(self, state_type: str, store: ChatStateStore = chat_state_store):
+        self.state_type = state_type
+        self.store = store
+
+    def get_state(self, chat_id: int) -> None | str:
+        return self.store.get_state(chat_id, self.state_type)
+
+    def set_state(self, chat_id: int, state: str) -> None:
+        self.store.set_state(chat_id, self.state_type, state)
+
+    def delete_state(self, chat_id: int) -> None:
+        self.store.delete_state(chat_id, self.state_type)
+
+
+DataBase.register_statement(
+    "limits.events",
+    """
+SELECT IFNULL(SUM(event_count) FILTER (WHERE period = :day), 0) AS count_today,
+       IFNULL(SUM(symbol_count) FILTER (WHERE period = :day), 0) AS sum_length_today,
+       IFNULL(SUM(event_count) FILTER (WHERE period = :month), 0) AS count_month,
+       IFNULL(SUM(symbol_count) FILTER (WHERE period = :month), 0) AS sum_length_month,
+       IFNULL(SUM(event_count) FILTER (WHERE period = :year), 0) AS count_year,
+       IFNULL(SUM(symbol_count) FILTER (WHERE period = :year), 0) AS sum_length_year,
+       IFNULL(SUM(event_count) FILTER (WHERE period = 'all'), 0) AS total_count,
+       IFNULL(SUM(symbol_count) FILTER (WHERE period = 'all'), 0) AS total_length
+  FROM usage_counters
+ WHERE user_id IS :user_id
+       AND group_id IS :group_id
+       AND period IN (:day, :month, :year, 'all');
+""",
+)
 
 
 class Limit:
@@ -310,68 +589,13 @@ class Limit:
 
         try:
             return db.execute(
-                """
-SELECT (
-    SELECT IFNULL(COUNT( * ), 0)
-      FROM events
-     WHERE user_id IS :user_id
-           AND group_id IS :group_id
-           AND date = :date
-) AS count_today,
-(
-    SELECT IFNULL(SUM(LENGTH(text)), 0)
-      FROM events
-     WHERE user_id IS :user_id
-           AND group_id IS :group_id
-           AND date = :date
-) AS sum_length_today,
-(
-    SELECT IFNULL(COUNT( * ), 0)
-      FROM events
-     WHERE user_id IS :user_id
-           AND group_id IS :group_id
-           AND SUBSTR(date, 4, 7) = :date_3
-) AS count_month,
-(
-    SELECT IFNULL(SUM(LENGTH(text)), 0)
-      FROM events
-     WHERE user_id IS :user_id
-           AND group_id IS :group_id
-           AND SUBSTR(date, 4, 7) = :date_3
-) AS sum_length_month,
-(
-    SELECT IFNULL(COUNT( * ), 0)
-      FROM events
-     WHERE user_id IS :user_id
-           AND group_id IS :group_id
-           AND SUBSTR(date, 7, 4) = :date_6
-) AS count_year,
-(
-    SELECT IFNULL(SUM(LENGTH(text)), 0)
-      FROM events
-     WHERE user_id IS :user_id
-           AND group_id IS :group_id
-           AND SUBSTR(date, 7, 4) = :date_6
-) AS sum_length_year,
-(
-    SELECT IFNULL(COUNT( * ), 0)
-      FROM events
-     WHERE user_id IS :user_id
-           AND group_id IS :group_id
-) AS total_count,
-(
-    SELECT IFNULL(SUM(LENGTH(text)), 0)
-      FROM events
-     WHERE user_id IS :user_id
-           AND group_id IS :group_id
-) AS total_length;
-""",
+                "limits.events",
                 params={
                     "user_id": self.user_id,
                     "group_id": self.group_id,
-                    "date": date,
-                    "date_3": date[3:],
-                    "date_6": date[6:],
+                    "day": f"{date[6:]}-{date[3:5]}-{date[:2]}",
+                    "month": f"{date[6:]}-{date[3:5]}",
+                    "year": date[6:],
                 },
             )[0]
         except DataBaseError as e:
@@ -401,6 +625,57 @@ SELECT (
             for actual_limit, max_limit in limits_symbol_count
         )
 
+    def is_exceeded_for_event_list(self, events: list[tuple[str, int]]) -> bool:
+        """
+        is_exceeded_for_events for several new events at once.
+        Days, months and years are checked with all events of the list that fall into them.
+
+        :param events: [(date, symbol_count), ...]
+        """
+        inf = float("inf")
+        added: dict[str, list[int]] = {}
+
+        for date, symbol_count in events:
+            iso_date = f"{date[6:]}-{date[3:5]}-{date[:2]}"
+            for period in (iso_date, iso_date[:7], iso_date[:4], "all"):
+                counts = added.setdefault(period, [0, 0])
+                counts[0] += 1
+                counts[1] += symbol_count
+
+        try:
+            usage = {
+                period: (event_count, symbol_count)
+                for period, event_count, symbol_count in db.execute(
+                    f"""
+SELECT period,
+       event_count,
+       symbol_count
+  FROM usage_counters
+ WHERE user_id IS ?
+       AND group_id IS ?
+       AND period IN ({','.join('?' for _ in added)});
+""",
+                    params=(self.user_id, self.group_id, *added),
+                )
+            }
+        except DataBaseError as e:
+            raise ApiError(e)
+
+        period_names = {10: "day", 7: "month", 4: "year", 3: "all"}
+        for period, (event_count, symbol_count) in added.items():
+            actual_event_count, actual_symbol_count = usage.get(period, (0, 0))
+            name = period_names[len(period)]
+            max_event = self.user_max_limits[f"max_event_{name}"] or inf
+            max_symbol = self.user_max_limits[f"max_symbol_{name}"] or inf
+
+            if (
+                actual_event_count + event_count >= max_event
+                or actual_symbol_count + symbol_count >= max_symbol
+            ):
+                return True
+
+        return False
+
     def is_exceeded_for_groups(
         self, create: bool = False, participate: bool = False
     ) -> bool:
@@ -456,10 +731,21 @@ class ExportData:
         user_id: int | None = None,
         group_id: str | None = None,
         __sql_where: str | None = None,
-        __sql_params: tuple | None = None,
+        __sql_params: tuple | dict | None = None,
     ):
         self.user_id, self.group_id = user_id, group_id
         self.filename = filename
+        if isinstance(__sql_params, dict):
+            owner = "user_id IS :export_user_id AND group_id IS :export_group_id"
+            self.params = {
+                **__sql_params,
+                "export_user_id": user_id,
+                "export_group_id": group_id,
+            }
+        else:
+            owner = "user_id IS ? AND group_id IS ?"
+            self.params = (user_id, group_id, *(__sql_params or ()))
+
         self.query = f"""
 SELECT event_id,
        date,
@@ -469,17 +755,11 @@ SELECT event_id,
        recent_changes_time,
        history
   FROM events
- WHERE user_id IS ?
-       AND group_id IS ?
+ WHERE {owner}
        AND removal_time IS NULL{f" AND ({__sql_where}) LIMIT 400" if __sql_where else ""};
 """
-        self.params = (
-            user_id,
-            group_id,
-            *(__sql_params or ()),
-        )
         try:
-            self.table = db.execute(self.query, params=self.params, column_names=True)
+            self.table = db.execute(self.query, params=self.params)
         except DataBaseError as e:
             raise ApiError(e)
 
@@ -792,6 +1072,24 @@ class Member:
     member_status: int
 
 
+DataBase.register_statement(
+    "users.get",
+    """
+SELECT user_id,
+       user_status,
+       username,
+       token,
+       password,
+       email,
+       max_event_id,
+       token_create_time,
+       reg_date
+  FROM users
+ WHERE user_id = :user_id;
+""",
+)
+
+
 class User:
     def __init__(
         self,
@@ -849,19 +1147,7 @@ SELECT user_id,
         # TODO защита от перебора брутфорса и количества попыток
         try:
             user = db.execute(
-                """
-SELECT user_id,
-       user_status,
-       username,
-       token,
-       password,
-       email,
-       max_event_id,
-       token_create_time,
-       reg_date
-  FROM users
- WHERE user_id = :user_id;
-""",
+                "users.get",
                 params={"user_id": user_id},
             )[0]
         except DataBaseError as e:
@@ -905,15 +1191,44 @@ SELECT user_id,
         return f"{self.__class__.__name__}({', '.join(f'{k}={v!r}' for k, v in self.__dict__.items())})"
 
 
+class lazy_field(cached_property):
+    """
+    cached_property that adds its name to instance.loaded_fields
+    when the value is resolved (not when it was assigned)
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None or self.attrname in instance.__dict__:
+            return super().__get__(instance, owner)
+
+        value = super().__get__(instance, owner)
+        instance.__dict__.setdefault("loaded_fields", set()).add(self.attrname)
+        return value
+
+
+DataBase.register_statement(
+    "users_settings.get",
+    """
+SELECT lang,
+       sub_urls,
+       city,
+       timezone,
+       notifications,
+       notifications_time,
+       theme
+  FROM users_settings
+ WHERE user_id = :user_id;
+""",
+)
+
+
 class Account:
     def __init__(self, user_id: int, group_id: str | None = None):
         self.user_id, self.group_id = user_id, group_id
-        self.limit = Limit(
-            self.user.user_status if not group_id else 0,
-            user_id,
-            self.group.group_id if group_id else None,
-        )
-        self.settings: Settings = self.get_settings()
+        self.__dict__.setdefault("loaded_fields", set())
+        if group_id:
+            # Checks that the user is a member of the group
+            self.group  # noqa
 
     def __str__(self):
         d = {
@@ -922,17 +1237,29 @@ class Account:
         }
         return str(d)
 
-    @cached_property
+    @lazy_field
     def user(self) -> User:
         return User.get_from_user_id(self.user_id)
 
-    @cached_property
+    @lazy_field
     def group(self) -> Group | None:
         if self.group_id:
             return self.get_group(self.group_id)
         else:
             return None
 
+    @lazy_field
+    def settings(self) -> Settings:
+        return self.get_settings()
+
+    @lazy_field
+    def limit(self) -> Limit:
+        return Limit(
+            self.user.user_status if not self.group_id else 0,
+            self.user_id,
+            self.group_id,
+        )
+
     @property
     def is_admin(self) -> bool:
         return self.user.user_status >= 2
@@ -1000,7 +1327,8 @@ SELECT 1
         # TODO проверка статуса
 
         try:
-            db.execute(
+            # event_id and max_event_id (trigger_event_max_event_id) in one statement
+            return db.execute(
                 """
 INSERT INTO events (
     event_id,
@@ -1029,7 +1357,8 @@ VALUES (
     :date,
     :text,
     :statuses
-);
+)
+RETURNING event_id;
 """,
                 params={
                     "user_id": self.safe_user_id,
@@ -1039,51 +1368,84 @@ VALUES (
                     "statuses": '["⬜"]',
                 },
                 commit=True,
-            )
-            max_event_id: int = db.execute(
+            )[0][0]
+        except DataBaseError as e:
+            raise ApiError(e)
+
+    def create_events(self, events: list[tuple[str, str]]) -> list[int]:
+        """
+        Creates several events with one limit check and one statement.
+
+        :param events: [(date, text), ...]
+        :return: [event_id, ...] in the same order
+        :raise TextIsTooBig: if len(text) >= 3800
+        :raise WrongDate:
+        :raise LimitExceeded:
+        :raise ApiError: sqlite3.Error DataBaseError or more than 400 events
+        """
+        if len(events) > 400:
+            raise ApiError
+
+        if not events:
+            return []
+
+        for date, text in events:
+            if len(text) >= 3800:
+                raise TextIsTooBig
+
+            if not re_date.match(date) or not is_valid_year(int(date[-4:])):
+                raise WrongDate
+
+        if self.limit.is_exceeded_for_event_list(
+            [(date, len(text)) for date, text in events]
+        ):
+            raise LimitExceeded
+
+        try:
+            event_ids = db.execute(
                 """
+INSERT INTO events (
+    event_id,
+    user_id,
+    group_id,
+    date,
+    text,
+    statuses
+)
 SELECT COALESCE(
-    (
-        SELECT max_event_id
-          FROM users
-         WHERE user_id = :user_id
-    ),
-    (
-        SELECT max_event_id
-          FROM groups
-         WHERE group_id = :group_id
-    )
-);
+           (
+               SELECT max_event_id
+                 FROM users
+                WHERE user_id = :user_id
+           ),
+           (
+               SELECT max_event_id
+                 FROM groups
+                WHERE group_id = :group_id
+           ),
+           1
+       ) + e.key,
+       :user_id,
+       :group_id,
+       JSON_EXTRACT(e.value, '$[0]'),
+       JSON_EXTRACT(e.value, '$[1]'),
+       :statuses
+  FROM JSON_EACH(:events) AS e
+ WHERE TRUE
+RETURNING event_id;
 """,
                 params={
                     "user_id": self.safe_user_id,
                     "group_id": self.group_id,
+                    "events": json.dumps(events, ensure_ascii=False),
+                    "statuses": '["⬜"]',
                 },
-            )[0][0]
-            if self.group_id:
-                db.execute(
-                    """
-UPDATE groups
-   SET max_event_id = max_event_id + 1
- WHERE group_id = :group_id;
-    """,
-                    params={"group_id": self.group_id},
-                    commit=True,
-                )
-            else:
-                db.execute(
-                    """
-UPDATE users
-   SET max_event_id = max_event_id + 1
- WHERE user_id = :user_id;
-    """,
-                    params={"user_id": self.user_id},
-                    commit=True,
-                )
+                commit=True,
+            )
         except DataBaseError as e:
             raise ApiError(e)
 
-        return max_event_id
+        return sorted(event_id for (event_id,) in event_ids)
 
     def get_event(self, event_id: int, in_bin: bool = False) -> Event:
         return self.get_events([event_id], in_bin)[0]
@@ -1095,21 +1457,24 @@ UPDATE users
             raise ApiError
 
         try:
-            db.register_function(
-                "DAYS_BEFORE_EVENT",
-                lambda date, statuses: Event(
-                    0, "", 0, date, "", statuses, "", "", ""
-                ).days_before_event(self.settings.timezone),
-            )
             events = db.execute(
                 f"""
-SELECT *
+SELECT user_id,
+       group_id,
+       event_id,
+       date,
+       text,
+       statuses,
+       adding_time,
+       recent_changes_time,
+       removal_time,
+       history
   FROM events
  WHERE user_id IS ?
        AND group_id IS ?
        AND event_id IN ({','.join('?' for _ in event_ids)})
        AND (removal_time IS NOT NULL) = ?
- ORDER BY {config.sql_order_dict[order]};
+ ORDER BY {sql_order(order, self.settings.timezone)};
 """,
                 params=(
                     self.safe_user_id,
@@ -1150,12 +1515,21 @@ SELECT *
         try:
             events = db.execute(
                 f"""
-SELECT *
+SELECT user_id,
+       group_id,
+       event_id,
+       date,
+       text,
+       statuses,
+       adding_time,
+       recent_changes_time,
+       removal_time,
+       history
   FROM events
  WHERE user_id IS ?
        AND group_id IS ?
        AND IFNULL(recent_changes_time, adding_time) > ?
- ORDER BY {config.sql_order_dict[order]};
+ ORDER BY {sql_order(order, self.settings.timezone)};
 """,
                 params=(
                     self.safe_user_id,
@@ -1393,7 +1767,7 @@ UPDATE events
         filename: str,
         file_format: str = "csv",
         __sql_where: str | None = None,
-        __sql_params: str | None = None,
+        __sql_params: tuple | dict | None = None,
     ) -> tuple[StringIO | BytesIO, int]:
         if file_format not in ("csv", "xml", "json", "jsonl"):
             raise ValueError("Format Is Not Valid")
@@ -1987,17 +2361,7 @@ UPDATE groups
     def get_user_settings(self) -> Settings:
         try:
             settings = db.execute(
-                """
-SELECT lang,
-       sub_urls,
-       city,
-       timezone,
-       notifications,
-       notifications_time,
-       theme
-  FROM users_settings
- WHERE user_id = :user_id;
-""",
+                "users_settings.get",
                 params={"user_id": self.user_id},
             )[0]
         except DataBaseError as e:
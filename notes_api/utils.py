@@ -1,6 +1,7 @@
 import re
 import random
 import string
+import unicodedata
 from time import time
 from functools import wraps
 from typing import Callable
@@ -24,17 +25,47 @@ sql_datetime_pattern = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
 password_hasher = PasswordHasher()
 
 
-def sqlite_format_date(_column: str) -> str:
+def sql_order(order: str, timezone_: int = 0) -> str:
     """
-    Database sql column converts from format
-    dd.mm.yyyy to yyyy.mm.dd for sql expression
+    ORDER BY expression from config.sql_order_dict
+    with the current date in the user's time zone
 
-    :param _column: Column for transformation.
-    :return: SQL expression
+    :param order: config.sql_order_dict key
+    :param timezone_: User time zone
     """
-    return f"""
-SUBSTR({_column}, 7, 4) || '-' || SUBSTR({_column}, 4, 2) || '-' || SUBSTR({_column}, 1, 2)
-""".strip()
+    return config.sql_order_dict[order].format(
+        today=f"DATE('now', '{int(timezone_):+} hours')"
+    )
+
+
+def is_fts_word(word: str) -> bool:
+    """
+    Whether events_fts has tokens for the word.
+    Same categories as the tokenizer of events_fts: letters, numbers, Co and So.
+    """
+    return any(
+        unicodedata.category(char)[0] in "LN"
+        or unicodedata.category(char) in ("Co", "So")
+        for char in word
+    )
+
+
+def fts_match_query(words: list[str], owner: str) -> str:
+    """
+    MATCH expression for events_fts.
+    Each word is searched by prefix in date, text and statuses, words are joined by OR.
+    Empty string if there are no words with tokens.
+
+    :param words: Search query words
+    :param owner: 'u' + user_id or 'g' + group_id
+    """
+    phrases = [
+        '"{}"*'.format(word.replace('"', '""')) for word in words if is_fts_word(word)
+    ]
+    if not phrases:
+        return ""
+
+    return f'owner : "{owner}" AND {{date text statuses}} : ({" OR ".join(phrases)})'
 
 
 def is_admin_id(chat_id: int) -> bool:
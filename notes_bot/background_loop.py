@@ -3,26 +3,41 @@ from threading import Thread
 from datetime import datetime, timezone
 
 import config
-from notes_bot.bot_messages import send_notifications_messages
+from notes_bot.notifications import (
+    catch_up_notifications,
+    send_notifications_messages,
+    clear_notification_deliveries,
+    reset_notification_deliveries,
+)
 from notes_api.log_cleaner import clear_logs
 
 
 def start_background_loop():
-    def process():
-        while_time = datetime.now(timezone.utc)
+    def process(while_time: datetime):
         weekday = while_time.weekday()
         hour = while_time.hour
         minute = while_time.minute
 
-        if config.BOT_NOTIFICATIONS and minute in (0, 10, 20, 30, 40, 50):
-            Thread(target=send_notifications_messages, daemon=True).start()
+        if config.BOT_NOTIFICATIONS:
+            Thread(
+                target=send_notifications_messages, args=(while_time,), daemon=True
+            ).start()
 
         if weekday == hour == minute == 0:  # Monday 00:00
             Thread(target=clear_logs, daemon=True).start()
+            Thread(target=clear_notification_deliveries, daemon=True).start()
 
-    process()
-    # wait for the notification cycle to start
-    sleep(60 - datetime.now(timezone.utc).second)
+    if config.BOT_NOTIFICATIONS:
+        reset_notification_deliveries()
+        Thread(target=catch_up_notifications, daemon=True).start()
+
+    last_minute = None
     while True:
-        process()
-        sleep(60)
+        # Every minute once, even if sleep wakes up a bit early or late
+        minute_time = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        if minute_time != last_minute:
+            last_minute = minute_time
+            process(minute_time)
+
+        now = datetime.now(timezone.utc)
+        sleep(60 - now.second - now.microsecond / 1_000_000)
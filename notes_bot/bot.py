@@ -6,12 +6,9 @@ import config
 from telegram_utils.command_parser import command_regex
 
 
-if config.TELEGRAM_WEBHOOK:
-    threaded, num_threads = False, 6
-else:
-    threaded, num_threads = True, 2
-
-bot = TeleBot(config.BOT_TOKEN, threaded=threaded, num_threads=num_threads)
+# Handlers are run by notes_bot.update_queue:
+# UpdateQueue for webhook (server.py), ShardedUpdateExecutor for polling (start_bot.py)
+bot = TeleBot(config.BOT_TOKEN, threaded=False)
 
 bot.parse_mode = "html"
 bot.disable_web_page_preview = True
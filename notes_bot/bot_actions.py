@@ -10,12 +10,15 @@ from notes_bot.bot import bot
 from notes_bot.request import request
 from notes_bot.lang import get_translate
 from notes_bot.buttons_utils import delmarkup
+from notes_bot.send_scheduler import send_scheduler
 from notes_bot.message_generator import TextMessage, CallBackAnswer
 
 
 def delete_message_action(message: Message) -> None:
     try:
-        bot.delete_message(message.chat.id, message.message_id)
+        send_scheduler.send(
+            message.chat.id, bot.delete_message, message.chat.id, message.message_id
+        )
     except ApiTelegramException:
         if (time() - message.date) / 60 / 60 > 48:
             error_text = get_translate("errors.delete_messages_older_48_h")
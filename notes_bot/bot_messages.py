@@ -3,7 +3,7 @@ import json
 import html
 import difflib
 from typing import Literal
-from datetime import timedelta, datetime, timezone
+from datetime import timedelta, datetime
 
 # noinspection PyPackageRequirements
 from telebot.apihelper import ApiTelegramException
@@ -21,7 +21,7 @@ from notes_bot.limits import get_limit_link
 from notes_bot.time_utils import parse_utc_datetime
 from notes_bot.bot_actions import delete_message_action
 from notes_bot.lang import get_translate, get_theme_emoji, translation
-from notes_bot.types import TelegramAccount, TelegramSettings
+from notes_bot.types import TelegramSettings
 from notes_bot.message_generator import (
     TextMessage,
     EventMessage,
@@ -40,7 +40,6 @@ from notes_bot.utils import (
     Cycle,
     re_edit_message,
     html_to_markdown,
-    sqlite_format_date2,
     extract_search_query,
     extract_search_filters,
     highlight_text_difference,
@@ -48,8 +47,8 @@ from notes_bot.utils import (
 )
 from notes_api.logger import logger
 from notes_api.types import db, group_limits
-from notes_api.utils import sqlite_format_date, is_valid_year, chunks
-from notes_api.exceptions import EventNotFound, GroupNotFound, UserNotFound, ApiError
+from notes_api.utils import is_valid_year, chunks
+from notes_api.exceptions import EventNotFound, GroupNotFound, ApiError
 from telegram_utils.buttons_generator import generate_buttons, edit_button_data
 
 
@@ -261,11 +260,21 @@ def settings_message(
                     notifications_time_=f"{now - timedelta(minutes=10):%H:%M}"
                 )
             },
+            {
+                "-1m": format_call_data(
+                    notifications_time_=f"{now - timedelta(minutes=1):%H:%M}"
+                )
+            },
             {
                 settings.notifications_time: format_call_data(
                     notifications_time_="08:00"
                 )
             },
+            {
+                "+1m": format_call_data(
+                    notifications_time_=f"{now + timedelta(minutes=1):%H:%M}"
+                )
+            },
             {
                 "+10m": format_call_data(
                     notifications_time_=f"{now + timedelta(minutes=10):%H:%M}"
@@ -371,6 +380,43 @@ def help_message(
     return generated
 
 
+db.register_statement(
+    "daily_message.recurring_dates",
+    """
+-- If found, then add a repeating events button
+SELECT DISTINCT date
+  FROM events
+ WHERE user_id IS :user_id
+       AND group_id IS :group_id
+       AND removal_time IS NULL
+       AND recurrence_kind IS NOT NULL
+       AND date != :date
+       AND (
+    ( -- Every year
+        every_year
+        AND month = :month
+        AND day = :day
+    )
+    OR
+    ( -- Every month
+        every_month
+        AND day = :day
+    )
+    OR
+    ( -- Every week
+        every_week
+        AND weekday = :weekday
+    )
+    OR
+    ( -- Every day
+        every_day
+    )
+)
+LIMIT 1;
+""",
+)
+
+
 def daily_message(
     date: datetime | str, id_list: list[int] = (), page: int = 0
 ) -> EventsMessage:
@@ -387,13 +433,13 @@ def daily_message(
     sql_where = """
 user_id IS ?
 AND group_id IS ?
-AND date = ?
+AND iso_date = ?
 AND removal_time IS NULL
 """
     params = (
         request.entity.safe_user_id,
         request.entity.group_id,
-        f"{date:%d.%m.%Y}",
+        f"{date:%Y-%m-%d}",
     )
 
     y = date - timedelta(days=1)
@@ -438,48 +484,14 @@ AND removal_time IS NULL
     daylist = [
         x[0]
         for x in db.execute(
-            f"""
--- If found, then add a repeating events button
-SELECT DISTINCT date
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
-       AND date != :date
-       AND (
-    ( -- Every year
-        (
-            statuses LIKE '%🎉%'
-            OR statuses LIKE '%🎊%'
-            OR statuses LIKE '%📆%'
-        )
-        AND date LIKE :y_date
-    )
-    OR
-    ( -- Every month
-        statuses LIKE '%📅%'
-        AND date LIKE :m_date
-    )
-    OR
-    ( -- Every week
-        statuses LIKE '%🗞%'
-        AND
-        STRFTIME('%w', {sqlite_format_date('date')}) =
-        CAST(STRFTIME('%w', {sqlite_format_date(':date')}) as TEXT)
-    )
-    OR
-    ( -- Every day
-        statuses LIKE '%📬%'
-    )
-)
-LIMIT 1;
-""",
+            "daily_message.recurring_dates",
             params={
                 "user_id": request.entity.safe_user_id,
                 "group_id": request.entity.group_id,
                 "date": f"{date:%d.%m.%Y}",
-                "y_date": f"{date:%d.%m}.____",
-                "m_date": f"{date:%d}.__.____",
+                "month": date.month,
+                "day": date.day,
+                "weekday": int(f"{date:%w}"),
             },
         )
     ]
@@ -892,39 +904,41 @@ def recurring_events_message(
     :param id_list: List of event_id
     :param page: Page number
     """
-    sql_where = f"""
+    sql_where = """
 user_id IS ?
 AND group_id IS ?
 AND removal_time IS NULL
+AND recurrence_kind IS NOT NULL
 AND (
     ( -- Every year
-        (
-            statuses LIKE '%🎉%'
-            OR statuses LIKE '%🎊%'
-            OR statuses LIKE '%📆%'
-        )
-        AND date LIKE '{date[:-5]}.____'
+        every_year
+        AND month = ?
+        AND day = ?
     )
     OR
     ( -- Every month
-        statuses LIKE '%📅%'
-        AND date LIKE '{date[:2]}.__.____'
+        every_month
+        AND day = ?
     )
     OR
     ( -- Every week
-        statuses LIKE '%🗞%'
-        AND STRFTIME('%w', {sqlite_format_date('date')}) =
-        CAST(STRFTIME('%w', '{sqlite_format_date2(date)}') as TEXT)
+        every_week
+        AND weekday = ?
     )
     OR
     ( -- Every day
-        statuses LIKE '%📬%'
+        every_day
     )
 )
 """
+    dt_date = datetime.strptime(date, "%d.%m.%Y")
     params = (
         request.entity.safe_user_id,
         request.entity.group_id,
+        dt_date.month,
+        dt_date.day,
+        dt_date.day,
+        int(f"{dt_date:%w}"),
     )
 
     back_open_markup = generate_buttons(
@@ -1147,11 +1161,13 @@ def search_results_message(
     )
     generated = EventsMessage(markup=markup, page=int(page), page_indent=1)
     sql_where, params = generate_search_sql_condition(query, filters)
+    # Sort by relevance, ORDER BY uses :fts_query of the condition
+    order = "search" if "fts_query" in params else "usual"
 
     if id_list:
-        generated.get_page_events(sql_where, params, id_list)
+        generated.get_page_events(sql_where, params, id_list, order)
     else:
-        generated.get_pages_data(sql_where, params, "ps")
+        generated.get_pages_data(sql_where, params, "ps", order)
 
     string_id = encode_id([event.event_id for event in generated.event_list])
     edit_button_data(generated.markup, 0, 1, f"se os {string_id} us")
@@ -1290,51 +1306,60 @@ def search_filter_message(message: Message, call_data: str) -> TextMessage:
     return TextMessage(f"{text}\n\n{clue_1}", generate_buttons(markup))
 
 
-def week_event_list_message(id_list: list[int] = (), page: int = 0) -> EventsMessage:
+def week_events_condition(now: datetime) -> tuple[str, tuple]:
     """
-    :param id_list: List of event_id
-    :param page: Page number
+    WHERE condition of the events of the week from `now`, without user_id and group_id
+
+    :return: condition, params
     """
-    tz = f"'{request.entity.settings.timezone:+} hours'"
-    sql_where = f"""
-user_id IS ?
-AND group_id IS ?
-AND removal_time IS NULL
+    dates = [now + timedelta(days=days) for days in range(8)]
+    condition = f"""
+removal_time IS NULL
 AND statuses NOT LIKE '%🔕%'
 AND (
-    (
-        {sqlite_format_date('date')}
-        BETWEEN DATE('now', {tz})
-            AND DATE('now', '+7 day', {tz})
-    )
+    iso_date BETWEEN ? AND ?
     OR
     ( -- Every year
-        (
-            statuses LIKE '%🎉%'
-            OR statuses LIKE '%🎊%'
-            OR statuses LIKE '%📆%'
-        )
-        AND
-        (
-            STRFTIME('%Y-', 'now', {tz}) || STRFTIME('%m-%d', {sqlite_format_date('date')})
-            BETWEEN STRFTIME('%Y-%m-%d', 'now', {tz})
-                AND STRFTIME('%Y-%m-%d', 'now', '+7 day', {tz})
-        )
+        every_year
+        AND (month, day) IN (VALUES {", ".join("(?, ?)" for _ in dates)})
     )
     OR
     ( -- Every month
-        statuses LIKE '%📅%'
-        AND STRFTIME('%Y-%m-', 'now', {tz}) || SUBSTR(date, 1, 2)
-        BETWEEN STRFTIME('%Y-%m-%d', 'now', {tz})
-            AND STRFTIME('%Y-%m-%d', 'now', '+7 day', {tz})
+        every_month
+        AND day IN ({", ".join("?" for _ in dates)})
     )
-    OR statuses LIKE '%🗞%' -- Every week
-    OR statuses LIKE '%📬%' -- Every day
+    OR every_week -- Every week
+    OR every_day -- Every day
 )
     """
+    params = (
+        f"{dates[0]:%Y-%m-%d}",
+        f"{dates[-1]:%Y-%m-%d}",
+        *(x for date in dates for x in (date.month, date.day)),
+        *(date.day for date in dates),
+    )
+    return condition, params
+
+
+def week_event_list_message(
+    id_list: list[int] = (), page: int = 0, now: datetime | None = None
+) -> EventsMessage:
+    """
+    :param id_list: List of event_id
+    :param page: Page number
+    :param now: Start of the week, request.entity.now_time() by default
+    """
+    condition, condition_params = week_events_condition(
+        now or request.entity.now_time()
+    )
+    sql_where = f"""
+user_id IS ?
+AND group_id IS ?
+AND {condition}"""
     params = (
         request.entity.safe_user_id,
         request.entity.group_id,
+        *condition_params,
     )
 
     markup = generate_buttons(
@@ -1379,7 +1404,7 @@ AND removal_time IS NOT NULL
 -- Deleting events older than 30 days
 DELETE FROM events
       WHERE removal_time IS NOT NULL
-            AND (JULIANDAY('now') - JULIANDAY(removal_time) > 30);
+            AND removal_time < DATETIME('now', '-30 days');
 """,
         commit=True,
     )
@@ -1417,61 +1442,64 @@ DELETE FROM events
     return generated
 
 
-def notification_message(
-    n_date: datetime | str | None = None,
-    id_list: list[int] = (),
-    page: int = 0,
-    from_command: bool = False,
-) -> EventsMessage | None:
-    if n_date is None or n_date == "now":
-        n_date = request.entity.now_time()
-
-    if isinstance(n_date, str):
-        n_date = datetime.strptime(n_date, "%d.%m.%Y")
-
+def notification_events_condition(n_date: datetime) -> str:
+    """
+    WHERE condition of the events to remind about on `n_date`,
+    without user_id and group_id
+    """
     dates = [n_date + timedelta(days=days) for days in (0, 1, 2, 3, 7)]
-    weekdays = ["0" if (w := date.weekday()) == 6 else f"{w + 1}" for date in dates[:2]]
-    sql_where = f"""
-user_id IS ?
-AND group_id IS ?
-AND removal_time IS NULL
+    weekdays = [int(f"{date:%w}") for date in dates[:2]]
+    return f"""
+removal_time IS NULL
 AND statuses NOT LIKE '%🔕%'
 AND (
     ( -- For today and +1 day
-        date IN ('{dates[0]:%d.%m.%Y}', '{dates[1]:%d.%m.%Y}')
+        iso_date IN ('{dates[0]:%Y-%m-%d}', '{dates[1]:%Y-%m-%d}')
     )
     OR
     ( -- Matches on +2, +3 and +7 days
-        date IN ({", ".join(f"'{date:%d.%m.%Y}'" for date in dates[2:])})
-        AND statuses NOT LIKE '%🗞%'
+        iso_date IN ({", ".join(f"'{date:%Y-%m-%d}'" for date in dates[2:])})
+        AND NOT every_week
     )
     OR
     ( -- Every year
-        (
-            statuses LIKE '%🎉%'
-            OR
-            statuses LIKE '%🎊%'
-            OR
-            statuses LIKE '%📆%'
-        )
-        AND SUBSTR(date, 1, 5) IN ({", ".join(f"'{date:%d.%m}'" for date in dates)})
+        every_year
+        AND (month, day) IN (VALUES {", ".join(f"({date.month}, {date.day})" for date in dates)})
     )
     OR
     ( -- Every month
-        SUBSTR(date, 1, 2) IN ({", ".join(f"'{date:%d}'" for date in dates)})
-        AND statuses LIKE '%📅%'
+        day IN ({", ".join(f"{date.day}" for date in dates)})
+        AND every_month
     )
     OR
     ( -- Every week
-        STRFTIME('%w', {sqlite_format_date('date')}) IN ({", ".join(f"'{w}'" for w in weekdays)})
-        AND statuses LIKE '%🗞%'
+        weekday IN ({", ".join(f"{w}" for w in weekdays)})
+        AND every_week
     )
     OR
     ( -- Every day
-        statuses LIKE '%📬%'
+        every_day
     )
 )
     """
+
+
+def notification_message(
+    n_date: datetime | str | None = None,
+    id_list: list[int] = (),
+    page: int = 0,
+    from_command: bool = False,
+) -> EventsMessage | None:
+    if n_date is None or n_date == "now":
+        n_date = request.entity.now_time()
+
+    if isinstance(n_date, str):
+        n_date = datetime.strptime(n_date, "%d.%m.%Y")
+
+    sql_where = f"""
+user_id IS ?
+AND group_id IS ?
+AND {notification_events_condition(n_date)}"""
     params = (
         request.entity.safe_user_id,
         request.entity.group_id,
@@ -1509,88 +1537,6 @@ AND (
     return None
 
 
-def send_notifications_messages() -> None:
-    n_date = datetime.now(timezone.utc)
-    with db.connect():
-        result = db.execute(
-            """
--- send_notifications_messages
-SELECT CAST(
-           COALESCE(
-               (
-                   SELECT chat_id
-                     FROM users
-                    WHERE users.user_id = tg_settings.user_id
-               ),
-               (
-                   SELECT chat_id
-                     FROM groups
-                    WHERE groups.group_id = tg_settings.group_id
-               )
-           ) AS INT
-       ),
-       CAST(notifications AS INT),
-       CASE
-           WHEN tg_settings.user_id THEN 'user'
-           WHEN tg_settings.group_id THEN (
-               SELECT 'group:'
-                      || (
-                          SELECT chat_id
-                            FROM users
-                           WHERE users.user_id = groups.owner_id
-                      )
-                 FROM groups
-                WHERE groups.group_id = tg_settings.group_id
-           )
-           ELSE NULL
-       END
-  FROM tg_settings
- WHERE notifications != 0
-       AND (
-           (
-               CAST(SUBSTR(notifications_time, 1, 2) AS INT)
-               - timezone + 24
-           ) % 24
-       ) = :hour
-       AND CAST(SUBSTR(notifications_time, 4, 2) AS INT) = :minute;
-""",
-            params={
-                "hour": n_date.hour,
-                "minute": n_date.minute,
-            },
-        )
-
-        for chat_id, n_type, a_type in result:
-            try:
-                if a_type.startswith("user"):
-                    request.entity = TelegramAccount(chat_id)
-                elif a_type.startswith("group:"):
-                    owner_id = a_type.split(":")[1]
-                    request.entity = TelegramAccount(owner_id, chat_id)
-            except (UserNotFound, GroupNotFound):
-                continue
-
-            if request.entity.user.user_status == -1:
-                continue
-
-            match n_type:
-                case 2:
-                    generated = week_event_list_message()
-                case _:
-                    generated = notification_message(from_command=True)
-
-            if generated and generated.event_list:
-                try:
-                    generated.send(request.entity.request_chat_id)
-                    status = "Ok"
-                except ApiTelegramException:
-                    status = "Error"
-
-                logger.info(
-                    f"notifications -> {request.entity.request_chat_id} -> {status}"
-                )
-
-
 def monthly_calendar_message(
     yy_mm: list[int] | tuple[int, int] | None = None,
     command: str | None = None,
@@ -8,7 +8,7 @@ from notes_bot.request import request
 from notes_bot.lang import get_translate, get_theme_emoji
 from notes_bot.time_utils import now_time_calendar, year_info, get_week_number
 from notes_api.types import db
-from notes_api.utils import is_valid_year, chunks, sqlite_format_date
+from notes_api.utils import is_valid_year, chunks
 from telegram_utils.buttons_generator import generate_buttons
 
 
@@ -18,6 +18,109 @@ alphabet = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ!#$%&(
 alphabet_base = len(alphabet)
 calendar_event_count_template = ("⁰", "¹", "²", "³", "⁴", "⁵", "⁶", "⁷", "⁸", "⁹")
 
+db.register_statement(
+    "calendar.month",
+    """
+-- Days with events (0), numbers of the days of the events that repeat
+-- every month and of birthdays in a specific month (1), numbers of the days
+-- of the week in which there are events that repeat every week (2)
+SELECT 0,
+       day,
+       live_count
+  FROM calendar_counts
+ WHERE owner = :owner
+       AND kind = 'day'
+       AND year = :year
+       AND month = :month
+ UNION ALL
+SELECT 1,
+       day,
+       0
+  FROM calendar_counts
+ WHERE owner = :owner
+       AND kind = 'monthly'
+ UNION ALL
+SELECT 1,
+       day,
+       0
+  FROM calendar_counts
+ WHERE owner = :owner
+       AND kind = 'yearly'
+       AND year = 0
+       AND month = :month
+ UNION ALL
+SELECT 2,
+       day - 1,
+       0
+  FROM calendar_counts
+ WHERE owner = :owner
+       AND kind = 'weekly';
+""",
+)
+db.register_statement(
+    "calendar.year",
+    """
+-- Months with events (0), month numbers of birthdays (1),
+-- is there an event that repeats every month? (2)
+SELECT 0,
+       month,
+       live_count
+  FROM calendar_counts
+ WHERE owner = :owner
+       AND kind = 'month'
+       AND year = :year
+ UNION ALL
+SELECT DISTINCT 1,
+       month,
+       0
+  FROM calendar_counts
+ WHERE owner = :owner
+       AND kind = 'yearly'
+ UNION ALL
+SELECT 2,
+       0,
+       0
+ WHERE EXISTS (
+           SELECT 1
+             FROM calendar_counts
+            WHERE owner = :owner
+                  AND kind = 'monthly'
+       );
+""",
+)
+db.register_statement(
+    "calendar.twenty_years",
+    """
+-- Years with events (0), is there an event that repeats every year? (1)
+SELECT 0,
+       year,
+       live_count
+  FROM calendar_counts
+ WHERE owner = :owner
+       AND kind = 'year'
+       AND year BETWEEN :first_year AND :last_year
+ UNION ALL
+SELECT 1,
+       0,
+       0
+ WHERE EXISTS (
+           SELECT 1
+             FROM calendar_counts
+            WHERE owner = :owner
+                  AND kind = 'yearly'
+       );
+""",
+)
+
+
+def calendar_owner() -> str:
+    """
+    The owner of request.entity in calendar_counts
+    """
+    if request.entity.group_id:
+        return f"g{request.entity.group_id}"
+    return f"u{request.entity.user_id}"
+
 
 def create_monthly_calendar_keyboard(
     year_month: list | tuple[int, int] | None = None,
@@ -44,79 +147,18 @@ def create_monthly_calendar_keyboard(
     if not is_valid_year(year):
         raise ValueError
 
-    # Days with events
-    has_events = {
-        x[0]: x[1]
-        for x in db.execute(
-            """
--- Days with events
-SELECT CAST (SUBSTR(date, 1, 2) AS INT) AS day_number,
-       COUNT(event_id) AS event_count
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
-       AND date LIKE :date
- GROUP BY day_number;
-""",
-            params={
-                "user_id": request.entity.safe_user_id,
-                "group_id": request.entity.group_id,
-                "date": f"__.{month:0>2}.{year}",
-            },
-        )
-    }
-
-    # Birthdays, holidays and every year or month
-    every_year_or_month = tuple(
-        x[0]
-        for x in db.execute(
-            """
--- Numbers of birthdays in a specific month
-SELECT DISTINCT CAST (SUBSTR(date, 1, 2) AS INT)
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
-       AND (
-           statuses LIKE '%📅%'
-           OR (
-               (
-                   statuses LIKE '%🎉%'
-                   OR statuses LIKE '%🎊%'
-                   OR statuses LIKE '%📆%'
-               )
-               AND SUBSTR(date, 4, 2) = :date
-           )
-       );
-""",
-            params={
-                "user_id": request.entity.safe_user_id,
-                "group_id": request.entity.group_id,
-                "date": f"{month:0>2}",
-            },
-        )
-    )
-
-    # Every week
-    every_week = tuple(
-        6 if x[0] == -1 else x[0]
-        for x in db.execute(
-            f"""
--- Number of days of the week in which there are events that repeat every week
-SELECT DISTINCT CAST (STRFTIME('%w', {sqlite_format_date('date')}) - 1 AS INT)
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
-       AND statuses LIKE '%🗞%';
-""",
-            params={
-                "user_id": request.entity.safe_user_id,
-                "group_id": request.entity.group_id,
-            },
-        )
-    )
+    # Days with events, birthdays, holidays and every year, month or week
+    has_events, every_year_or_month, every_week = {}, set(), set()
+    for kind, number, count in db.execute(
+        "calendar.month",
+        params={"owner": calendar_owner(), "year": year, "month": month},
+    ):
+        if kind == 0:
+            has_events[number] = count
+        elif kind == 1:
+            every_year_or_month.add(number)
+        else:
+            every_week.add(6 if number == -1 else number)
 
     second_line = [
         {(week_day + ("!" if wd in every_week else "")): "None"}
@@ -214,73 +256,17 @@ def create_yearly_calendar_keyboard(
     back = f"'{back.strip()}'" if back else None
     arguments = f"'{arguments.strip()}'" if arguments else None
 
-    # This year
-    month_list = {
-        x[0]: x[1]
-        for x in db.execute(
-            """
--- Months with events
-SELECT CAST (SUBSTR(date, 4, 2) AS INT) AS month_number,
-       COUNT(event_id) AS event_count
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
-       AND date LIKE :date
- GROUP BY month_number;
-""",
-            params={
-                "user_id": request.entity.safe_user_id,
-                "group_id": request.entity.group_id,
-                "date": f"__.__.{year}",
-            },
-        )
-    }
-
-    # Repeat every year
-    every_year = [
-        x[0]
-        for x in db.execute(
-            """
--- Month numbers of birthdays in a specific month
-SELECT DISTINCT CAST (SUBSTR(date, 4, 2) AS INT)
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
-       AND (
-           statuses LIKE '%🎉%'
-           OR statuses LIKE '%🎊%'
-           OR statuses LIKE '%📆%'
-       );
-""",
-            params={
-                "user_id": request.entity.safe_user_id,
-                "group_id": request.entity.group_id,
-            },
-        )
-    ]
-
-    # Repeat every month
-    every_month = [
-        x[0]
-        for x in db.execute(
-            """
--- Is there an event that repeats every month?
-SELECT date
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
-       AND statuses LIKE '%📅%'
- LIMIT 1;
-""",
-            params={
-                "user_id": request.entity.safe_user_id,
-                "group_id": request.entity.group_id,
-            },
-        )
-    ]
+    # This year, repeat every year and every month
+    month_list, every_year, every_month = {}, set(), False
+    for kind, number, count in db.execute(
+        "calendar.year", params={"owner": calendar_owner(), "year": year}
+    ):
+        if kind == 0:
+            month_list[number] = count
+        elif kind == 1:
+            every_year.add(number)
+        else:
+            every_month = True
 
     now_month = request.entity.now_time().month
 
@@ -346,50 +332,16 @@ def create_twenty_year_calendar_keyboard(
     year = int(f"{millennium}{decade}0")
     years = chunks([(n, y) for n, y in enumerate(range(year, year + 20))], 4)
 
-    # This year
-    year_list = {
-        x[0]: x[1]
-        for x in db.execute(
-            """
--- Years with events
-SELECT CAST (SUBSTR(date, 7, 4) AS INT) AS year_number,
-       COUNT(event_id) AS event_count
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
- GROUP BY year_number;
-""",
-            params={
-                "user_id": request.entity.safe_user_id,
-                "group_id": request.entity.group_id,
-            },
-        )
-    }
-
-    # Repeat every year
-    every_year = db.execute(
-        """
--- Month numbers of birthdays in a specific month
-SELECT 1
-  FROM events
- WHERE user_id IS :user_id
-       AND group_id IS :group_id
-       AND removal_time IS NULL
-       AND (
-           statuses LIKE '%🎉%'
-           OR statuses LIKE '%🎊%'
-           OR statuses LIKE '%📆%'
-       );
-""",
-        params={
-            "user_id": request.entity.safe_user_id,
-            "group_id": request.entity.group_id,
-        },
-    )
-
-    if every_year:
-        every_year = every_year[0]
+    # This year and repeat every year
+    year_list, every_year = {}, False
+    for kind, number, count in db.execute(
+        "calendar.twenty_years",
+        params={"owner": calendar_owner(), "first_year": year, "last_year": year + 19},
+    ):
+        if kind == 0:
+            year_list[number] = count
+        else:
+            every_year = True
 
     years_buttons = []
     for row in years:
@@ -679,3 +631,19 @@ def encode_id(ids: tuple[int] | list[int]) -> str:
         result.append(data)
 
     return "".join(result) or "_"
+
+
+def encoded_id_length(event_id: int, previous_id: int | None = None) -> int:
+    """
+    How many characters event_id adds to encode_id after previous_id,
+    len(encode_id(ids)) == sum of it over the ids
+
+    >>> encoded_id_length(1), encoded_id_length(2, 1), encoded_id_length(5000, 2)
+    (1, 1, 3)
+    >>> len(encode_id([1, 2, 5000]))
+    5
+    """
+    if previous_id is not None and event_id - previous_id == 1:
+        return 1
+
+    return len(int_str_exel(event_id)) + (previous_id is not None)
@@ -8,11 +8,16 @@ from telebot.types import Message, CallbackQuery
 from telebot.apihelper import ApiTelegramException
 from cachetools import LRUCache
 
+import config
 from notes_bot.request import request
 from notes_bot.lang import get_translate
 from notes_bot.utils import telegram_log
-from notes_bot.handlers import not_login_handler
-from notes_bot.types import TelegramAccount, add_chat_cached
+from notes_bot.handlers import not_login_handler, is_callback_prefix
+from notes_bot.types import (
+    add_chat_cached,
+    get_telegram_account,
+    record_account_fields,
+)
 from notes_bot.message_generator import CallBackAnswer, TextMessage
 from notes_api.types import db
 from notes_api.logger import logger
@@ -26,6 +31,22 @@ rate_limit_200_1800 = LRUCache(maxsize=100)
 rate_limit_30_60 = LRUCache(maxsize=100)
 
 
+def handler_name(x: Message | CallbackQuery) -> str:
+    """
+    "mnm" for the callback "mnm", "/start" for "/start@bot 1", "photo" for a photo.
+    "other" for unknown commands and callbacks, so the names are a fixed set
+    """
+    if isinstance(x, CallbackQuery):
+        name = (x.data or "").split(" ", 1)[0]
+        return name if is_callback_prefix(name) else "other"
+
+    if x.content_type == "text" and x.text.startswith("/"):
+        name = x.text.split(maxsplit=1)[0].split("@", 1)[0]
+        return name if name.removeprefix("/") in config.COMMANDS else "other"
+
+    return x.content_type
+
+
 # noinspection PyUnusedLocal
 def key_func(func: Callable, x: Message | CallbackQuery) -> int:
     return (x if isinstance(x, Message) else x.message).chat.id
@@ -52,11 +73,15 @@ def else_func(args, kwargs, key, sec) -> None:  # noqa
 @rate_limit(rate_limit_30_60, 30, 60, key_func, else_func)
 def wrapper(func: Callable, x: Message | CallbackQuery):
     try:
+        # The account is resolved before the transaction of the update,
+        # so getChatMember of a group does not run while it is open.
+        # All changes of the handler are saved together or rolled back on an error,
+        # Telegram calls inside it do not wait for the send_scheduler tokens.
         try:
             if request.is_user:
-                request.entity = TelegramAccount(request.chat_id)
+                request.entity = get_telegram_account(request.chat_id)
             else:
-                request.entity = TelegramAccount(x.from_user.id, request.chat_id)
+                request.entity = get_telegram_account(x.from_user.id, request.chat_id)
         except (UserNotFound, GroupNotFound):
             request.entity = None
 
@@ -65,7 +90,8 @@ def wrapper(func: Callable, x: Message | CallbackQuery):
             else:
                 telegram_log("press", x.data)
 
-            not_login_handler(x)
+            with db.transaction():
+                not_login_handler(x)
         else:
             if (
                 request.entity.user.user_status == -1
@@ -74,7 +100,11 @@ def wrapper(func: Callable, x: Message | CallbackQuery):
             ) and not is_admin_id(request.chat_id):
                 return
 
-            return func(x)
+            with db.transaction():
+                try:
+                    return func(x)
+                finally:
+                    record_account_fields(handler_name(x), request.entity)
     except (ApiError, ApiTelegramException) as e:
         logger.exception(e)
         text = get_translate("errors.error")
@@ -4,7 +4,6 @@ import inspect
 import traceback
 from time import sleep
 from functools import wraps
-from ast import literal_eval
 from datetime import datetime
 from typing import Callable, Literal
 
@@ -18,6 +17,7 @@ import config
 from notes_bot.bot import bot
 from notes_bot.request import request
 from notes_bot.time_utils import now_time_calendar
+from notes_bot.send_scheduler import send_scheduler
 from notes_bot.bot_actions import delete_message_action
 from notes_bot.lang import get_translate, get_theme_emoji
 from notes_bot.message_generator import (
@@ -111,7 +111,7 @@ from notes_api.types import (
     set_user_status,
     get_account_from_password,
 )
-from telegram_utils.argument_parser import getargs
+from telegram_utils.argument_parser import compile_arguments, parse_literal
 from telegram_utils.buttons_generator import generate_buttons, edit_button_data
 from telegram_utils.command_parser import parse_command, get_command_arguments
 
@@ -165,7 +165,12 @@ def not_login_handler(x: CallbackQuery | Message) -> None:
                 TextMessage(get_translate("errors.error")).reply()
             else:
                 TextMessage(get_translate("errors.success")).send()
-                bot.delete_message(message.chat.id, message.message_id)
+                send_scheduler.send(
+                    message.chat.id,
+                    bot.delete_message,
+                    message.chat.id,
+                    message.message_id,
+                )
                 request.entity = get_telegram_account_from_password(username, password)
                 start_message().send()
                 set_bot_commands()
@@ -198,7 +203,12 @@ def not_login_handler(x: CallbackQuery | Message) -> None:
                     TextMessage(get_translate("errors.error")).reply()
                 else:
                     TextMessage(get_translate("errors.success")).send(message.chat.id)
-                    bot.delete_message(message.chat.id, message.message_id)
+                    send_scheduler.send(
+                        message.chat.id,
+                        bot.delete_message,
+                        message.chat.id,
+                        message.message_id,
+                    )
                     request.entity = get_telegram_account_from_password(
                         username, password
                     )
@@ -345,8 +355,11 @@ def command_handler(message: Message) -> None:
         search_results_message(query).send()
 
     elif command_text == "dice":
-        value = bot.send_dice(
-            chat_id, message_thread_id=request.query.message_thread_id or None
+        value = send_scheduler.send(
+            chat_id,
+            bot.send_dice,
+            chat_id,
+            message_thread_id=request.query.message_thread_id or None,
         ).json["dice"]["value"]
         sleep(4)
         TextMessage(str(value)).send()
@@ -461,6 +474,15 @@ def command_handler(message: Message) -> None:
 
 
 _handlers = {}
+_callback_context = {
+    "chat_id": lambda call, call_data, str_prefix: call.message.chat.id,
+    "message_id": lambda call, call_data, str_prefix: call.message.message_id,
+    "message": lambda call, call_data, str_prefix: call.message,
+    "call_id": lambda call, call_data, str_prefix: call.id,
+    "call_data": lambda call, call_data, str_prefix: call_data,
+    "call": lambda call, call_data, str_prefix: call,
+    "str_prefix": lambda call, call_data, str_prefix: str_prefix,
+}
 
 
 def prefix(
@@ -469,14 +491,31 @@ def prefix(
     eval_: bool = None,
     eval_star: bool = None,
 ):
+    """
+    Registers a CallBackHandler method for the callback prefixes.
+    The signature and `arguments` are compiled here, once,
+    CallBackHandler.__call__ only passes the parameters that the method takes.
+    Must be the outermost decorator, the decorated function itself is called.
+    """
     if isinstance(prefix_, str):
         prefix_: tuple[str] = (prefix_,)
 
     def decorator(func: Callable):
+        parameters = inspect.signature(func).parameters
+        context = tuple(
+            (name, getter)
+            for name, getter in _callback_context.items()
+            if name in parameters and name not in (arguments or {})
+        )
+        parse_arguments = compile_arguments(arguments) if arguments else None
+        unused_arguments = tuple(k for k in arguments or {} if k not in parameters)
+
         for p in prefix_:
             _handlers[p] = (
-                func.__name__,
-                arguments if arguments is not None else {},
+                func,
+                context,
+                parse_arguments,
+                unused_arguments,
                 eval_,
                 eval_star,
                 p,
@@ -486,6 +525,10 @@ def prefix(
     return decorator
 
 
+def is_callback_prefix(call_prefix: str) -> bool:
+    return call_prefix in _handlers
+
+
 def stats(func: Callable):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -505,34 +548,35 @@ def stats(func: Callable):
 class CallBackHandler:
     def __call__(self, call: CallbackQuery):
         call_prefix = call.data.strip().split(maxsplit=1)[0]
-        method: tuple[str, dict, bool, bool, str] | None = _handlers.get(call_prefix)
+        method = _handlers.get(call_prefix)
 
         if method is None:
             return
 
-        func_name, arguments, eval_, eval_star, str_prefix = method
-        func = getattr(self, func_name)
+        (
+            func,
+            context,
+            parse_arguments,
+            unused_arguments,
+            eval_,
+            eval_star,
+            str_prefix,
+        ) = method
         call_data = call.data.removeprefix(call_prefix).strip()
-        func_argument_names = list(inspect.signature(func).parameters.keys())
-
-        return func(
-            *(literal_eval(call_data),) if eval_ else (),
-            *literal_eval(call_data) if eval_star else (),
-            **{
-                k: v
-                for k, v in {
-                    "chat_id": call.message.chat.id,
-                    "message_id": call.message.message_id,
-                    "message": call.message,
-                    "call_id": call.id,
-                    "call_data": call_data,
-                    "call": call,
-                    "str_prefix": str_prefix,
-                    **getargs(call_data)(arguments),
-                }.items()
-                if k in func_argument_names
-            },
-        )
+
+        kwargs = {name: getter(call, call_data, str_prefix) for name, getter in context}
+        if parse_arguments:
+            kwargs.update(parse_arguments(call_data))
+            for name in unused_arguments:
+                del kwargs[name]
+
+        if eval_:
+            return func(self, parse_literal(call_data), **kwargs)
+
+        if eval_star:
+            return func(self, *parse_literal(call_data), **kwargs)
+
+        return func(self, **kwargs)
 
     @prefix("mnm")
     def menu(self) -> None:
@@ -9,6 +9,7 @@ from notes_bot.bot import bot
 from notes_bot.request import request
 from notes_bot.buttons_utils import delmarkup
 from notes_bot.dispatcher import process_account
+from notes_bot.send_scheduler import send_scheduler
 from notes_bot.message_generator import TextMessage
 from notes_bot.bot_actions import delete_message_action
 from notes_bot.lang import get_translate, get_theme_emoji
@@ -16,15 +17,12 @@ from notes_bot.utils import (
     telegram_log,
     re_edit_message,
     html_to_markdown,
-    re_inline_message,
     re_user_edit_name_message,
     re_group_edit_name_message,
     re_user_edit_password_message,
 )
 from notes_bot.handlers import (
     reply_handler,
-    add_event_state,
-    add_group_state,
     command_handler,
     callback_handler,
     cache_create_group,
@@ -37,7 +35,7 @@ from notes_bot.bot_messages import (
     search_results_message,
     confirm_changes_message,
 )
-from notes_api.types import db
+from notes_api.types import db, chat_state_store
 from notes_api.logger import logger
 from notes_api.exceptions import (
     WrongDate,
@@ -49,6 +47,7 @@ from notes_api.exceptions import (
     NotEnoughPermissions,
 )
 from telegram_utils.buttons_generator import generate_buttons
+from telegram_utils.message_router import MessageRouter
 
 
 @bot.message_handler(content_types=["migrate_to_chat_id"], chat_types=["group"])
@@ -73,15 +72,15 @@ UPDATE groups
             params=params,
             commit=True,
         )
-    bot.send_message(
+    send_scheduler.send(
+        message.migrate_to_chat_id,
+        bot.send_message,
         message.migrate_to_chat_id,
         get_translate("text.migrate").format(**params),
         reply_markup=delmarkup(),
     )
 
 
-@bot.message_handler(commands=[*config.COMMANDS])
-@bot.message_handler(func=lambda m: m.text.startswith("/open_"))
 @process_account
 def bot_command_handler(message: Message):
     """
@@ -101,9 +100,6 @@ def bot_callback_query_handler(call: CallbackQuery):
     callback_handler(call)
 
 
-@bot.message_handler(
-    func=lambda m: m.text.startswith("#") and not m.text.startswith("#️⃣")
-)
 @process_account
 def processing_search_message(message: Message):
     """
@@ -114,7 +110,6 @@ def processing_search_message(message: Message):
     search_results_message(query).send()
 
 
-@bot.message_handler(func=lambda m: re_inline_message.match(m.text))
 @process_account
 def inline_message_handler(message: Message):
     if re_edit_message.findall(message.text):
@@ -181,14 +176,6 @@ def inline_message_handler(message: Message):
                     delete_message_action(message)
 
 
-@bot.message_handler(
-    func=lambda m: (
-        m.reply_to_message
-        and m.reply_to_message.text
-        and m.reply_to_message.from_user.id == bot.user.id
-        and not m.quote
-    )
-)
 @process_account
 def processing_reply_message(message: Message):
     """
@@ -200,7 +187,6 @@ def processing_reply_message(message: Message):
     reply_handler(message, message.reply_to_message)
 
 
-@bot.message_handler(func=lambda m: add_group_state.get_state(m.chat.id))
 @process_account
 def processing_group_create_message(message: Message):
     """
@@ -227,7 +213,6 @@ def processing_group_create_message(message: Message):
                 delete_message_action(message)
 
 
-@bot.message_handler(func=lambda m: add_event_state.get_state(m.chat.id))
 @process_account
 def add_event_handler(message: Message):
     """
@@ -263,3 +248,25 @@ def add_event_handler(message: Message):
         delete_message_action(message)
 
     cache_add_event_date("")
+
+
+message_router = MessageRouter(
+    config.COMMANDS, bot.user.username, bot.user.id, chat_state_store.get_states
+)
+message_handlers = {
+    "command": bot_command_handler,
+    "search": processing_search_message,
+    "inline": inline_message_handler,
+    "reply": processing_reply_message,
+    "add_group": processing_group_create_message,
+    "add_event": add_event_handler,
+}
+
+
+@bot.message_handler(content_types=["text"])
+def bot_message_handler(message: Message):
+    """
+    Passes a text message to the handler chosen by message_router
+    """
+    if handler := message_handlers.get(message_router.route(message)):
+        handler(message)
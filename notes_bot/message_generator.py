@@ -1,23 +1,27 @@
 from io import StringIO
 from copy import deepcopy
+from threading import Lock
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterable
 
 # noinspection PyPackageRequirements
 from telebot.apihelper import ApiTelegramException
 
 # noinspection PyPackageRequirements
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, Message, InputFile
+from cachetools import LRUCache
 
-import config
+from config import PAGES_CACHE_SIZE
 from notes_bot.bot import bot
 from notes_bot.request import request
 from notes_bot.lang import get_translate
 from notes_bot.time_utils import relatively_string_date
-from notes_bot.buttons_utils import encode_id, number_to_power
+from notes_bot.send_scheduler import send_scheduler, CALLBACK_ANSWER
 from notes_bot.utils import add_status_effect, get_message_thread_id
+from notes_bot.buttons_utils import encode_id, encoded_id_length, number_to_power
 from notes_api.logger import logger
 from notes_api.types import db, Event
+from notes_api.utils import sql_order
 from notes_api.exceptions import EventNotFound, DataBaseError
 
 
@@ -50,10 +54,44 @@ event_formats = {
 """
 
 
-def calculate_days_before_event(date, statuses):
-    return Event(0, "", 0, date, "", statuses, "", "", "").days_before_event(
-        request.entity.settings.timezone
-    )
+def split_pages(
+    rows: Iterable[tuple[int, int]],
+    max_group_len: int = 10,
+    max_group_symbols_count: int = 2500,
+    max_group_id_len: int = 39,
+) -> list[str]:
+    """
+    Splits (event_id, text length) rows into pages of comma-separated ids.
+    The length of encode_id of the page is counted when an id is added.
+
+    >>> split_pages([(1, 100), (2, 2000), (3, 1000), (4, 10)])
+    ['1,2', '3,4']
+    """
+    result = []
+    group: list[str] = []
+    group_sum = group_id_len = 0
+    previous_id = None
+
+    for event_id, text_len in rows:
+        id_len = encoded_id_length(event_id, previous_id)
+        if group and (
+            len(group) >= max_group_len
+            or group_sum + text_len > max_group_symbols_count
+            or group_id_len + id_len > max_group_id_len
+        ):
+            result.append(",".join(group))
+            group, group_sum, group_id_len = [], 0, 0
+            id_len = encoded_id_length(event_id)
+
+        group.append(str(event_id))
+        group_sum += text_len
+        group_id_len += id_len
+        previous_id = event_id
+
+    if group:
+        result.append(",".join(group))
+
+    return result
 
 
 def pagination(
@@ -73,42 +111,81 @@ def pagination(
     :param order:
     The amount of data in a button is limited to 64 characters
     """
-
-    db.register_function("DAYS_BEFORE_EVENT", calculate_days_before_event)
-    data = db.execute(
-        f"""
+    return split_pages(
+        db.iterate(
+            f"""
 SELECT event_id,
        LENGTH(text)
   FROM events
  WHERE {sql_where}
- ORDER BY {config.sql_order_dict[order]}
+ ORDER BY {sql_order(order, request.entity.settings.timezone)}
  LIMIT 400;
 """,
-        params=params,
+            params=params,
+        ),
+        max_group_len,
+        max_group_symbols_count,
+        max_group_id_len,
     )
-    _result = []
-    group = []
-    group_sum = 0
-
-    for event_id, text_len in data:
-        event_id = str(event_id)
-        if (
-            len(group) < max_group_len
-            and group_sum + text_len <= max_group_symbols_count
-            and len(encode_id([int(i) for i in group + [event_id]])) <= max_group_id_len
-        ):
-            group.append(event_id)
-            group_sum += text_len
-        else:
-            if group:
-                _result.append(",".join(group))
-            group = [event_id]
-            group_sum = text_len
 
-    if group:
-        _result.append(",".join(group))
 
-    return _result
+db.register_statement(
+    "events_versions.get",
+    """
+SELECT version
+  FROM events_versions
+ WHERE owner = :owner;
+""",
+)
+
+pages_cache: LRUCache[tuple, tuple[int, list[str]]] = LRUCache(
+    maxsize=max(PAGES_CACHE_SIZE, 1)
+)
+pages_cache_lock = Lock()
+pages_cache_stats = {"hits": 0, "misses": 0}
+
+
+def cached_pagination(
+    sql_where: str, params: dict | tuple, view: str, order: str = "usual"
+) -> list[str]:
+    """
+    pagination() of the events of request.entity, cached per view
+    (the callback_data of the page buttons), condition, params, order and
+    the current date of the user. A cached split is used while the version
+    of the owner in events_versions is the same, the triggers on events
+    increase it on every change.
+    """
+    if PAGES_CACHE_SIZE <= 0:
+        return pagination(sql_where, params, order=order)
+
+    if request.entity.group_id:
+        owner = f"g{request.entity.group_id}"
+    else:
+        owner = f"u{request.entity.user_id}"
+
+    key = (
+        owner,
+        view.strip(),
+        sql_where,
+        repr(params),
+        order,
+        f"{request.entity.now_time():%Y-%m-%d}",
+    )
+    version = db.execute("events_versions.get", params={"owner": owner})
+    version = version[0][0] if version else 0
+
+    with pages_cache_lock:
+        cached = pages_cache.get(key)
+        hit = cached is not None and cached[0] == version
+        pages_cache_stats["hits" if hit else "misses"] += 1
+
+    if hit:
+        return cached[1]
+
+    data = pagination(sql_where, params, order=order)
+    with pages_cache_lock:
+        pages_cache[key] = (version, data)
+    return data
 
 
 class TextMessage:
@@ -119,8 +196,11 @@ class TextMessage:
         self.markup = markup
 
     def send(self, chat_id: int | None = None, **kwargs) -> Message:
-        return bot.send_message(
-            chat_id=int(chat_id or request.chat_id),
+        chat_id = int(chat_id or request.chat_id)
+        return send_scheduler.send(
+            chat_id,
+            bot.send_message,
+            chat_id=chat_id,
             text=self.text,
             reply_markup=self.markup,
             message_thread_id=get_message_thread_id(),
@@ -163,27 +243,27 @@ class TextMessage:
 
             message_id = message.message_id
 
+        chat_id, message_id = int(chat_id or request.chat_id), int(message_id)
+
         if only_markup:
-            bot.edit_message_reply_markup(
-                chat_id=int(chat_id or request.chat_id),
-                message_id=int(message_id),
+            send_scheduler.send(
+                chat_id,
+                bot.edit_message_reply_markup,
+                chat_id=chat_id,
+                message_id=message_id,
                 reply_markup=self.markup,
                 **kwargs,
             )
-        elif markup is not None:
-            bot.edit_message_text(
-                text=self.text,
-                chat_id=int(chat_id or request.chat_id),
-                message_id=int(message_id),
-                reply_markup=markup,
-                **kwargs,
-            )
         else:
-            bot.edit_message_text(
+            # Only the last of the waiting edits of the message is sent
+            send_scheduler.send(
+                chat_id,
+                bot.edit_message_text,
+                coalesce_key=("edit_message_text", chat_id, message_id),
                 text=self.text,
-                chat_id=int(chat_id or request.chat_id),
-                message_id=int(message_id),
-                reply_markup=self.markup,
+                chat_id=chat_id,
+                message_id=message_id,
+                reply_markup=self.markup if markup is None else markup,
                 **kwargs,
             )
 
@@ -201,7 +281,9 @@ class TextMessage:
             else:
                 message = request.query.message
 
-        bot.reply_to(
+        send_scheduler.send(
+            message.chat.id,
+            bot.reply_to,
             message=message,
             text=self.text,
             reply_markup=self.markup,
@@ -224,7 +306,15 @@ class CallBackAnswer:
             call_id = request.query.id
 
         try:
-            bot.answer_callback_query(call_id, self.text, show_alert, url)
+            send_scheduler.send(
+                None,
+                bot.answer_callback_query,
+                call_id,
+                self.text,
+                show_alert,
+                url,
+                priority=CALLBACK_ANSWER,
+            )
         except ApiTelegramException as e:
             if (
                 "Bad Request: query is too old and response timeout expired or query ID is invalid"
@@ -238,8 +328,11 @@ class ChatAction:
         self.action = action
 
     def send(self, chat_id: int | None = None, **kwargs) -> None:
-        bot.send_chat_action(
-            chat_id=chat_id or request.chat_id,
+        chat_id = chat_id or request.chat_id
+        send_scheduler.send(
+            chat_id,
+            bot.send_chat_action,
+            chat_id=chat_id,
             action=self.action,
             message_thread_id=getattr(request.query, "message_thread_id", None),
             **kwargs,
@@ -262,8 +355,11 @@ class DocumentMessage:
         ) or file_name
 
     def send(self, chat_id: int | None = None, **kwargs):
-        bot.send_document(
-            chat_id=chat_id or request.chat_id,
+        chat_id = chat_id or request.chat_id
+        send_scheduler.send(
+            chat_id,
+            bot.send_document,
+            chat_id=chat_id,
             document=InputFile(self.__document, self.file_name),
             caption=self.caption,
             message_thread_id=getattr(request.query, "message_thread_id", None),
@@ -358,10 +454,9 @@ class EventsMessage(TextMessage):
         """
         Get a list of row id tuples by page
         """
-        data = pagination(sql_where, params)
+        data = cached_pagination(sql_where, params, callback_data, order)
 
         if data:
-            db.register_function("DAYS_BEFORE_EVENT", calculate_days_before_event)
             first_message = [
                 Event(*event)
                 for event in db.execute(
@@ -378,7 +473,7 @@ SELECT user_id,
   FROM events
  WHERE event_id IN ({data[0]})
        AND ({sql_where})
- ORDER BY {config.sql_order_dict[order]};
+ ORDER BY {sql_order(order, request.entity.settings.timezone)};
 """,
                     params=params,
                 )
@@ -423,13 +518,27 @@ SELECT user_id,
         return self
 
     def get_page_events(
-        self, sql_where: str, params: tuple, id_list: list[int], order: str = "usual"
+        self,
+        sql_where: str,
+        params: tuple | dict,
+        id_list: list[int],
+        order: str = "usual",
     ):
         """
         Returns events included in values with the WHERE condition
         """
+        if isinstance(params, dict):
+            owner = "user_id IS :entity_user_id AND group_id IS :entity_group_id"
+            params = {
+                **params,
+                "entity_user_id": request.entity.safe_user_id,
+                "entity_group_id": request.entity.group_id,
+            }
+        else:
+            owner = "user_id IS ? AND group_id IS ?"
+            params = (request.entity.safe_user_id, request.entity.group_id, *params)
+
         try:
-            db.register_function("DAYS_BEFORE_EVENT", calculate_days_before_event)
             res = [
                 Event(*event)
                 for event in db.execute(
@@ -444,18 +553,12 @@ SELECT user_id,
        recent_changes_time,
        removal_time
   FROM events
- WHERE user_id IS ?
-       AND group_id IS ?
-       AND event_id IN ({','.join('?' for _ in id_list)})
+ WHERE {owner}
+       AND event_id IN ({','.join(str(int(event_id)) for event_id in id_list)})
        AND ({sql_where})
- ORDER BY {config.sql_order_dict[order]};
+ ORDER BY {sql_order(order, request.entity.settings.timezone)};
 """,
-                    params=(
-                        request.entity.safe_user_id,
-                        request.entity.group_id,
-                        *id_list,
-                        *params,
-                    ),
+                    params=params,
                 )
             ]
         except DataBaseError as e:
@@ -0,0 +1,448 @@
+from time import monotonic
+from collections import deque
+from dataclasses import dataclass
+from contextlib import nullcontext
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# noinspection PyPackageRequirements
+from telebot.apihelper import ApiTelegramException
+
+import config
+from notes_bot.request import request
+from notes_bot.message_generator import EventsMessage
+from notes_bot.bot_messages import (
+    notification_message,
+    week_event_list_message,
+    week_events_condition,
+    notification_events_condition,
+)
+from notes_bot.types import (
+    TelegramUser,
+    TelegramGroup,
+    TelegramAccount,
+    TelegramSettings,
+)
+from notes_api.logger import logger
+from notes_api.utils import chunks
+from notes_api.types import db, db_connect_decorator
+
+db.register_statement(
+    "notifications.recipients",
+    """
+-- send_notifications_messages
+SELECT s.lang,
+       s.sub_urls,
+       s.city,
+       s.timezone,
+       s.notifications,
+       s.notifications_time,
+       s.theme,
+       u.user_id,
+       u.chat_id,
+       u.user_status,
+       u.username,
+       u.password,
+       u.max_event_id,
+       u.reg_date,
+       g.group_id,
+       g.chat_id,
+       g.name,
+       g.owner_id,
+       g.max_event_id,
+       m.entry_date,
+       m.member_status,
+       s.utc_minute_of_day
+  FROM tg_settings AS s
+  LEFT JOIN groups AS g
+    ON g.group_id = s.group_id
+  -- The group notifications are sent on behalf of the group owner
+  JOIN users AS u
+    ON u.user_id = COALESCE(s.user_id, g.owner_id)
+  LEFT JOIN members AS m
+    ON m.group_id = g.group_id
+       AND m.user_id = g.owner_id
+ WHERE s.notifications != 0
+       AND s.utc_minute_of_day BETWEEN :from_minute AND :to_minute
+       AND u.user_status != -1
+       AND u.chat_id IS NOT NULL
+       AND (s.group_id IS NULL OR g.chat_id IS NOT NULL);
+""",
+)
+db.register_statement(
+    "notifications.claim",
+    """
+INSERT INTO notification_deliveries (chat_id, local_date, kind, status)
+VALUES (:chat_id, :local_date, :kind, 'sending')
+    ON CONFLICT DO NOTHING
+RETURNING chat_id;
+""",
+)
+db.register_statement(
+    "notifications.set_status",
+    """
+UPDATE notification_deliveries
+   SET status = :status,
+       delivery_time = DATETIME()
+ WHERE chat_id = :chat_id
+       AND local_date = :local_date
+       AND kind = :kind;
+""",
+)
+
+notification_reports: deque[dict[str, str | int | float]] = deque(maxlen=1440)
+"""Reports of the last notification slots"""
+
+
+@dataclass
+class Recipient:
+    account: TelegramAccount
+    n_type: int
+    """1 - events of the day, 2 - events of the week"""
+    n_date: datetime
+    """Time of the slot in the timezone of the recipient"""
+
+    @property
+    def delivery_key(self) -> dict[str, int | str]:
+        return {
+            "chat_id": self.account.request_chat_id,
+            "local_date": f"{self.n_date:%Y-%m-%d}",
+            "kind": self.n_type,
+        }
+
+
+def get_recipients(n_date: datetime, minutes: int = 1) -> list[Recipient]:
+    """
+    Accounts with notifications at the last `minutes` minutes up to `n_date` (UTC),
+    whose notification of that day was not delivered yet.
+    Only the notifications of the current day of the recipient are returned,
+    the missed ones of the previous day are not sent.
+    Banned users and the groups of banned owners are skipped.
+    """
+    minute = n_date.hour * 60 + n_date.minute
+    first_minute = (minute - minutes + 1) % 1440
+    if minutes >= 1440:
+        ranges = ((0, 1439),)
+    elif first_minute <= minute:
+        ranges = ((first_minute, minute),)
+    else:  # The minutes before and after midnight
+        ranges = ((first_minute, 1439), (0, minute))
+
+    rows = [
+        row
+        for from_minute, to_minute in ranges
+        for row in db.execute(
+            "notifications.recipients",
+            params={"from_minute": from_minute, "to_minute": to_minute},
+        )
+    ]
+
+    recipients = []
+    for row in rows:
+        settings = TelegramSettings(*row[:7])
+        user = TelegramUser(*row[7:14])
+        group = TelegramGroup(*row[14:21]) if row[14] else None
+        account = TelegramAccount(
+            user.chat_id,
+            group.chat_id if group else None,
+            (user, group, settings),
+        )
+        utc_date = n_date - timedelta(minutes=(minute - row[21]) % 1440)
+        local_date = utc_date + timedelta(hours=settings.timezone)
+        if local_date.date() == (n_date + timedelta(hours=settings.timezone)).date():
+            recipients.append(Recipient(account, settings.notifications, local_date))
+
+    delivered = set()
+    for chunk in chunks(recipients, 400):
+        keys = [recipient.delivery_key for recipient in chunk]
+        chat_ids = {key["chat_id"] for key in keys}
+        local_dates = {key["local_date"] for key in keys}
+        delivered.update(
+            db.execute(
+                f"""
+SELECT chat_id,
+       local_date,
+       kind
+  FROM notification_deliveries
+ WHERE chat_id IN ({','.join('?' for _ in chat_ids)})
+       AND local_date IN ({','.join('?' for _ in local_dates)});
+""",
+                params=(*chat_ids, *local_dates),
+            )
+        )
+
+    return [
+        recipient
+        for recipient in recipients
+        if tuple(recipient.delivery_key.values()) not in delivered
+    ]
+
+
+def record_empty_deliveries(recipients: list[Recipient]) -> None:
+    """
+    Recipients without events are recorded too, so that the catch-up
+    does not send them the events added after their notification time
+    """
+    for chunk in chunks(recipients, 300):
+        db.execute(
+            f"""
+INSERT OR IGNORE INTO notification_deliveries (chat_id, local_date, kind, status)
+VALUES {", ".join("(?, ?, ?, 'empty')" for _ in chunk)};
+""",
+            params=tuple(
+                value
+                for recipient in chunk
+                for value in recipient.delivery_key.values()
+            ),
+            commit=True,
+        )
+
+
+def filter_due_recipients(recipients: list[Recipient]) -> list[Recipient]:
+    """
+    Recipients that have events to notify about.
+    The recipients with the same type and date share the WHERE condition,
+    so the owners of the matching events are selected with one query
+    per such batch (separately for users and groups, 500 owners each).
+    """
+    batches: dict[tuple[int, str], list[Recipient]] = {}
+    for recipient in recipients:
+        key = (recipient.n_type, f"{recipient.n_date:%Y-%m-%d}")
+        batches.setdefault(key, []).append(recipient)
+
+    due = []
+    for (n_type, _), batch in batches.items():
+        if n_type == 2:
+            condition, params = week_events_condition(batch[0].n_date)
+        else:
+            condition, params = notification_events_condition(batch[0].n_date), ()
+
+        for column, other_column, is_group in (
+            ("user_id", "group_id", False),
+            ("group_id", "user_id", True),
+        ):
+            owners: dict[int | str, list[Recipient]] = {}
+            for recipient in batch:
+                if bool(recipient.account.group_id) == is_group:
+                    owners.setdefault(recipient.account.request_id, []).append(
+                        recipient
+                    )
+
+            for owner_ids in chunks(list(owners), 500):
+                for (owner_id,) in db.execute(
+                    f"""
+SELECT DISTINCT {column}
+  FROM events
+ WHERE {column} IN ({','.join('?' for _ in owner_ids)})
+       AND {other_column} IS NULL
+       AND {condition};
+""",
+                    params=(*owner_ids, *params),
+                ):
+                    due.extend(owners[owner_id])
+
+    return due
+
+
+def render_notification(recipient: Recipient) -> EventsMessage | None:
+    request.entity = recipient.account
+
+    if recipient.n_type == 2:
+        return week_event_list_message(now=recipient.n_date)
+
+    return notification_message(recipient.n_date, from_command=True)
+
+
+def notify(recipient: Recipient, new_connection: bool) -> str:
+    """
+    Renders and sends the notification of one recipient.
+    Before sending it is claimed in notification_deliveries,
+    a recipient that is already claimed is skipped.
+    The connection is released before sending, because send waits
+    for the send_scheduler tokens.
+
+    :return: "sent", "empty", "duplicates" or "failed"
+    """
+    chat_id = recipient.account.request_chat_id
+    connection = db.connect if new_connection else nullcontext
+    try:
+        with connection():
+            generated = render_notification(recipient)
+
+            if not generated or not generated.event_list:
+                record_empty_deliveries([recipient])
+                return "empty"
+
+            if not db.execute(
+                "notifications.claim", params=recipient.delivery_key, commit=True
+            ):
+                return "duplicates"
+    except Exception as e:
+        logger.exception(e)
+        return "failed"
+
+    try:
+        generated.send(chat_id)
+        status = "sent"
+    except ApiTelegramException as e:
+        logger.info(f"notifications -> {chat_id} -> Error {e}")
+        status = "failed"
+    else:
+        logger.info(f"notifications -> {chat_id} -> Ok")
+
+    try:
+        with connection():
+            db.execute(
+                "notifications.set_status",
+                params={**recipient.delivery_key, "status": status},
+                commit=True,
+            )
+    except Exception as e:
+        logger.exception(e)
+
+    return status
+
+
+@db_connect_decorator
+def resolve_due_recipients(
+    n_date: datetime, minutes: int
+) -> tuple[int, list[Recipient]]:
+    recipients = get_recipients(n_date, minutes)
+    due = filter_due_recipients(recipients)
+    due_ids = {id(recipient) for recipient in due}
+    record_empty_deliveries([r for r in recipients if id(r) not in due_ids])
+    return len(recipients), due
+
+
+def send_notifications_messages(
+    n_date: datetime | None = None,
+    workers: int = config.NOTIFICATIONS_WORKERS,
+    minutes: int = 1,
+) -> dict[str, str | int | float]:
+    """
+    Sends the notifications of the slot `n_date` (UTC, now by default).
+
+    1. Recipients with their settings are selected with one query,
+       the ones that are in notification_deliveries for this day are skipped.
+    2. The recipients without events are dropped by a few set-based queries.
+    3. The messages are rendered by `workers` threads,
+       each with its own database connection
+       (0 - in the current thread with one connection for all of them).
+    4. The messages are sent through send_scheduler, which limits the rate.
+
+    :param minutes: Also send the undelivered notifications of today
+        from the previous minutes (catch_up_notifications)
+    :return: Slot report, it is also logged and kept in notification_reports
+    """
+    start = monotonic()
+    n_date = n_date or datetime.now(timezone.utc)
+    report = {
+        "slot": f"{n_date:%Y-%m-%d %H:%M}",
+        "minutes": minutes,
+        "recipients": 0,
+        "due": 0,
+        "sent": 0,
+        "empty": 0,
+        "duplicates": 0,
+        "failed": 0,
+    }
+
+    report["recipients"], due = resolve_due_recipients(n_date, minutes)
+    report["due"] = len(due)
+
+    if workers and due:
+        with ThreadPoolExecutor(workers, "Notifications") as executor:
+            results = [
+                executor.submit(copy_context().run, notify, recipient, True)
+                for recipient in due
+            ]
+            results = [future.result() for future in results]
+    else:
+        # resolve_due_recipients has closed its connection, unless it was opened outside
+        with nullcontext() if db.is_connected else db.connect():
+            results = [notify(recipient, False) for recipient in due]
+
+    for result in results:
+        report[result] += 1
+
+    report["duration"] = round(monotonic() - start, 3)
+    notification_reports.append(report)
+    if report["recipients"]:
+        logger.info(
+            f"notifications {report['slot']} ({minutes} min): "
+            f"recipients {report['recipients']}, due {report['due']}, "
+            f"sent {report['sent']}, empty {report['empty']}, "
+            f"duplicates {report['duplicates']}, failed {report['failed']}, "
+            f"{report['duration']}s"
+        )
+    return report
+
+
+@db_connect_decorator
+def reset_notification_deliveries() -> None:
+    """
+    Releases the claims left by a stopped process, they are sent again
+    by the catch-up. Must be called before the first slot is started.
+    """
+    db.execute(
+        """
+DELETE FROM notification_deliveries
+      WHERE status = 'sending';
+""",
+        commit=True,
+    )
+
+
+@db_connect_decorator
+def clear_notification_deliveries() -> None:
+    """
+    Removes the records older than a week
+    """
+    db.execute(
+        """
+DELETE FROM notification_deliveries
+      WHERE local_date < DATE('now', '-7 days');
+""",
+        commit=True,
+    )
+
+
+@db_connect_decorator
+def last_delivery_time() -> datetime | None:
+    """
+    UTC time of the last record in notification_deliveries
+    """
+    (delivery_time,) = db.execute(
+        """
+SELECT MAX(delivery_time)
+  FROM notification_deliveries;
+"""
+    )[0]
+    if delivery_time is None:
+        return None
+
+    return datetime.fromisoformat(delivery_time).replace(tzinfo=timezone.utc)
+
+
+def catch_up_notifications(
+    n_date: datetime | None = None,
+    workers: int = config.NOTIFICATIONS_CATCH_UP_WORKERS,
+) -> dict[str, str | int | float]:
+    """
+    Called on startup after reset_notification_deliveries.
+    Sends today's notifications whose time has passed while the bot was stopped,
+    that is since the last record in notification_deliveries.
+    Without records (the first start with the table) nothing is known to be missed,
+    the notifications of today may have been sent before, so only the current
+    minute is sent.
+    `workers` is lower than for a usual slot and the sending is limited
+    by send_scheduler, so there is no burst.
+    """
+    n_date = n_date or datetime.now(timezone.utc)
+    minutes = 1
+    if last_time := last_delivery_time():
+        stopped = (n_date - last_time).total_seconds() // 60 + 1
+        minutes = int(min(max(stopped, 1), 1440))
+
+    return send_notifications_messages(n_date, workers, minutes=minutes)
@@ -0,0 +1,257 @@
+from collections.abc import Callable, Hashable
+from itertools import count
+from threading import Condition
+from time import monotonic
+from typing import Any
+
+from cachetools import LRUCache
+
+# noinspection PyPackageRequirements
+from telebot.apihelper import ApiTelegramException
+
+import config
+from notes_api.logger import logger
+from notes_api.types import db
+
+CALLBACK_ANSWER, MESSAGE = 0, 1
+"""Priorities, lower goes first"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.blocked_until = 0.0
+
+    def _tokens(self, now: float) -> float:
+        return min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+
+    def delay(self, now: float) -> float:
+        """
+        Seconds until a token is available (0 - now)
+        """
+        if now < self.blocked_until:
+            return self.blocked_until - now
+
+        tokens = self._tokens(now)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self.tokens = self._tokens(now) - 1
+        self.updated = now
+
+
+class _Waiter:
+    __slots__ = ("bucket", "number", "priority", "superseded")
+
+    def __init__(self, priority: int, number: int, bucket: TokenBucket | None):
+        self.priority = priority
+        self.number = number
+        self.bucket = bucket
+        self.superseded = False
+
+
+class SendScheduler:
+    """
+    Every Telegram API call waits for a token of the global bucket
+    and of the bucket of its chat (`chat_rate` per second for private chats,
+    `group_rate` for groups). Callback answers take only the global token
+    and go before the messages that are waiting.
+
+    A call with the same `coalesce_key` as a waiting call replaces it,
+    the replaced call returns None without a request (only the last
+    edit_message_text of a message is sent, TextMessage.edit returns None anyway).
+
+    On 429 Too Many Requests the chat (or everything if there is no chat)
+    is paused for retry_after seconds and the call is repeated
+    up to `max_retries` times, unless retry_after is longer than `max_retry_after`.
+
+    Inside a database transaction (the handler of an update) the call does not
+    wait: waiting would hold the SQLite write lock. It is made at once,
+    its tokens are taken in advance from the next calls, and a 429 is raised
+    to the handler after the pause is set.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        group_rate: float = 20 / 60,
+        chat_burst: int = 3,
+        max_retries: int = 3,
+        max_retry_after: float = 30,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.condition = Condition()
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_buckets: LRUCache[int, TokenBucket] = LRUCache(maxsize=10_000)
+        self.waiting: list[_Waiter] = []
+        self.coalesce: dict[Hashable, _Waiter] = {}
+        self.numbers = count()
+        self.counters = {
+            "sent": 0,
+            "coalesced": 0,
+            "retried": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def send(
+        self,
+        chat_id: int | None,
+        func: Callable,
+        /,
+        *args,
+        priority: int = MESSAGE,
+        coalesce_key: Hashable | None = None,
+        **kwargs,
+    ) -> Any:
+        """
+        send_scheduler.send(chat_id, bot.send_message, chat_id=chat_id, text="")
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+
+        wait = not db.in_transaction
+        for attempt in range(self.max_retries + 1):
+            if not wait:
+                self.take(chat_id, priority, coalesce_key)
+            elif not self.acquire(chat_id, priority, coalesce_key):
+                return None
+
+            try:
+                result = func(*args, **kwargs)
+            except ApiTelegramException as e:
+                if e.error_code != 429:
+                    raise
+
+                parameters = (e.result_json or {}).get("parameters") or {}
+                retry_after = parameters.get("retry_after", 1)
+                self.pause(chat_id, retry_after)
+                if (
+                    not wait
+                    or attempt == self.max_retries
+                    or retry_after > self.max_retry_after
+                ):
+                    raise
+
+                logger.warning(f"[{chat_id}] 429, retry after {retry_after}")
+                with self.condition:
+                    self.counters["retried"] += 1
+            else:
+                with self.condition:
+                    self.counters["sent"] += 1
+                return result
+
+    def pause(self, chat_id: int | None, seconds: float) -> None:
+        with self.condition:
+            bucket = (
+                self.global_bucket if chat_id is None else self.chat_bucket(chat_id)
+            )
+            bucket.blocked_until = max(bucket.blocked_until, monotonic() + seconds)
+            self.condition.notify_all()
+
+    def take(
+        self, chat_id: int | None, priority: int, coalesce_key: Hashable | None
+    ) -> None:
+        """
+        Takes the tokens without waiting, the buckets may go below zero
+        """
+        with self.condition:
+            previous = self.coalesce.pop(coalesce_key, None)
+            if previous is not None:
+                previous.superseded = True
+                self.counters["coalesced"] += 1
+
+            now = monotonic()
+            self.global_bucket.take(now)
+            if chat_id is not None and priority != CALLBACK_ANSWER:
+                self.chat_bucket(chat_id).take(now)
+            self.condition.notify_all()
+
+    def acquire(
+        self, chat_id: int | None, priority: int, coalesce_key: Hashable | None
+    ) -> bool:
+        """
+        Waits for the tokens. False if the call was replaced by a newer one
+        """
+        with self.condition:
+            bucket = None
+            if chat_id is not None and priority != CALLBACK_ANSWER:
+                bucket = self.chat_bucket(chat_id)
+
+            waiter = _Waiter(priority, next(self.numbers), bucket)
+            if coalesce_key is not None:
+                if (previous := self.coalesce.get(coalesce_key)) is not None:
+                    previous.superseded = True
+                    self.counters["coalesced"] += 1
+                self.coalesce[coalesce_key] = waiter
+
+            self.waiting.append(waiter)
+            self.condition.notify_all()
+            start = monotonic()
+
+            try:
+                while not waiter.superseded:
+                    now = monotonic()
+                    timeout = bucket.delay(now) if bucket else 0
+
+                    if not timeout:
+                        first = min(
+                            (
+                                w
+                                for w in self.waiting
+                                if not w.bucket or not w.bucket.delay(now)
+                            ),
+                            key=lambda w: (w.priority, w.number),
+                        )
+                        if first is waiter:
+                            timeout = self.global_bucket.delay(now)
+                            if not timeout:
+                                self.global_bucket.take(now)
+                                if bucket:
+                                    bucket.take(now)
+                                return True
+                        else:
+                            # The first waiter notifies when it takes its tokens
+                            timeout = 1
+
+                    self.condition.wait(min(timeout, 1))
+
+                return False
+            finally:
+                self.waiting.remove(waiter)
+                if (
+                    coalesce_key is not None
+                    and self.coalesce.get(coalesce_key) is waiter
+                ):
+                    del self.coalesce[coalesce_key]
+
+                wait = monotonic() - start
+                self.counters["wait_total"] += wait
+                self.counters["wait_max"] = max(self.counters["wait_max"], wait)
+                self.condition.notify_all()
+
+
+send_scheduler = SendScheduler(
+    global_rate=config.SEND_GLOBAL_RATE,
+    chat_rate=config.SEND_CHAT_RATE,
+    group_rate=config.SEND_GROUP_RATE,
+    chat_burst=config.SEND_CHAT_BURST,
+    enabled=config.SEND_SCHEDULER,
+)
@@ -1,16 +1,17 @@
 import json
+from copy import deepcopy
+from threading import Lock
 from typing import Literal
 from ast import literal_eval
-from cachetools import LFUCache, cached
-from functools import cached_property
+from cachetools import LFUCache, TTLCache, cached
 
 # noinspection PyPackageRequirements
 from telebot.types import Message
 
-from config import ADMIN_IDS
+from config import ADMIN_IDS, ACCOUNT_CACHE_TTL
 from notes_bot.bot import bot
 from notes_api.utils import verify_password
-from notes_api.types import User, db, Group, Settings, Account
+from notes_api.types import User, db, Group, Settings, Account, lazy_field
 from notes_api.logger import logger
 from notes_api.exceptions import (
     ApiError,
@@ -26,6 +27,27 @@ class TelegramSettings(Settings):
     pass
 
 
+db.register_statement(
+    "tg_groups.get_from_chat_id",
+    """
+SELECT g.group_id,
+       g.chat_id,
+       g.name,
+       g.owner_id,
+       g.max_event_id,
+       u.user_status
+  FROM groups AS g
+  JOIN users  AS u
+    /*
+    If the user is banned, the group is banned for everyone `ON g.owner_id = u.user_id`
+    If a user is banned, the group is banned for that user  `ON u.chat_id = :user_chat_id`
+    */
+    ON u.chat_id = :user_chat_id
+ WHERE g.chat_id = :group_chat_id;
+""",
+)
+
+
 class TelegramGroup(Group):
     def __init__(
         self,
@@ -71,22 +93,7 @@ SELECT group_id,
     def get_from_chat_id(cls, group_chat_id: int, user_chat_id: int) -> "TelegramGroup":
         try:
             group = db.execute(
-                """
-SELECT g.group_id,
-       g.chat_id,
-       g.name,
-       g.owner_id,
-       g.max_event_id,
-       u.user_status
-  FROM groups AS g
-  JOIN users  AS u
-    /*
-    If the user is banned, the group is banned for everyone `ON g.owner_id = u.user_id`
-    If a user is banned, the group is banned for that user  `ON u.chat_id = :user_chat_id`
-    */
-    ON u.chat_id = :user_chat_id
- WHERE g.chat_id = :group_chat_id;
-""",
+                "tg_groups.get_from_chat_id",
                 params={
                     "group_chat_id": group_chat_id,
                     "user_chat_id": user_chat_id,
@@ -102,14 +109,7 @@ SELECT g.group_id,
         if user_status == -1:
             member_status = -1
         else:
-            telegram_group_member = bot.get_chat_member(group_chat_id, user_chat_id)
-            match telegram_group_member.status:
-                case "administrator":
-                    member_status = 1
-                case "creator":
-                    member_status = 2
-                case _:  # "member"
-                    member_status = 0
+            member_status = get_member_status(group_chat_id, user_chat_id)
 
         return TelegramGroup(
             group_id,
@@ -122,6 +122,33 @@ SELECT g.group_id,
         )
 
 
+def get_member_status(group_chat_id: int, user_chat_id: int) -> int:
+    telegram_group_member = bot.get_chat_member(group_chat_id, user_chat_id)
+    match telegram_group_member.status:
+        case "administrator":
+            return 1
+        case "creator":
+            return 2
+        case _:  # "member"
+            return 0
+
+
+db.register_statement(
+    "tg_users.get_from_chat_id",
+    """
+SELECT user_id,
+       chat_id,
+       user_status,
+       username,
+       password,
+       max_event_id,
+       reg_date
+  FROM users
+ WHERE chat_id = :chat_id;
+""",
+)
+
+
 class TelegramUser(User):
     def __init__(
         self,
@@ -173,17 +200,7 @@ SELECT user_id,
         # TODO защита от перебора брутфорса и количества попыток
         try:
             user = db.execute(
-                """
-SELECT user_id,
-       chat_id,
-       user_status,
-       username,
-       password,
-       max_event_id,
-       reg_date
-  FROM users
- WHERE chat_id = :chat_id;
-""",
+                "tg_users.get_from_chat_id",
                 params={"chat_id": chat_id},
             )[0]
         except DataBaseError as e:
@@ -222,19 +239,56 @@ SELECT user_id,
         return TelegramUser(*user)
 
 
+db.register_statement(
+    "tg_settings.get",
+    """
+SELECT lang,
+       sub_urls,
+       city,
+       timezone,
+       notifications,
+       notifications_time,
+       theme
+  FROM tg_settings
+ WHERE user_id IS :user_id
+       AND group_id IS :group_id;
+""",
+)
+
+
 class TelegramAccount(Account):
-    def __init__(self, chat_id: int, group_chat_id: int | None = None):
+    # account_versions of the snapshot in telegram_account_cache
+    cached_versions: tuple[int, int] | None = None
+
+    def __init__(
+        self,
+        chat_id: int,
+        group_chat_id: int | None = None,
+        snapshot: tuple[TelegramUser, TelegramGroup | None, TelegramSettings | None]
+        | None = None,
+    ):
+        """
+        :param chat_id: User chat_id
+        :param group_chat_id: Group chat_id
+        :param snapshot: user, group and settings (None if they were not loaded)
+        from telegram_account_cache, they are not requested from the database again
+        """
         self.chat_id, self.group_chat_id = chat_id, group_chat_id
+        if snapshot:
+            self.user, self.group, settings = snapshot
+            if settings is not None:
+                self.settings = settings
+
         super().__init__(
             self.user.user_id if not group_chat_id else 0,
             self.group.group_id if group_chat_id else None,
         )
 
-    @cached_property
+    @lazy_field
     def user(self) -> TelegramUser:
         return TelegramUser.get_from_chat_id(self.chat_id)
 
-    @cached_property
+    @lazy_field
     def group(self) -> TelegramGroup | None:
         if self.group_chat_id:
             return TelegramGroup.get_from_chat_id(self.group_chat_id, self.chat_id)
@@ -254,23 +308,15 @@ class TelegramAccount(Account):
         return self.user.user_status >= 2 or self.request_chat_id in ADMIN_IDS
 
     def get_settings(self) -> TelegramSettings:
-        return self.get_telegram_user_settings()
+        settings = self.get_telegram_user_settings()
+        if self.cached_versions is not None:
+            cache_telegram_account_settings(self, settings)
+        return settings
 
     def get_telegram_user_settings(self) -> TelegramSettings:
         try:
             settings = db.execute(
-                """
-SELECT lang,
-       sub_urls,
-       city,
-       timezone,
-       notifications,
-       notifications_time,
-       theme
-  FROM tg_settings
- WHERE user_id IS :user_id
-       AND group_id IS :group_id;
-""",
+                "tg_settings.get",
                 params={
                     "user_id": self.safe_user_id,
                     "group_id": self.group_id,
@@ -345,8 +391,8 @@ SELECT lang,
             if not -1 < hour < 24:
                 raise ValueError("hour must be more -1 and less 24")
 
-            if minute not in (0, 10, 20, 30, 40, 50):
-                raise ValueError("minute must be in [0, 10, 20, 30, 40, 50]")
+            if not -1 < minute < 60:
+                raise ValueError("minute must be more -1 and less 60")
 
             update_list.append("notifications_time")
             self.settings.notifications_time = notifications_time
@@ -644,6 +690,126 @@ UPDATE users
         raise ApiError(e)
 
 
+db.register_statement(
+    "account_versions.get",
+    """
+SELECT IFNULL((SELECT version FROM account_versions WHERE owner = :user), 0),
+       IFNULL((SELECT version FROM account_versions WHERE owner = :group), 0);
+""",
+)
+
+telegram_account_cache: TTLCache[
+    tuple[int, int | None],
+    tuple[
+        tuple[int, int],
+        tuple[TelegramUser, TelegramGroup | None, TelegramSettings | None],
+    ],
+] = TTLCache(maxsize=1000, ttl=max(ACCOUNT_CACHE_TTL, 1))
+telegram_account_cache_lock = Lock()
+telegram_account_cache_stats = {"hits": 0, "misses": 0}
+
+
+def get_account_versions(
+    user: TelegramUser, group: TelegramGroup | None
+) -> tuple[int, int]:
+    return tuple(
+        db.execute(
+            "account_versions.get",
+            params={
+                "user": f"u{user.user_id}",
+                "group": f"g{group.group_id}" if group else None,
+            },
+        )[0]
+    )
+
+
+def get_telegram_account(
+    chat_id: int, group_chat_id: int | None = None
+) -> TelegramAccount:
+    """
+    TelegramAccount(chat_id, group_chat_id) that reuses user, group and settings
+    of the previous updates of this chat for config.ACCOUNT_CACHE_TTL seconds.
+    A cached account is used while the versions of its user and group
+    in account_versions are the same, the triggers on users, groups, members
+    and tg_settings increase them on every change except max_event_id.
+    member_status of a group is always requested from Telegram.
+
+    user and group are loaded at once (Account.__init__ and the ban check need them),
+    settings are added to the cached account by the first handler that uses them.
+    """
+    if ACCOUNT_CACHE_TTL <= 0:
+        return TelegramAccount(chat_id, group_chat_id)
+
+    key = (chat_id, group_chat_id)
+    with telegram_account_cache_lock:
+        cached_account = telegram_account_cache.get(key)
+
+    if cached_account:
+        versions, snapshot = cached_account
+        if get_account_versions(*snapshot[:2]) == versions:
+            user, group, settings = deepcopy(snapshot)
+            if group and user.user_status != -1:
+                group.member_status = get_member_status(group_chat_id, chat_id)
+
+            with telegram_account_cache_lock:
+                telegram_account_cache_stats["hits"] += 1
+            account = TelegramAccount(chat_id, group_chat_id, (user, group, settings))
+            if settings is None:
+                account.cached_versions = versions
+            return account
+
+    # The versions and the rows are read in one transaction.
+    # user and group are read here and not on first access: user_id and group_id
+    # of the account come from them, the versions are keyed by them,
+    # and the ban check of the dispatcher reads user_status or member_status
+    # before every handler. On a hit neither row is read again.
+    with db.transaction():
+        account = TelegramAccount(chat_id, group_chat_id)
+        snapshot = deepcopy((account.user, account.group, None))
+        versions = get_account_versions(account.user, account.group)
+
+    with telegram_account_cache_lock:
+        telegram_account_cache_stats["misses"] += 1
+        telegram_account_cache[key] = (versions, snapshot)
+    account.cached_versions = versions
+    return account
+
+
+def cache_telegram_account_settings(
+    account: TelegramAccount, settings: TelegramSettings
+) -> None:
+    """
+    Adds the settings loaded by a handler to the cached account.
+    Not if the versions changed, also by uncommitted changes of this handler
+    """
+    versions, account.cached_versions = account.cached_versions, None
+    if get_account_versions(account.user, account.group) != versions:
+        return
+
+    key = (account.chat_id, account.group_chat_id)
+    with telegram_account_cache_lock:
+        cached_account = telegram_account_cache.get(key)
+        if cached_account and cached_account[0] == versions:
+            user, group, _ = cached_account[1]
+            telegram_account_cache[key] = (versions, (user, group, deepcopy(settings)))
+
+
+account_fields_stats: dict[str, dict[str, int]] = {}
+
+
+def record_account_fields(handler: str, account: Account | None) -> None:
+    """
+    Counts the handler calls and the lazy fields of the account
+    (user, group, settings, limit) that were loaded during them.
+    account_fields_stats -> {"mnm": {"calls": 10, "settings": 1}, ...}
+    """
+    with telegram_account_cache_lock:
+        stats = account_fields_stats.setdefault(handler, {"calls": 0})
+        stats["calls"] += 1
+        for field in account.loaded_fields if account else ():
+            stats[field] = stats.get(field, 0) + 1
+
+
 @cached(LFUCache(maxsize=1000), key=lambda m: m.chat.id)
 def add_chat_cached(message: Message) -> None:
     try:
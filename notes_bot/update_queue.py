@@ -0,0 +1,319 @@
+from collections import deque
+from collections.abc import Callable, Hashable
+from queue import Queue, SimpleQueue
+from threading import Condition, Lock, Thread
+from time import monotonic
+
+from cachetools import LRUCache
+
+# noinspection PyPackageRequirements
+from telebot.types import Update
+
+from notes_api.logger import logger
+
+_stop = object()
+_chat_update_types = (
+    "message",
+    "edited_message",
+    "channel_post",
+    "edited_channel_post",
+    "business_message",
+    "edited_business_message",
+    "message_reaction",
+    "message_reaction_count",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request",
+    "chat_boost",
+    "removed_chat_boost",
+)
+
+
+def update_chat_id(update: Update) -> int | None:
+    """
+    chat_id of the chat the update belongs to,
+    user_id for updates without a chat (inline queries, payments, ...)
+    """
+    for update_type in _chat_update_types:
+        if (obj := getattr(update, update_type, None)) is not None:
+            return obj.chat.id
+
+    if (call := update.callback_query) is not None:
+        return call.message.chat.id if call.message else call.from_user.id
+
+    for obj in vars(update).values():
+        if (user := getattr(obj, "from_user", None)) is not None:
+            return user.id
+
+    return None
+
+
+class UpdateQueue:
+    """
+    Updates are processed by `workers` threads in the order they were put.
+    The updates of one chat are processed one after another, never in parallel.
+
+    put returns False when `maxsize` updates are waiting or the queue is stopped,
+    the sender should retry later. Updates with an update_id from the last
+    `dedupe_size` accepted ones are skipped.
+    stop waits until the queue is empty and stops the workers.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[Update], None],
+        workers: int = 6,
+        maxsize: int = 1000,
+        dedupe_size: int = 10_000,
+    ):
+        self.process = process
+        self.maxsize = maxsize
+        self.lock = Lock()
+        self.empty = Condition(self.lock)
+        # Chats whose next update can be processed, each chat is here at most once
+        self.ready: SimpleQueue[Hashable] = SimpleQueue()
+        # Chats that are in `ready` or are being processed
+        self.pending: dict[Hashable, deque[tuple[float, Update]]] = {}
+        self.accepted_update_ids = LRUCache(maxsize=dedupe_size)
+        self.size = 0
+        self.accepting = True
+        self.threads = [
+            Thread(target=self.worker, name=f"UpdateQueue-{n}", daemon=True)
+            for n in range(workers)
+        ]
+        self.counters = {
+            "received": 0,
+            "duplicates": 0,
+            "rejected": 0,
+            "processed": 0,
+            "failed": 0,
+            "max_size": 0,
+            "active": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+        }
+
+    def start(self) -> "UpdateQueue":
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """
+        Counters and the current backpressure: size (accepted updates that are
+        not processed yet), chats (chats with such updates), wait_avg in seconds
+        """
+        with self.lock:
+            processed = self.counters["processed"] + self.counters["failed"]
+            return {
+                **self.counters,
+                "size": self.size,
+                "chats": len(self.pending),
+                "wait_avg": self.counters["wait_total"] / processed if processed else 0,
+            }
+
+    def put(self, update: Update) -> bool:
+        key = update_chat_id(update)
+        if key is None:
+            key = ("update", update.update_id)
+
+        with self.lock:
+            self.counters["received"] += 1
+
+            if update.update_id in self.accepted_update_ids:
+                self.counters["duplicates"] += 1
+                return True
+
+            if not self.accepting or self.size >= self.maxsize:
+                self.counters["rejected"] += 1
+                return False
+
+            self.accepted_update_ids[update.update_id] = True
+            self.size += 1
+            self.counters["max_size"] = max(self.counters["max_size"], self.size)
+
+            if key in self.pending:
+                self.pending[key].append((monotonic(), update))
+            else:
+                self.pending[key] = deque(((monotonic(), update),))
+                self.ready.put(key)
+
+        return True
+
+    def worker(self) -> None:
+        while (key := self.ready.get()) is not _stop:
+            with self.lock:
+                put_time, update = self.pending[key].popleft()
+                wait = monotonic() - put_time
+                self.counters["active"] += 1
+                self.counters["wait_total"] += wait
+                self.counters["wait_max"] = max(self.counters["wait_max"], wait)
+
+            result = "processed"
+            try:
+                self.process(update)
+            # A failed update is logged and counted, the worker keeps running
+            except Exception as e:  # noqa: BLE001
+                logger.exception(e)
+                result = "failed"
+
+            with self.lock:
+                self.counters["active"] -= 1
+                self.counters[result] += 1
+                self.size -= 1
+
+                if self.pending[key]:
+                    self.ready.put(key)
+                else:
+                    del self.pending[key]
+
+                if self.size == 0:
+                    self.empty.notify_all()
+
+    def stop(self, timeout: float | None = None) -> bool:
+        """
+        Stops accepting updates and waits `timeout` seconds
+        for the accepted ones. Returns False if some of them were not processed.
+        """
+        with self.lock:
+            self.accepting = False
+            drained = self.empty.wait_for(lambda: self.size == 0, timeout)
+
+        for _ in self.threads:
+            self.ready.put(_stop)
+
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join(timeout)
+
+        return drained
+
+
+class ShardedUpdateExecutor:
+    """
+    Updates are spread over `shards` threads by chat_id, so the updates
+    of one chat are always processed by the same thread, in order.
+    put blocks while the shard already has `maxsize` waiting updates,
+    for polling this delays the next getUpdates. Updates with an update_id
+    from the last `dedupe_size` put ones are skipped.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[Update], None],
+        shards: int = 4,
+        maxsize: int = 100,
+        dedupe_size: int = 10_000,
+    ):
+        self.process = process
+        self.lock = Lock()
+        self.accepted_update_ids = LRUCache(maxsize=dedupe_size)
+        self.duplicates = 0
+        self.queues: list[Queue[tuple[float, Update] | object]] = [
+            Queue(maxsize=maxsize) for _ in range(shards)
+        ]
+        self.threads = [
+            Thread(target=self.worker, args=(n,), name=f"UpdateShard-{n}", daemon=True)
+            for n in range(shards)
+        ]
+        self.counters = [
+            {
+                "processed": 0,
+                "failed": 0,
+                "wait_total": 0.0,
+                "wait_max": 0.0,
+                "run_total": 0.0,
+                "run_max": 0.0,
+            }
+            for _ in range(shards)
+        ]
+
+    def start(self) -> "ShardedUpdateExecutor":
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    @property
+    def stats(self) -> list[dict[str, int | float]]:
+        """
+        For each shard: depth (waiting updates), counters and
+        wait (from put to start) and run (processing) times in seconds
+        """
+        with self.lock:
+            result = []
+            for queue, counters in zip(self.queues, self.counters):
+                count = counters["processed"] + counters["failed"] or 1
+                result.append(
+                    {
+                        "depth": queue.qsize(),
+                        **counters,
+                        "wait_avg": counters["wait_total"] / count,
+                        "run_avg": counters["run_total"] / count,
+                    }
+                )
+            return result
+
+    def shard(self, update: Update) -> int:
+        key = update_chat_id(update)
+        return hash(update.update_id if key is None else key) % len(self.queues)
+
+    def put(self, update: Update) -> bool:
+        """
+        Returns False if the update was already put
+        """
+        with self.lock:
+            if update.update_id in self.accepted_update_ids:
+                self.duplicates += 1
+                return False
+
+            self.accepted_update_ids[update.update_id] = True
+
+        self.queues[self.shard(update)].put((monotonic(), update))
+        return True
+
+    def worker(self, n: int) -> None:
+        queue, counters = self.queues[n], self.counters[n]
+
+        while (item := queue.get()) is not _stop:
+            put_time, update = item
+            start_time = monotonic()
+
+            result = "processed"
+            try:
+                self.process(update)
+            # A failed update is logged and counted, the worker keeps running
+            except Exception as e:  # noqa: BLE001
+                logger.exception(e)
+                result = "failed"
+
+            wait, run = start_time - put_time, monotonic() - start_time
+            with self.lock:
+                counters[result] += 1
+                counters["wait_total"] += wait
+                counters["wait_max"] = max(counters["wait_max"], wait)
+                counters["run_total"] += run
+                counters["run_max"] = max(counters["run_max"], run)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Processes the updates that were put and stops the threads
+        """
+        for queue in self.queues:
+            queue.put(_stop)
+
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join(timeout)
+
+    def log_stats(self) -> None:
+        if self.duplicates:
+            logger.info(f"update shards: skipped {self.duplicates} duplicates")
+
+        for n, stats in enumerate(self.stats):
+            logger.info(
+                f"update shard {n}: depth {stats['depth']}, "
+                f"processed {stats['processed']}, failed {stats['failed']}, "
+                f"wait avg {stats['wait_avg']:.3f}s max {stats['wait_max']:.3f}s, "
+                f"run avg {stats['run_avg']:.3f}s max {stats['run_max']:.3f}s"
+            )
@@ -20,8 +20,9 @@ from notes_bot.bot import bot
 from notes_bot.request import request
 from notes_bot.lang import get_translate
 from notes_bot.time_utils import relatively_string_date
+from notes_bot.send_scheduler import send_scheduler
 from notes_api.logger import logger
-from notes_api.utils import is_admin_id, rate_limit, sqlite_format_date
+from notes_api.utils import is_admin_id, rate_limit, is_fts_word, fts_match_query
 
 
 re_inline_message = re.compile(rf"\A@{re.escape(bot.user.username)} ")
@@ -537,27 +538,70 @@ def extract_search_filters(message_html_text: str) -> list[list[str]]:
     ]
 
 
-def generate_search_sql_condition(query: str, filters: list[list[str]]):
+def split_search_query(query: str) -> list[str]:
     try:
-        query_words = shlex.split(query)
+        return shlex.split(query)
     except ValueError:
-        query_words = query.split()
+        return query.split()
 
-    splitquery = " OR ".join(
-        """
-date LIKE '%' || ? || '%'
- OR text LIKE '%' || ? || '%'
- OR statuses LIKE '%' || ? || '%'
- OR event_id LIKE '%' || ? || '%'
+
+def generate_search_fts_query(query: str) -> str:
+    """
+    MATCH expression for events_fts limited to the events of request.entity
+    """
+    if request.entity.group_id:
+        owner = f"g{request.entity.group_id}"
+    else:
+        owner = f"u{request.entity.user_id}"
+
+    return fts_match_query(split_search_query(query), owner)
+
+
+def generate_search_sql_condition(
+    query: str, filters: list[list[str]]
+) -> tuple[str, dict[str, int | str]]:
+    """
+    WHERE condition of the search with named parameters.
+    The MATCH expression is bound as :fts_query,
+    config.sql_order_dict["search"] orders by it.
+    """
+    query_words = split_search_query(query)
+    fts_query = generate_search_fts_query(query)
+    conditions = []
+    params = {
+        "user_id": request.entity.safe_user_id,
+        "group_id": request.entity.group_id,
+    }
+
+    def bind(value: int | str) -> str:
+        name = f"p{len(params)}"
+        params[name] = value
+        return f":{name}"
+
+    if fts_query:
+        conditions.append(
+            """
+rowid IN (
+    SELECT rowid
+      FROM events_fts
+     WHERE events_fts MATCH :fts_query
+)
 """
-        for _ in query_words
-    )
+        )
+        params["fts_query"] = fts_query
+
+    for word in query_words:
+        if word.isdigit():
+            conditions.append(f"event_id = {bind(int(word))}")
+        elif not is_fts_word(word):
+            # Punctuation is not in events_fts
+            conditions.append(f"text LIKE '%' || {bind(word)} || '%'")
+
+    splitquery = "\n OR ".join(condition.strip() for condition in conditions)
+
     filters_conditions_date = []
     filters_conditions_date_e = []
     filters_conditions_status = []
-    filters_params_date = []
-    filters_params_date_e = []
-    filters_params_status = []
 
     for _, f in filters[:6]:
         if m := re.compile(r"^([<>=])(\d{2}\.\d{2}\.\d{4})$").match(f):
@@ -565,14 +609,12 @@ date LIKE '%' || ? || '%'
 
             if condition == "=":
                 filters_conditions_date_e.append(
-                    f"{sqlite_format_date('date')} {condition}= ?"
+                    f"iso_date {condition}= {bind(sqlite_format_date2(date))}"
                 )
-                filters_params_date_e.append(sqlite_format_date2(date))
             else:
                 filters_conditions_date.append(
-                    f"{sqlite_format_date('date')} {condition}= ?"
+                    f"iso_date {condition}= {bind(sqlite_format_date2(date))}"
                 )
-                filters_params_date.append(sqlite_format_date2(date))
         elif m := re.compile(r"^([≈=≠])([^ \n]+)$").match(f):
             condition, status = m.groups()
             statuses = status.split(",")
@@ -580,10 +622,9 @@ date LIKE '%' || ? || '%'
             if condition == "=":
                 filters_conditions_status.append(
                     f"""
-statuses {condition}= JSON_ARRAY({','.join('?' for _ in statuses)})
+statuses {condition}= JSON_ARRAY({','.join(bind(status) for status in statuses)})
 """
                 )
-                filters_params_status.extend(statuses)
             if condition == "≠":
                 filters_conditions_status.append(
                     f"""
@@ -591,12 +632,11 @@ statuses {condition}= JSON_ARRAY({','.join('?' for _ in statuses)})
     NOT EXISTS (
         SELECT value
           FROM json_each(statuses)
-         WHERE value IN ({','.join('?' for _ in statuses)})
+         WHERE value IN ({','.join(bind(status) for status in statuses)})
     )
 )
 """
                 )
-                filters_params_status.extend(statuses)
             else:
                 filters_conditions_status.append(
                     f"""
@@ -604,12 +644,11 @@ statuses {condition}= JSON_ARRAY({','.join('?' for _ in statuses)})
     EXISTS (
         SELECT value
           FROM json_each(statuses)
-         WHERE value IN ({','.join('?' for _ in statuses)})
+         WHERE value IN ({','.join(bind(status) for status in statuses)})
     )
 )
 """
                 )
-                filters_params_status.extend(statuses)
 
     n = "\n"
 
@@ -650,21 +689,13 @@ statuses {condition}= JSON_ARRAY({','.join('?' for _ in statuses)})
         string_sql_filters_status = ""
 
     sql_where = f"""
-user_id IS ?
-AND group_id IS ?
+user_id IS :user_id
+AND group_id IS :group_id
 AND removal_time IS NULL
-AND ({splitquery.strip()})
+AND ({splitquery})
 {string_sql_filters_date}
 {string_sql_filters_status}
 """
-    params = (
-        request.entity.safe_user_id,
-        request.entity.group_id,
-        *[y for x in query_words for y in (x, x, x, x)],
-        *filters_params_date_e,
-        *filters_params_date,
-        *filters_params_status,
-    )
     # logger.debug(f"{WHERE} {params}")
     return sql_where, params
 
@@ -685,7 +716,9 @@ def set_bot_commands(not_login: bool = False):
 
     commands = get_translate(f"buttons.commands.{status}.{request.entity_type}")
     try:
-        bot.set_my_commands(commands, BotCommandScopeChat(request.chat_id))
+        send_scheduler.send(
+            None, bot.set_my_commands, commands, BotCommandScopeChat(request.chat_id)
+        )
     except ApiTelegramException as e:
         logger.error(f'set_bot_commands ApiTelegramException "{e}"')
 
@@ -1,4 +1,5 @@
 import os
+import atexit
 from threading import Thread
 
 # noinspection PyPackageRequirements
@@ -80,6 +81,20 @@ if (
     and config.TELEGRAM_WEBHOOK_FLASK_PATH
 ):
 
+    from notes_bot.update_queue import UpdateQueue
+
+    update_queue = UpdateQueue(
+        lambda update: bot.process_new_updates([update]),
+        workers=config.TELEGRAM_WEBHOOK_WORKERS,
+        maxsize=config.TELEGRAM_WEBHOOK_QUEUE_SIZE,
+    ).start()
+
+    @atexit.register
+    def stop_update_queue():
+        if not update_queue.stop(config.TELEGRAM_WEBHOOK_DRAIN_TIMEOUT):
+            logger.error("update queue was not drained")
+        logger.info(f"update queue stopped {update_queue.stats}")
+
     @app.post(config.TELEGRAM_WEBHOOK_FLASK_PATH)
     def process_updates():
         if request.headers.get("content-type") != "application/json":
@@ -89,9 +104,31 @@ if (
             if secret_token != config.TELEGRAM_WEBHOOK_SECRET_TOKEN:
                 return abort(403)
 
-        bot.process_new_updates([Update.de_json(request.json)])
+        try:
+            update = Update.de_json(request.get_json(silent=True))
+        except (KeyError, TypeError, ValueError):
+            update = None
+
+        if update is None:
+            return abort(400)
+
+        # Handlers run in the update_queue workers, Telegram gets the answer at once.
+        # When the queue is full Telegram will send the update again later.
+        if not update_queue.put(update):
+            logger.warning(f"update queue is full {update_queue.stats}")
+            return abort(503)
+
         return "ok", 200
 
+    @app.get(f"{config.TELEGRAM_WEBHOOK_FLASK_PATH.rstrip('/')}/stats")
+    def update_queue_stats():
+        # The same header as the updates, a query string would get into the access logs
+        token = config.TELEGRAM_WEBHOOK_SECRET_TOKEN
+        if not token or request.headers.get("X-Telegram-Bot-Api-Secret-Token") != token:
+            return abort(403)
+
+        return update_queue.stats
+
     if bot_webhook_info.url != config.TELEGRAM_WEBHOOK_URL:
         bot.remove_webhook()
         bot.set_webhook(
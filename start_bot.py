@@ -1,8 +1,13 @@
 import requests
+from time import sleep
 from threading import Thread
 
+# noinspection PyPackageRequirements
+from telebot.types import Update
+
 import config
 from notes_bot.main import bot
+from notes_bot.update_queue import ShardedUpdateExecutor
 from notes_bot.background_loop import start_background_loop
 from notes_bot.bot import bot_webhook_info, bot_log_info
 from notes_api.logger import logger
@@ -13,6 +18,23 @@ def start_bot():
         if bot_webhook_info.url:
             bot.remove_webhook()
 
+        process_new_updates = bot.process_new_updates
+        executor = ShardedUpdateExecutor(
+            lambda update: process_new_updates([update]),
+            shards=config.POLLING_SHARDS,
+            maxsize=config.POLLING_SHARD_QUEUE_SIZE,
+        ).start()
+        # Polling passes every batch from getUpdates to process_new_updates,
+        # the updates are handled by the shard of their chat instead
+        bot.process_new_updates = lambda updates: put_updates(executor, updates)
+
+        if config.POLLING_STATS_INTERVAL > 0:
+            Thread(
+                target=log_stats_loop,
+                args=(executor, config.POLLING_STATS_INTERVAL),
+                daemon=True,
+            ).start()
+
         try:
             bot.infinity_polling()
         except (
@@ -20,6 +42,29 @@ def start_bot():
             requests.exceptions.ConnectionError,
         ) as e:
             logger.error(str(e))
+        finally:
+            bot.process_new_updates = process_new_updates
+            executor.stop()
+            executor.log_stats()
+
+
+def put_updates(executor: ShardedUpdateExecutor, updates: list[Update]):
+    # The offset of the next getUpdates is last_update_id + 1. The original
+    # process_new_updates moves it, now it runs later in a shard thread,
+    # so move it here before the next getUpdates
+    if updates:
+        bot.last_update_id = max(
+            bot.last_update_id, *(update.update_id for update in updates)
+        )
+
+    for update in updates:
+        executor.put(update)
+
+
+def log_stats_loop(executor: ShardedUpdateExecutor, interval: int):
+    while True:
+        sleep(interval)
+        executor.log_stats()
 
 
 def start_notifications_thread():
@@ -1,3 +1,5 @@
+import re
+from ast import literal_eval
 from typing import Any, Literal, TypeAlias, Callable
 from datetime import datetime
 
@@ -79,6 +81,16 @@ def get_arguments(
     >>> get_arguments("2000.02.01", arguments_5)
     {'arg1': datetime.datetime(2000, 2, 1, 0, 0)}
     """
+    return compile_arguments(arguments)(text)
+
+
+def compile_arguments(
+    arguments: dict[str, _data_types | tuple[_data_types, Any]],
+) -> Callable[[str], dict[str, _return_types]]:
+    """
+    Checks `arguments` once and returns a function that parses a text with them,
+    compile_arguments(arguments)(text) == get_arguments(text, arguments)
+    """
     types = [(t[0] if isinstance(t, tuple) else t) for t in arguments.values()]
 
     if types.count("long str") > 1:
@@ -87,29 +99,27 @@ def get_arguments(
     if types.count("long str") and len(set(types)) > 1:
         raise SyntaxError('parameter after or before "long str"')
 
-    if not arguments:
-        return {}
+    names = tuple(arguments)
+    defaults = tuple(
+        (d[1] if isinstance(d, tuple) else None) for d in arguments.values()
+    )
+    long_str = "long str" in types
 
-    if not text:
-        return {
-            k: (v[1] if isinstance(v, tuple) else None) for k, v in arguments.items()
-        }
+    def parse(text: str) -> dict[str, _return_types]:
+        if not names:
+            return {}
 
-    args = [text.strip()] if "long str" in types else text.strip().split()
+        if not text:
+            return dict(zip(names, defaults))
 
-    result = {k: None for k in arguments}
-    defaults = ((d[1] if isinstance(d, tuple) else None) for d in arguments.values())
+        args = [text.strip()] if long_str else text.strip().split()
 
-    for i, (n, t, d) in enumerate(zip(arguments, types, defaults)):
-        try:
-            arg = args[int(i)]
-        except IndexError:
-            arg = d
-        else:
-            arg = __process_value(t, arg, d)
-        result[n] = arg
+        return {
+            n: __process_value(t, args[i], d) if i < len(args) else d
+            for i, (n, t, d) in enumerate(zip(names, types, defaults))
+        }
 
-    return result
+    return parse
 
 
 def __process_value(
@@ -149,3 +159,101 @@ def getargs(
         return get_arguments(text, arg)
 
     return closure
+
+
+_literal_token = re.compile(
+    r"\s*(?:"
+    r"(?P<str>'[^'\\\n]*'|\"[^\"\\\n]*\")"
+    r"|(?P<int>-?(?:0|[1-9][0-9]*)(?![.0-9]))"
+    r"|(?P<float>-?(?:0|[1-9][0-9]*)\.[0-9]+)"
+    r"|(?P<const>None|True|False)\b"
+    r"|(?P<open>\()"
+    r"|(?P<close>\))"
+    r"|(?P<comma>,)"
+    r")"
+)
+_constants = {"None": None, "True": True, "False": False}
+
+
+def parse_literal(text: str) -> Any:
+    """
+    ast.literal_eval for callback data made of tuples, strings, numbers and None.
+    Anything else (escapes in strings, lists, expressions, errors)
+    is passed to ast.literal_eval.
+
+    >>> parse_literal("('now',)")
+    ('now',)
+    >>> parse_literal("('dl','mnm',(2000,12),None)")
+    ('dl', 'mnm', (2000, 12), None)
+    >>> parse_literal("('en', 1, -3, 0, '08:00', 0.5)")
+    ('en', 1, -3, 0, '08:00', 0.5)
+    >>> parse_literal("(None,None,'now','sf (1, 2)')")
+    (None, None, 'now', 'sf (1, 2)')
+    >>> parse_literal("((1),()), 2"), parse_literal("'a'"), parse_literal("()")
+    (((1, ()), 2), 'a', ())
+    >>> parse_literal("[1, 2]")
+    [1, 2]
+    >>> try: parse_literal("(01,)")
+    ... except SyntaxError as e: type(e).__name__
+    'SyntaxError'
+    """
+    text = text.strip()
+    stack: list[list] = [[]]
+    commas = [False]
+    expect_value = True
+    position, end = 0, len(text)
+
+    while position < end:
+        match = _literal_token.match(text, position)
+        if match is None:
+            return literal_eval(text)
+
+        position = match.end()
+        kind = match.lastgroup
+
+        if kind == "comma":
+            if expect_value:
+                return literal_eval(text)
+            commas[-1] = expect_value = True
+        elif kind == "open":
+            if not expect_value:
+                return literal_eval(text)
+            stack.append([])
+            commas.append(False)
+        elif kind == "close":
+            if len(stack) == 1:
+                return literal_eval(text)
+            items, comma = stack.pop(), commas.pop()
+            if comma:
+                value = tuple(items)
+            elif len(items) == 1 and not expect_value:
+                value = items[0]
+            elif not items:
+                value = ()
+            else:
+                return literal_eval(text)
+            stack[-1].append(value)
+            expect_value = False
+        else:
+            if not expect_value:
+                return literal_eval(text)
+            token = match.group(kind)
+            if kind == "str":
+                value = token[1:-1]
+            elif kind == "int":
+                value = int(token)
+            elif kind == "float":
+                value = float(token)
+            else:
+                value = _constants[token]
+            stack[-1].append(value)
+            expect_value = False
+
+    items = stack[0]
+    if len(stack) != 1 or not items:
+        return literal_eval(text)
+    if commas[0]:
+        return tuple(items)
+    if len(items) == 1 and not expect_value:
+        return items[0]
+    return literal_eval(text)
@@ -0,0 +1,72 @@
+import re
+from collections.abc import Callable, Iterable
+
+# noinspection PyPackageRequirements
+from telebot.types import Message
+
+
+class MessageRouter:
+    """
+    Chooses the handler of a text message in one pass
+    instead of a chain of telebot filters that are checked one by one:
+
+    1. the first character of the text and `reply_to_message`
+    2. one compiled alternation for commands, "#" search and "@bot " messages
+    3. the chat states from `get_states`, only if nothing else matched
+
+    `route` returns the name of the route or None:
+    "command", "search", "inline", "reply" or one of `state_types`.
+
+    >>> router = MessageRouter(("start", "menu"), "namebot", 1, lambda _: {})
+    >>> router.match("/start"), router.match("/start@namebot 1")
+    ('command', 'command')
+    >>> router.match("/startx"), router.match("/open_1"), router.match("/x")
+    (None, 'command', None)
+    >>> router.match("#text"), router.match("#️⃣ text")
+    ('search', None)
+    >>> router.match("@namebot event(1, 2).text"), router.match("@namebot")
+    ('inline', None)
+    """
+
+    def __init__(
+        self,
+        commands: Iterable[str],
+        bot_username: str,
+        bot_id: int,
+        get_states: Callable[[int], dict[str, str]],
+        state_types: tuple[str, ...] = ("add_group", "add_event"),
+    ):
+        self.bot_id = bot_id
+        self.get_states = get_states
+        self.state_types = state_types
+        commands = "|".join(map(re.escape, sorted(commands, key=len, reverse=True)))
+        self.regex = re.compile(
+            rf"\A(?:(?P<command>/(?:(?:{commands})(?=[\s@]|\Z)|open_))"
+            r"|(?P<search>#(?!️⃣))"
+            rf"|(?P<inline>@{re.escape(bot_username)} ))"
+        )
+
+    def match(self, text: str) -> str | None:
+        if text and text[0] in "/#@" and (match := self.regex.match(text)):
+            return match.lastgroup
+        return None
+
+    def route(self, message: Message) -> str | None:
+        if route := self.match(message.text):
+            return route
+
+        reply = message.reply_to_message
+        if (
+            reply
+            and reply.text
+            and reply.from_user.id == self.bot_id
+            and not message.quote
+        ):
+            return "reply"
+
+        states = self.get_states(message.chat.id)
+        for state_type in self.state_types:
+            if states.get(state_type):
+                return state_type
+
+        return None
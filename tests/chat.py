@@ -12,7 +12,6 @@ from telebot import apihelper, util
 from telebot.types import Message, CallbackQuery
 
 from typing import Callable
-from sqlalchemy import create_engine
 
 import config
 import notes_api.types
@@ -138,6 +137,9 @@ apihelper.CUSTOM_REQUEST_SENDER = custom_sender
 
 
 config.BOT_TOKEN = "0:TEST_TOKEN"
+# The bot tests go through send_scheduler, the rates are high enough not to wait
+config.SEND_GLOBAL_RATE = config.SEND_CHAT_RATE = config.SEND_GROUP_RATE = 1000
+config.SEND_CHAT_BURST = 1000
 
 test_database_path = Path("tests/data/test_database.sqlite3")
 test_database_path.parent.mkdir(parents=True, exist_ok=True)
@@ -146,7 +148,9 @@ if test_database_path.exists():
     os.remove(test_database_path)
 
 config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{test_database_path}"
-notes_api.types.engine = create_engine(config.SQLALCHEMY_DATABASE_URI, echo=False)
+notes_api.types.engine = notes_api.types.create_sqlite_engine(
+    config.SQLALCHEMY_DATABASE_URI
+)
 notes_api.types.db = notes_api.types.DataBase()
 
 from notes_api.db_creator import create_tables  # noqa: E402
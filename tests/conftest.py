@@ -0,0 +1,25 @@
+import pytest
+
+from tests.chat import Chat, setup_request
+
+with Chat():
+    from notes_bot.request import request
+    from tests.mocks import message_mock
+
+
+@pytest.fixture
+def chat():
+    """
+    Chat() with the request of the user of chat 1
+    """
+    with Chat() as chat:
+        setup_request(message_mock(1, "/start"))
+        yield chat
+
+
+@pytest.fixture
+def create_events(chat):
+    """
+    create_events([(date, text), ...]) -> event_ids of request.entity
+    """
+    return lambda events: request.entity.create_events(events)
@@ -0,0 +1,40 @@
+from tests.chat import Chat
+
+with Chat():
+    from notes_bot.types import get_telegram_account, telegram_account_cache_stats
+
+
+def test_account_cache_versions():
+    with Chat():
+        get_telegram_account(1)
+        hits, misses = (
+            telegram_account_cache_stats["hits"],
+            telegram_account_cache_stats["misses"],
+        )
+        account = get_telegram_account(1)
+        assert telegram_account_cache_stats["hits"] == hits + 1
+
+        # A new event only moves users.max_event_id, the account stays cached
+        account.create_event("01.01.2000", "cached account")
+        get_telegram_account(1)
+        assert telegram_account_cache_stats["hits"] == hits + 2
+
+        # Any other change of the users row increases the version of the user
+        account.reset_user_token()
+        get_telegram_account(1)
+        assert telegram_account_cache_stats["misses"] == misses + 1
+
+
+def test_account_cache_lazy_settings():
+    with Chat():
+        account = get_telegram_account(1)
+        account.reset_user_token()
+
+        # A miss does not load the settings, the first handler that uses them adds them
+        account = get_telegram_account(1)
+        assert "settings" not in account.loaded_fields
+        lang = account.settings.lang
+
+        account = get_telegram_account(1)
+        assert account.settings.lang == lang
+        assert "settings" not in account.loaded_fields
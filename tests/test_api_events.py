@@ -0,0 +1,75 @@
+import pytest
+
+from tests.chat import Chat
+
+with Chat():
+    from notes_api.exceptions import ApiError, LimitExceeded
+    from notes_api.types import Account, db
+    from notes_bot.request import request
+
+
+def event_count(date: str) -> int:
+    return db.execute(
+        """
+SELECT COUNT( * )
+  FROM events
+ WHERE user_id = 1
+       AND date = ?;
+""",
+        params=(date,),
+    )[0][0]
+
+
+def test_create_events_user_ids(create_events):
+    first = create_events(
+        [("01.02.2003", "first"), ("02.02.2003", "second"), ("01.02.2003", "third")]
+    )
+    assert first == list(range(first[0], first[0] + 3))
+
+    # create_event and create_events take the ids from the same users.max_event_id
+    second = request.entity.create_event("01.02.2003", "fourth")
+    assert second == first[-1] + 1
+    assert create_events([("01.02.2003", "fifth")]) == [second + 1]
+    assert request.entity.get_event(first[1]).text == "second"
+
+
+def test_create_events_group_ids(create_events):
+    group_id = request.entity.create_group("create_events")
+    group = Account(request.entity.user_id, group_id)
+
+    assert group.create_events([("01.02.2003", "a"), ("01.02.2003", "b")]) == [1, 2]
+    assert group.create_events([("02.02.2003", "c")]) == [3]
+
+    rows = db.execute(
+        """
+SELECT event_id,
+       user_id,
+       text
+  FROM events
+ WHERE group_id = ?
+ ORDER BY event_id;
+""",
+        params=(group_id,),
+    )
+    assert rows == [(1, None, "a"), (2, None, "b"), (3, None, "c")]
+
+
+def test_create_events_limit(create_events):
+    # max_event_day is 20 for user_status 0, the limit is reached at 20
+    create_events([("05.05.2005", "event")] * 18)
+
+    with pytest.raises(LimitExceeded):
+        create_events([("05.05.2005", "event"), ("05.05.2005", "event")])
+    assert event_count("05.05.2005") == 18
+
+    create_events([("05.05.2005", "event")])
+    assert event_count("05.05.2005") == 19
+    with pytest.raises(LimitExceeded):
+        request.entity.create_event("05.05.2005", "event")
+
+
+def test_create_events_max_400(create_events):
+    with pytest.raises(ApiError):
+        create_events([(f"{n % 28 + 1:0>2}.06.2006", "event") for n in range(401)])
+
+    assert not db.execute("SELECT 1 FROM events WHERE date LIKE '%.06.2006';")
@@ -0,0 +1,51 @@
+from tests.chat import Chat, setup_request
+
+with Chat():
+    from notes_api.types import db, set_user_status
+    from notes_bot.request import request
+    from tests.mocks import message_mock
+    from notes_api.db_creator import rebuild_calendar_counts
+
+
+def calendar_counts() -> list[tuple]:
+    return db.execute("""
+SELECT *
+  FROM calendar_counts
+ ORDER BY owner, kind, year, month, day;
+""")
+
+
+def test_calendar_counts_triggers(monkeypatch, create_events):
+    # notes_api.db_creator holds the db from before tests.chat patched execute
+    monkeypatch.setattr("notes_api.db_creator.db", db)
+
+    set_user_status(request.entity.user_id, 1)  # The trash is for premium
+    setup_request(message_mock(1, "/start"))
+    entity = request.entity
+    first, second, third, fourth = create_events(
+        [
+            ("01.01.2000", "event"),
+            ("01.01.2000", "event"),
+            ("15.03.2001", "event"),
+            ("07.01.2000", "event"),
+        ]
+    )
+    entity.edit_event_status(first, ["🎉"])
+    entity.edit_event_status(second, ["🗞"])
+    entity.edit_event_status(fourth, ["📅"])
+    entity.edit_event_date(third, "16.04.2002")
+    entity.delete_event_to_bin(second)
+    entity.delete_event_to_bin(fourth)
+    entity.recover_event(fourth)
+    entity.delete_event(second, in_bin=True)
+
+    counts = calendar_counts()
+    assert ("u1", "yearly", 0, 1, 1, 1) in counts
+    assert ("u1", "monthly", 0, 0, 7, 1) in counts
+    assert ("u1", "day", 2000, 1, 1, 1) in counts
+    assert ("u1", "month", 2000, 1, 0, 2) in counts
+    assert ("u1", "year", 2002, 0, 0, 1) in counts
+    assert not [row for row in counts if row[1] == "weekly" or row[2] == 2001]
+
+    rebuild_calendar_counts()
+    assert calendar_counts() == counts
@@ -0,0 +1,24 @@
+import pytest
+
+from tests.chat import Chat
+
+with Chat():
+    from notes_api.types import db, ChatStateStore
+
+
+def test_chat_states_rollback():
+    with Chat():
+        store = ChatStateStore()
+        store.set_state(1, "test", "committed")
+        assert store.get_state(1, "test") == "committed"
+
+        with pytest.raises(ZeroDivisionError):
+            with db.transaction():
+                store.set_state(1, "test", "rolled back")
+                assert store.get_state(1, "test") == "rolled back"
+                1 / 0
+
+        # The cache does not keep the state that was rolled back
+        assert store.get_state(1, "test") == "committed"
+        store.delete_state(1, "test")
+        assert store.get_state(1, "test") is None
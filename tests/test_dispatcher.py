@@ -0,0 +1,31 @@
+from tests.chat import Chat, setup_request
+
+with Chat():
+    from notes_api.types import db
+    from notes_api.exceptions import ApiError
+    from notes_bot.lang import get_translate
+    from notes_bot.request import request
+    from notes_bot.dispatcher import wrapper
+    from notes_bot.message_generator import TextMessage
+    from tests.mocks import message_mock
+
+
+def test_update_is_rolled_back_after_a_reply():
+    def handler(_x):
+        request.entity.create_event("01.01.2000", "rolled back first")
+        TextMessage("first").send()
+        request.entity.create_event("01.01.2000", "rolled back second")
+        TextMessage("second").send()
+        raise ApiError
+
+    with Chat() as chat:
+        setup_request(message_mock(1, "/menu"))
+        wrapper(handler, request.query)
+
+        events = db.execute("SELECT 1 FROM events WHERE text LIKE 'rolled back %';")
+        assert not events
+        assert [x["kwargs"]["params"]["text"] for x in chat.history] == [
+            "first",
+            "second",
+            get_translate("errors.error"),
+        ]
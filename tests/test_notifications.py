@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+
+from tests.chat import Chat
+
+with Chat():
+    import notes_bot.notifications
+    from notes_api.types import db
+    from notes_bot.request import request
+    from notes_bot.types import TelegramAccount
+    from notes_bot.notifications import (
+        Recipient,
+        catch_up_notifications,
+        send_notifications_messages,
+    )
+
+
+def test_send_notifications_messages(chat, create_events):
+    # 02:07 in UTC+3 is 23:07 of the previous day in UTC
+    n_date = datetime(1999, 12, 31, 23, 7, tzinfo=timezone.utc)
+    next_n_date = datetime(2000, 1, 1, 23, 7, tzinfo=timezone.utc)
+
+    request.entity.set_telegram_user_settings(
+        timezone=3, notifications=1, notifications_time="02:07"
+    )
+
+    report = send_notifications_messages(n_date, workers=0)
+    assert (report["recipients"], report["due"], report["empty"]) == (1, 0, 0)
+
+    # The day without events is recorded, the new event waits for the next day
+    create_events([("02.01.2000", "event text")])
+    assert send_notifications_messages(n_date, workers=0)["recipients"] == 0
+    assert not chat.history
+
+    report = send_notifications_messages(next_n_date, workers=0)
+    assert (report["recipients"], report["due"], report["sent"]) == (1, 1, 1)
+    assert report["slot"] == "2000-01-01 23:07"
+    assert chat.comparer(
+        lambda m, u, k: (
+            u.endswith("sendMessage")
+            and k["params"]["chat_id"] == "1"
+            and "02.01.2000" in k["params"]["text"]
+            and "event text" in k["params"]["text"]
+        ),
+    )
+
+    # A repeated slot does not send again
+    assert send_notifications_messages(next_n_date, workers=0)["recipients"] == 0
+    report = send_notifications_messages(
+        datetime(2000, 1, 1, 23, 8, tzinfo=timezone.utc), workers=0
+    )
+    assert report["recipients"] == 0
+    assert len(chat.history) == 1
+
+
+def test_catch_up_notifications(chat, create_events):
+    request.entity.set_telegram_user_settings(
+        timezone=3, notifications=1, notifications_time="02:07"
+    )
+    create_events([("03.01.2000", "event text")])
+
+    # Without deliveries the notification may have been sent before the ledger
+    after = datetime(2000, 1, 3, 9, 0, tzinfo=timezone.utc)
+    assert catch_up_notifications(after, workers=0)["recipients"] == 0
+
+    # The last delivery of the stopped bot
+    db.execute(
+        """
+INSERT INTO notification_deliveries (chat_id, local_date, kind, status, delivery_time)
+VALUES (0, '2000-01-03', 1, 'sent', '2000-01-02 22:00:00');
+"""
+    )
+
+    # Before the notification time nothing is missed
+    before = datetime(2000, 1, 2, 23, 0, tzinfo=timezone.utc)
+    assert catch_up_notifications(before, workers=0)["recipients"] == 0
+
+    report = catch_up_notifications(after, workers=0)
+    assert (report["recipients"], report["sent"]) == (1, 1)
+    assert catch_up_notifications(after, workers=0)["recipients"] == 0
+    assert len(chat.history) == 1
+
+
+def test_send_notifications_messages_without_connection(monkeypatch):
+    n_date = datetime(2000, 1, 4, 23, 7, tzinfo=timezone.utc)
+    with db.connect():
+        account = TelegramAccount(1)
+        account.settings  # noqa: B018  # loaded while there is a connection
+
+    monkeypatch.setattr(
+        notes_bot.notifications,
+        "resolve_due_recipients",
+        lambda *args: (1, [Recipient(account, 1, n_date)]),
+    )
+
+    # The recipient has no events, it is rendered and recorded as empty
+    report = send_notifications_messages(n_date, workers=0)
+    assert (report["due"], report["empty"], report["failed"]) == (1, 1, 0)
@@ -0,0 +1,20 @@
+from tests.chat import Chat
+
+with Chat():
+    from notes_bot.bot_messages import daily_message
+    from notes_bot.message_generator import pages_cache_stats
+
+
+def test_pages_cache(create_events):
+    create_events([("01.01.2000", "first event")])
+
+    daily_message("01.01.2000")
+    hits, misses = pages_cache_stats["hits"], pages_cache_stats["misses"]
+    assert "first event" in daily_message("01.01.2000").text
+    assert pages_cache_stats["hits"] == hits + 1
+
+    # A new event of the owner invalidates the cached split
+    create_events([("01.01.2000", "second event")])
+    text = daily_message("01.01.2000").text
+    assert "first event" in text and "second event" in text
+    assert pages_cache_stats["misses"] == misses + 1
@@ -0,0 +1,130 @@
+import re
+from datetime import datetime, timezone
+from contextlib import contextmanager
+
+from tests.chat import Chat, setup_request
+
+with Chat():
+    import notes_api.types
+    from notes_bot.request import request
+    from tests.mocks import callback_mock, message_mock
+    from notes_bot.handlers import callback_handler, command_handler
+    from notes_bot.notifications import send_notifications_messages
+
+
+full_scan_regex = re.compile(r"^SCAN (events|members|groups|tg_settings|media)\b")
+
+
+@contextmanager
+def collect_queries():
+    """
+    Records every query passed to `db.execute` and `db.iterate` as {query: params}
+    """
+    queries: dict[str, tuple | dict] = {}
+    db = notes_api.types.db
+    execute, iterate = db.execute, db.iterate
+
+    def recorder(query: str, params: tuple | dict = (), *args, **kwargs):
+        if not kwargs.get("script"):
+            queries.setdefault(db._statements.get(query, query), params)
+        return execute(query, params, *args, **kwargs)
+
+    def iterate_recorder(query: str, params: tuple | dict = ()):
+        queries.setdefault(db._statements.get(query, query), params)
+        return iterate(query, params)
+
+    db.execute, db.iterate = recorder, iterate_recorder
+    try:
+        yield queries
+    finally:
+        db.execute, db.iterate = execute, iterate
+
+
+def seed_events(create_events) -> list[int]:
+    event_ids = create_events(
+        [
+            ("01.01.2000", "event text"),
+            ("02.01.2000", "daily event"),
+            ("03.01.2000", "weekly event"),
+            ("04.01.2000", "monthly event"),
+            ("05.01.2000", "yearly event"),
+            ("06.01.2000", "event in bin"),
+        ]
+    )
+    for event_id, status in zip(event_ids[1:5], ("📬", "🗞", "📅", "🎉")):
+        request.entity.edit_event_status(event_id, [status])
+    # delete_event_to_bin is only available for premium
+    notes_api.types.db.execute(
+        """
+UPDATE events
+   SET removal_time = DATE()
+ WHERE user_id = ?
+       AND event_id = ?;
+""",
+        params=(request.entity.user_id, event_ids[-1]),
+    )
+    return event_ids
+
+
+def test_query_plan_without_full_scan(create_events):
+    with collect_queries() as queries:
+        send_notifications_messages()
+
+        setup_request(message_mock(1, "/start"))
+        event_ids = seed_events(create_events)
+        event_id, bin_event_id = event_ids[0], event_ids[-1]
+
+        for notifications in (1, 2):
+            request.entity.set_telegram_user_settings(
+                notifications=notifications, notifications_time="08:00"
+            )
+            send_notifications_messages(
+                datetime(2000, 1, 1, 8, tzinfo=timezone.utc), workers=0
+            )
+
+        for text in (
+            "/start",
+            "/menu",
+            "/calendar",
+            "/today",
+            "/week_event_list",
+            "/search event",
+            "/settings",
+        ):
+            setup_request(message_mock(1, text))
+            command_handler(request.query)
+
+        for data in (
+            "mnm",
+            "mnw",
+            "mnn",
+            "mnb",
+            "mngrs al 1",
+            "mnc ('now',)",
+            "dl 01.01.2000",
+            "pd 01.01.2000 0",
+            "pr 01.01.2000 0",
+            "pw 0",
+            "pb 0",
+            "pn 01.01.2000 0",
+            f"em {event_id}",
+            f"ed {event_id} 01.01.2000",
+            f"ess {event_id} 01.01.2000 ✅",
+            f"bem {bin_event_id}",
+            f"ber {bin_event_id} 01.01.2000",
+            "us",
+        ):
+            setup_request(callback_mock(data))
+            callback_handler(request.query)
+
+    full_scans = {}
+    for query, params in queries.items():
+        plan = notes_api.types.db.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        details = [row[3] for row in plan if full_scan_regex.match(row[3])]
+        if details:
+            full_scans[query] = details
+
+    assert len(queries) > 30, len(queries)
+    assert not full_scans, "\n\n".join(
+        f"{query.strip()}\n{details}" for query, details in full_scans.items()
+    )
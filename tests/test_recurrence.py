@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from tests.chat import Chat
+
+with Chat():
+    from notes_api.types import db
+    from notes_bot.request import request
+    from notes_bot.bot_messages import (
+        recurring_events_message,
+        notification_events_condition,
+    )
+
+
+def test_event_with_several_recurrences(create_events):
+    # 05.01.2000 is a Wednesday, 05.01.2001 is a Friday
+    (event_id,) = create_events([("05.01.2000", "weekly birthday")])
+    request.entity.edit_event_status(event_id, ["🗞", "🎉"])
+
+    for date in ("12.01.2000", "05.01.2001"):
+        assert "weekly birthday" in recurring_events_message(date).text
+
+    # Only the birthday matches, the weekdays of the day and of +1 day are not Wednesday
+    event_ids = db.execute(
+        f"""
+SELECT event_id
+  FROM events
+ WHERE user_id IS ?
+       AND group_id IS ?
+       AND {notification_events_condition(datetime(2001, 1, 5))};
+""",
+        params=(request.entity.safe_user_id, request.entity.group_id),
+    )
+    assert event_ids == [(event_id,)]
+
+    counts = db.execute("""
+SELECT kind,
+       month,
+       day
+  FROM calendar_counts
+ WHERE owner = 'u1'
+       AND year = 0;
+""")
+    assert ("weekly", 0, 3) in counts and ("yearly", 1, 5) in counts
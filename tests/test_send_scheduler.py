@@ -0,0 +1,133 @@
+from time import sleep, monotonic
+from threading import Thread
+from contextvars import copy_context
+
+# noinspection PyPackageRequirements
+from telebot import apihelper, util
+
+# noinspection PyPackageRequirements
+from telebot.apihelper import ApiTelegramException
+
+from tests.chat import Chat, custom_sender
+
+with Chat():
+    from notes_bot.bot import bot
+    from notes_api.types import db
+    from notes_bot.send_scheduler import SendScheduler, CALLBACK_ANSWER
+
+
+def run_in_threads(*funcs, interval: float = 0.05) -> None:
+    threads = []
+    for func in funcs:
+        # chat.history is a ContextVar
+        threads.append(Thread(target=copy_context().run, args=(func,)))
+        threads[-1].start()
+        sleep(interval)
+
+    for thread in threads:
+        thread.join(5)
+
+
+def test_send_scheduler_coalesces_edits():
+    scheduler = SendScheduler()
+    results = []
+
+    def edit(text: str):
+        results.append(
+            scheduler.send(
+                1,
+                bot.edit_message_text,
+                coalesce_key=("edit_message_text", 1, 1),
+                text=text,
+                chat_id=1,
+                message_id=1,
+            )
+        )
+
+    with Chat() as chat:
+        scheduler.pause(1, 0.2)
+        run_in_threads(lambda: edit("first"), lambda: edit("second"))
+
+        assert [x["kwargs"]["params"]["text"] for x in chat.history] == ["second"]
+        assert results[0] is None and results[1] is not None
+        assert scheduler.counters["coalesced"] == 1
+
+
+def test_send_scheduler_callback_answer_priority():
+    scheduler = SendScheduler()
+
+    with Chat() as chat:
+        scheduler.pause(None, 0.2)
+        run_in_threads(
+            lambda: scheduler.send(1, bot.send_message, chat_id=1, text="text"),
+            lambda: scheduler.send(
+                None, bot.answer_callback_query, "1", "ok", priority=CALLBACK_ANSWER
+            ),
+        )
+
+        methods = [x["url"].rsplit("/", 1)[-1] for x in chat.history]
+        assert methods == ["answerCallbackQuery", "sendMessage"]
+
+
+def test_send_scheduler_retry_after():
+    scheduler = SendScheduler()
+    too_many_requests = util.CustomRequestResponse(
+        '{"ok":false,"error_code":429,'
+        '"description":"Too Many Requests: retry after 0.2",'
+        '"parameters":{"retry_after":0.2}}',
+        status_code=429,
+    )
+    responses = [too_many_requests]
+
+    def sender(method, url, **kwargs):
+        if responses:
+            return responses.pop()
+        return custom_sender(method, url, **kwargs)
+
+    with Chat() as chat:
+        apihelper.CUSTOM_REQUEST_SENDER = sender
+        try:
+            start = monotonic()
+            message = scheduler.send(1, bot.send_message, chat_id=1, text="text")
+        finally:
+            apihelper.CUSTOM_REQUEST_SENDER = custom_sender
+
+        assert message.message_id == 1
+        assert monotonic() - start >= 0.2
+        assert scheduler.counters["retried"] == 1
+        assert len(chat.history) == 1  # the first request did not reach the stub
+
+
+def test_send_scheduler_does_not_wait_in_transaction():
+    scheduler = SendScheduler()
+    too_many_requests = util.CustomRequestResponse(
+        '{"ok":false,"error_code":429,'
+        '"description":"Too Many Requests: retry after 1",'
+        '"parameters":{"retry_after":1}}',
+        status_code=429,
+    )
+
+    def sender(method, url, **kwargs):
+        custom_sender(method, url, **kwargs)
+        return too_many_requests
+
+    with Chat() as chat, db.transaction():
+        scheduler.pause(1, 1)
+        start = monotonic()
+        message = scheduler.send(1, bot.send_message, chat_id=1, text="text")
+        assert message.message_id == 1
+        assert monotonic() - start < 0.5
+
+        apihelper.CUSTOM_REQUEST_SENDER = sender
+        try:
+            scheduler.send(1, bot.send_message, chat_id=1, text="text")
+        except ApiTelegramException as e:
+            assert e.error_code == 429
+        else:
+            assert False, "429 is not raised"
+        finally:
+            apihelper.CUSTOM_REQUEST_SENDER = custom_sender
+
+        assert monotonic() - start < 0.5
+        assert len(chat.history) == 2
+        assert scheduler.counters["retried"] == 0
@@ -0,0 +1,158 @@
+import json
+from time import sleep
+from threading import Lock, current_thread
+
+# noinspection PyPackageRequirements
+from telebot import apihelper, util
+
+# noinspection PyPackageRequirements
+from telebot.types import Update
+
+from tests.chat import Chat
+from notes_bot.update_queue import ShardedUpdateExecutor, UpdateQueue, update_chat_id
+
+with Chat():
+    from start_bot import bot, put_updates
+
+
+def message_update_json(update_id: int, chat_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "test"},
+            "text": str(update_id),
+        },
+    }
+
+
+def message_update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json(message_update_json(update_id, chat_id))
+
+
+def test_update_chat_id():
+    callback = Update.de_json(
+        {
+            "update_id": 1,
+            "callback_query": {
+                "id": "1",
+                "chat_instance": "1",
+                "from": {"id": 3, "is_bot": False, "first_name": "test"},
+                "data": "mnm",
+            },
+        }
+    )
+    assert update_chat_id(message_update(1, 2)) == 2
+    assert update_chat_id(callback) == 3
+
+
+def test_update_queue_order_dedupe_and_drain():
+    lock = Lock()
+    processed: list[tuple[int, int]] = []
+    running: set[int] = set()
+    overlaps = []
+
+    def process(update: Update):
+        chat_id = update.message.chat.id
+        with lock:
+            if chat_id in running:
+                overlaps.append(update.update_id)
+            running.add(chat_id)
+        sleep(0.001)
+        with lock:
+            running.discard(chat_id)
+            processed.append((chat_id, update.update_id))
+
+    update_queue = UpdateQueue(process, workers=4, maxsize=1000).start()
+    updates = [message_update(n, n % 5) for n in range(200)]
+
+    assert all(update_queue.put(update) for update in updates)
+    assert update_queue.put(updates[0])  # duplicate
+    assert update_queue.stop(timeout=10)
+    assert not update_queue.put(message_update(1000, 1))
+
+    stats = update_queue.stats
+    assert (stats["processed"], stats["duplicates"], stats["rejected"]) == (200, 1, 1)
+    assert stats["size"] == stats["chats"] == 0
+    assert not overlaps
+    for chat_id in range(5):
+        update_ids = [u for c, u in processed if c == chat_id]
+        assert update_ids == sorted(update_ids) and len(update_ids) == 40
+
+
+def test_update_queue_backpressure():
+    update_queue = UpdateQueue(lambda update: None, workers=1, maxsize=2)
+
+    assert update_queue.put(message_update(1, 1))
+    assert update_queue.put(message_update(2, 2))
+    assert not update_queue.put(message_update(3, 3))
+    assert update_queue.stats["max_size"] == 2
+
+    update_queue.start()
+    assert update_queue.stop(timeout=10)
+    assert update_queue.stats["processed"] == 2
+
+
+def test_sharded_update_executor_order():
+    processed: list[tuple[int, str, int]] = []
+
+    def process(update: Update):
+        sleep(0.001)
+        processed.append(
+            (update.message.chat.id, current_thread().name, update.update_id)
+        )
+
+    executor = ShardedUpdateExecutor(process, shards=3, maxsize=5).start()
+    for n in range(60):
+        executor.put(message_update(n, n % 6))
+    executor.stop(timeout=10)
+
+    assert sum(stats["processed"] for stats in executor.stats) == 60
+    for chat_id in range(6):
+        rows = [(t, u) for c, t, u in processed if c == chat_id]
+        assert len({t for t, _ in rows}) == 1
+        assert [u for _, u in rows] == list(range(chat_id, 60, 6))
+
+
+def test_sharded_update_executor_dedupe():
+    processed = []
+    executor = ShardedUpdateExecutor(processed.append, shards=2).start()
+
+    assert executor.put(message_update(1, 1))
+    assert not executor.put(message_update(1, 1))
+    executor.stop(timeout=10)
+
+    assert [update.update_id for update in processed] == [1]
+    assert executor.duplicates == 1
+
+
+def test_polling_does_not_repeat_updates(monkeypatch):
+    updates = [message_update_json(n, n % 2) for n in range(1, 4)]
+    offsets = []
+
+    def sender(method, url, **kwargs):
+        offsets.append(offset := kwargs["params"]["offset"])
+        result = [update for update in updates if update["update_id"] >= offset]
+        return util.CustomRequestResponse(json.dumps({"ok": True, "result": result}))
+
+    processed = []
+
+    def process(update: Update):
+        # getUpdates is called again before the shards are done
+        sleep(0.05)
+        processed.append(update.update_id)
+
+    executor = ShardedUpdateExecutor(process, shards=2).start()
+    monkeypatch.setattr(apihelper, "CUSTOM_REQUEST_SENDER", sender)
+    monkeypatch.setattr(bot, "last_update_id", 0)
+    monkeypatch.setattr(bot, "process_new_updates", lambda x: put_updates(executor, x))
+
+    for _ in range(3):
+        bot._TeleBot__retrieve_updates(timeout=0, long_polling_timeout=0)
+    executor.stop(timeout=10)
+
+    assert offsets == [1, 4, 4]
+    assert sorted(processed) == [1, 2, 3]
+    assert executor.duplicates == 0